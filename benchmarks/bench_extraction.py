@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark on a versioned corpus of restaurant and hotel pages.
+
+Each corpus version is a folder of anonymized HTML pages with a
+labels.json giving the reservation phone and email a human expects from
+each page. The runner times the extraction steps on every page (phone
+candidates, one-pass scan, reservation phone choice, email choice) and
+scores the full page extraction of ContactScraper against the labels, so
+speed and accuracy changes of the extractors show up in one report.
+
+Usage:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --corpus benchmarks/corpus/v1 --repeat 50 --json results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from contact_scraper import ContactScraper
+from phone_extractor import PHONE_FORMATS, PhoneExtractor
+from page_decoder import decode_body
+from site_platforms import fingerprint
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'v1')
+
+# Timed steps, in the order of the report
+STEPS = ('phones', 'scan', 'reservation_phone', 'email', 'full')
+
+# Compares phone numbers of any supported country
+_PHONE_NORMALIZER = PhoneExtractor(PHONE_FORMATS)
+
+
+def load_corpus(corpus_dir: str) -> Dict:
+    """
+    Load the labels and pages of a corpus version.
+
+    Args:
+        corpus_dir: Folder holding labels.json and the HTML pages
+
+    Returns:
+        Labels document, each page with its 'html' and 'size' (bytes) added
+    """
+    with open(os.path.join(corpus_dir, 'labels.json'), encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    for page in corpus['pages']:
+        with open(os.path.join(corpus_dir, page['file']), 'rb') as f:
+            raw = f.read()
+        page['size'] = len(raw)
+        page['html'] = decode_body(raw, 'text/html')
+    return corpus
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Best time of a function over several runs (seconds)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_page(scraper: ContactScraper, page: Dict, repeat: int) -> Dict[str, float]:
+    """
+    Time the extraction steps on one page.
+
+    The reservation phone and email steps are timed on a scan made
+    beforehand, as in ContactScraper, so the scan is only counted once.
+    """
+    html, url = page['html'], page['url']
+    extractor, scanner = scraper._phone_tools_for(url, html)
+    scan = scanner.scan(html)
+
+    return {
+        'phones': best_of(lambda: extractor.extract_phones(html), repeat),
+        'scan': best_of(lambda: scanner.scan(html), repeat),
+        'reservation_phone': best_of(lambda: scraper._extract_reservation_phone(scan, extractor), repeat),
+        'email': best_of(lambda: scraper._extract_email(scan), repeat),
+        'full': best_of(lambda: scraper.extract_contacts(html, url), repeat),
+    }
+
+
+def score(pages: List[Dict], field: str) -> Dict[str, float]:
+    """
+    Precision and recall of one extracted field against the labels.
+
+    A prediction is correct when it equals the label; a page labelled
+    with no contact only counts against precision if something is found.
+    """
+    predicted = sum(1 for page in pages if page['found'][field])
+    expected = sum(1 for page in pages if page[field])
+    correct = sum(1 for page in pages if page[field] and page['found'][field] == page[field])
+    return {
+        'predicted': predicted,
+        'expected': expected,
+        'correct': correct,
+        'precision': correct / predicted if predicted else 1.0,
+        'recall': correct / expected if expected else 1.0,
+    }
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """E.164 form of a phone number, to compare labels and predictions."""
+    if not phone:
+        return None
+    return _PHONE_NORMALIZER.to_e164(phone) or phone
+
+
+def run_benchmark(corpus_dir: str, repeat: int) -> Dict:
+    """
+    Time and score the extractors on a corpus.
+
+    Args:
+        corpus_dir: Corpus version folder
+        repeat: Runs per timed step (the best run is kept)
+
+    Returns:
+        Results: corpus version, per-page timings and predictions, totals and scores
+    """
+    corpus = load_corpus(corpus_dir)
+    scraper = ContactScraper(verbose=False)
+    pages = corpus['pages']
+
+    for page in pages:
+        page['platform'] = fingerprint(page['html'])
+        page['timings'] = time_page(scraper, page, repeat)
+        result = scraper.extract_contacts(page['html'], page['url'])
+        page['found'] = {
+            'reservation_phone': normalize_phone(result['reservation_phone']),
+            'email': result['email'],
+        }
+        page['reservation_phone'] = normalize_phone(page['reservation_phone'])
+
+    total_size = sum(page['size'] for page in pages)
+    totals = {step: sum(page['timings'][step] for page in pages) for step in STEPS}
+
+    return {
+        'corpus': os.path.basename(os.path.normpath(corpus_dir)),
+        'version': corpus.get('version'),
+        'pages': [
+            {key: page[key] for key in ('file', 'size', 'platform', 'timings', 'reservation_phone', 'email', 'found')}
+            for page in pages
+        ],
+        'total_size': total_size,
+        'totals': totals,
+        'scores': {field: score(pages, field) for field in ('reservation_phone', 'email')},
+        'platforms': platform_scores(pages),
+    }
+
+
+def platform_scores(pages: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    Pages, contacts found as labelled and full extraction time per platform.
+
+    Shows whether a platform's extractor (see site_platforms.py) is both
+    faster and as accurate as the generic scan on the pages it handles.
+    """
+    platforms: Dict[str, Dict[str, float]] = {}
+    for page in pages:
+        stats = platforms.setdefault(page['platform'], {'pages': 0, 'correct': 0, 'expected': 0, 'seconds': 0.0})
+        stats['pages'] += 1
+        stats['seconds'] += page['timings']['full']
+        for field in ('reservation_phone', 'email'):
+            if page[field]:
+                stats['expected'] += 1
+                stats['correct'] += page['found'][field] == page[field]
+    return platforms
+
+
+def print_report(results: Dict, repeat: int):
+    """Print per-page timings, totals per MB and precision/recall."""
+    pages = results['pages']
+    print(f"=== Extraction Benchmark (corpus {results['corpus']}, version {results['version']}, "
+          f"{len(pages)} pages, best of {repeat}) ===")
+
+    header = f"{'Page':<28} {'KB':>6}" + ''.join(f" {step[:12]:>12}" for step in STEPS) + "  Phone Email"
+    print(header)
+    for page in pages:
+        marks = ['ok' if page['found'][field] == page[field] else 'MISS' if page[field] else 'FP'
+                 for field in ('reservation_phone', 'email')]
+        print(f"{page['file'][:28]:<28} {page['size'] / 1024:6.1f}"
+              + ''.join(f" {page['timings'][step] * 1e6:10.0f}us" for step in STEPS)
+              + f"  {marks[0]:<5} {marks[1]}")
+
+    size_mb = results['total_size'] / (1024 * 1024)
+    print()
+    print(f"{'Step':<20} {'per page':>12} {'per MB':>12} {'MB/s':>10}")
+    for step in STEPS:
+        seconds = results['totals'][step]
+        print(f"{step:<20} {seconds / len(pages) * 1e6:10.0f}us {seconds / size_mb * 1e3:10.2f}ms "
+              f"{size_mb / seconds if seconds else 0:10.1f}")
+
+    print()
+    print(f"{'Platform':<20} {'pages':>6} {'found':>8} {'per page':>12}")
+    for platform, stats in sorted(results['platforms'].items(), key=lambda item: -item[1]['pages']):
+        print(f"{platform:<20} {stats['pages']:>6} {stats['correct']:>3}/{stats['expected']:<4} "
+              f"{stats['seconds'] / stats['pages'] * 1e6:10.0f}us")
+
+    print()
+    for field, field_score in results['scores'].items():
+        print(f"{field:<20} precision {field_score['precision']:6.1%} "
+              f"({field_score['correct']}/{field_score['predicted']})  "
+              f"recall {field_score['recall']:6.1%} ({field_score['correct']}/{field_score['expected']})")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Time and score the contact extractors on a labelled corpus")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS,
+                        help="Corpus version folder (default: benchmarks/corpus/v1)")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per timed step, best kept (default: 20)")
+    parser.add_argument("--json", help="Also write the results to this JSON file, to compare runs")
+    args = parser.parse_args()
+
+    if args.repeat <= 0:
+        print("ERROR: --repeat must be > 0")
+        sys.exit(1)
+    if not os.path.isfile(os.path.join(args.corpus, 'labels.json')):
+        print(f"ERROR: No labels.json in {args.corpus}")
+        sys.exit(1)
+
+    results = run_benchmark(args.corpus, args.repeat)
+    print_report(results, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nOK: Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
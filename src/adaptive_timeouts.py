@@ -0,0 +1,107 @@
+"""
+Per-host request timeouts learned from observed latencies.
+
+Each host keeps its last response latencies (time until the response
+headers arrive) in a persistent cache. Timeouts are derived from their
+percentiles: fast hosts get short timeouts, so a host that stops answering
+is given up quickly, while slow but working hosts keep enough time.
+Hosts without history use the default timeouts.
+"""
+
+import math
+import threading
+from typing import List, Optional, Tuple
+
+try:
+    from .cache_store import JsonCache
+except ImportError:
+    from cache_store import JsonCache
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list (fraction in 0..1)."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class AdaptiveTimeouts:
+    """Connect/read timeouts per host from latency percentiles."""
+
+    def __init__(self, cache: Optional[JsonCache] = None,
+                 default_connect: float = 5.0, default_read: float = 10.0,
+                 min_connect: float = 1.0, min_read: float = 2.0,
+                 max_samples: int = 20, min_samples: int = 3, ttl: float = 30 * 86400):
+        """
+        Args:
+            cache: Persistent cache for latency samples (memory only if None)
+            default_connect: Connect timeout without history, and upper bound (seconds)
+            default_read: Read timeout without history, and upper bound (seconds)
+            min_connect: Lower bound of learned connect timeouts (seconds)
+            min_read: Lower bound of learned read timeouts (seconds)
+            max_samples: Latencies kept per host
+            min_samples: Latencies needed before timeouts adapt
+            ttl: How long a host's history is kept without new samples (seconds)
+        """
+        self.cache = cache if cache is not None else JsonCache()
+        self.default_connect = default_connect
+        self.default_read = default_read
+        self.min_connect = min_connect
+        self.min_read = min_read
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def timeouts(self, host: str) -> Tuple[float, float]:
+        """
+        Get (connect, read) timeouts for a host.
+
+        Args:
+            host: Host name
+
+        Returns:
+            Timeouts in seconds, as accepted by requests
+        """
+        samples = self._samples(host)
+        if len(samples) < self.min_samples:
+            return self.default_connect, self.default_read
+
+        # Connecting is one round trip, the response a few: generous margins
+        # over the slow end of what the host usually does
+        p90 = percentile(samples, 0.90)
+        p95 = percentile(samples, 0.95)
+        connect = min(self.default_connect, max(self.min_connect, 2 * p90))
+        read = min(self.default_read, max(self.min_read, 3 * p95))
+        return connect, read
+
+    def record(self, host: str, seconds: float):
+        """
+        Record the latency of a successful response.
+
+        Args:
+            host: Host name
+            seconds: Time until the response headers arrived
+        """
+        self._add(host, seconds)
+
+    def record_timeout(self, host: str, timeout: float):
+        """Record a timed-out request: counts as a latency of at least the timeout used."""
+        self._add(host, timeout)
+
+    def save(self) -> bool:
+        """Persist latency history."""
+        return self.cache.save()
+
+    def _samples(self, host: str) -> List[float]:
+        if not host:
+            return []
+        return self.cache.get(f"latency:{host.lower()}") or []
+
+    def _add(self, host: str, seconds: float):
+        if not host:
+            return
+        with self._lock:
+            samples = self._samples(host)
+            samples = (samples + [round(seconds, 3)])[-self.max_samples:]
+            self.cache.set(f"latency:{host.lower()}", samples, self.ttl)
@@ -0,0 +1,245 @@
+"""
+Google Places API cost accounting and budget planning.
+
+Google bills each call by SKU: the endpoint (Text Search, Place Details)
+and the most expensive field requested in the field mask. This module
+counts calls per SKU, estimates the cost of a run, enforces a hard budget
+and picks the cheapest fetch strategy that fits it.
+
+Prices are list prices in USD per call and are estimates only (free
+monthly quotas and volume discounts are ignored).
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Pricing tier of each field (Places API New)
+FIELD_TIERS = {
+    'id': 'essentials',
+    'nextPageToken': 'essentials',
+    'displayName': 'pro',
+    'formattedAddress': 'pro',
+    'types': 'pro',
+    'rating': 'enterprise',
+    'userRatingCount': 'enterprise',
+    'nationalPhoneNumber': 'enterprise',
+    'internationalPhoneNumber': 'enterprise',
+    'websiteUri': 'enterprise',
+}
+
+TIER_ORDER = ['essentials', 'pro', 'enterprise']
+
+# Estimated USD per call for each SKU
+SKU_PRICES = {
+    'text_search_essentials': 0.0,
+    'text_search_pro': 0.032,
+    'text_search_enterprise': 0.035,
+    'place_details_essentials': 0.005,
+    'place_details_pro': 0.017,
+    'place_details_enterprise': 0.020,
+}
+
+
+class BudgetExceeded(Exception):
+    """Raised before an API call that would exceed the run budget."""
+
+
+def sku_for(endpoint: str, field_mask: str) -> str:
+    """
+    Determine the billed SKU of a call.
+
+    Args:
+        endpoint: 'text_search' or 'place_details'
+        field_mask: Value of the X-Goog-FieldMask header
+
+    Returns:
+        SKU name such as 'text_search_enterprise'
+    """
+    tier_index = 0
+    for field in field_mask.split(','):
+        field = field.strip()
+        # 'places.rating' in search masks bills like 'rating'
+        name = field[len('places.'):] if field.startswith('places.') else field
+        tier = FIELD_TIERS.get(name, 'enterprise')  # Unknown fields: assume the worst
+        tier_index = max(tier_index, TIER_ORDER.index(tier))
+
+    return f"{endpoint}_{TIER_ORDER[tier_index]}"
+
+
+class ApiUsage:
+    """Per-SKU call counter with an optional hard budget."""
+
+    def __init__(self, max_cost: Optional[float] = None, max_calls: Optional[int] = None):
+        """
+        Args:
+            max_cost: Maximum estimated cost of the run in USD (None for no limit)
+            max_calls: Maximum number of API calls (None for no limit)
+        """
+        self.max_cost = max_cost
+        self.max_calls = max_calls
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @property
+    def total_cost(self) -> float:
+        return sum(SKU_PRICES.get(sku, 0.0) * count for sku, count in self.calls.items())
+
+    def charge(self, endpoint: str, field_mask: str) -> str:
+        """
+        Record a call before it is made.
+
+        Args:
+            endpoint: 'text_search' or 'place_details'
+            field_mask: Field mask of the call
+
+        Returns:
+            The SKU charged
+
+        Raises:
+            BudgetExceeded: If the call would exceed the budget
+        """
+        sku = sku_for(endpoint, field_mask)
+        price = SKU_PRICES.get(sku, 0.0)
+
+        with self._lock:
+            if self.max_calls is not None and self.total_calls + 1 > self.max_calls:
+                raise BudgetExceeded(f"API call budget reached ({self.max_calls} calls)")
+            if self.max_cost is not None and self.total_cost + price > self.max_cost + 1e-9:
+                raise BudgetExceeded(f"API cost budget reached (${self.max_cost:.2f})")
+            self.calls[sku] = self.calls.get(sku, 0) + 1
+
+        return sku
+
+    def remaining_cost(self) -> Optional[float]:
+        """Budget left in USD, None if unlimited."""
+        if self.max_cost is None:
+            return None
+        return max(0.0, self.max_cost - self.total_cost)
+
+    def remaining_calls(self) -> Optional[int]:
+        """Calls left, None if unlimited."""
+        if self.max_calls is None:
+            return None
+        return max(0, self.max_calls - self.total_calls)
+
+    def summary(self) -> List[str]:
+        """Human-readable lines: one per SKU, then the total."""
+        lines = [
+            f"{sku}: {count} calls (~${SKU_PRICES.get(sku, 0.0) * count:.3f})"
+            for sku, count in sorted(self.calls.items())
+        ]
+        lines.append(f"Total: {self.total_calls} calls, estimated cost ~${self.total_cost:.3f}")
+        return lines
+
+
+class FetchStrategy(NamedTuple):
+    """How places and their contact fields are fetched."""
+    name: str
+    search_field_mask: str
+    details_field_mask: Optional[str]  # None: no Place Details calls
+    max_details: Optional[int]         # None: details for every place
+
+
+SEARCH_MASK = 'places.displayName,places.formattedAddress,places.id,places.rating,places.userRatingCount'
+SEARCH_MASK_WITH_CONTACTS = SEARCH_MASK + ',places.nationalPhoneNumber,places.websiteUri'
+DETAILS_MASK = 'displayName,formattedAddress,nationalPhoneNumber,websiteUri,rating,userRatingCount'
+
+# Current behaviour: basic search then one Place Details call per place
+DEFAULT_STRATEGY = FetchStrategy('search+details', SEARCH_MASK, DETAILS_MASK, None)
+
+
+def estimate_cost(strategy: FetchStrategy, search_calls: int, places: int) -> float:
+    """
+    Estimate the cost of a run with a strategy.
+
+    Args:
+        strategy: Fetch strategy
+        search_calls: Number of Text Search calls
+        places: Number of places expected
+
+    Returns:
+        Estimated cost in USD
+    """
+    cost = search_calls * SKU_PRICES[sku_for('text_search', strategy.search_field_mask)]
+    if strategy.details_field_mask:
+        details_calls = places if strategy.max_details is None else min(places, strategy.max_details)
+        cost += details_calls * SKU_PRICES[sku_for('place_details', strategy.details_field_mask)]
+    return cost
+
+
+def estimate_calls(strategy: FetchStrategy, search_calls: int, places: int) -> int:
+    """Estimate the number of API calls of a run with a strategy."""
+    calls = search_calls
+    if strategy.details_field_mask:
+        calls += places if strategy.max_details is None else min(places, strategy.max_details)
+    return calls
+
+
+def plan_strategy(search_calls: int, places: int, usage: ApiUsage) -> Optional[FetchStrategy]:
+    """
+    Choose the cheapest strategy that fits the budget.
+
+    Candidates, all returning phone and website:
+    - contact fields requested directly in the search (no details calls)
+    - basic search + Place Details for every place
+    - basic search + Place Details for as many places as the budget allows
+
+    Args:
+        search_calls: Number of Text Search calls planned
+        places: Number of places requested
+        usage: Usage tracker holding the budget
+
+    Returns:
+        Chosen strategy, DEFAULT_STRATEGY if there is no budget,
+        None if not even the searches fit
+    """
+    if usage.max_cost is None and usage.max_calls is None:
+        return DEFAULT_STRATEGY
+
+    candidates = [
+        FetchStrategy('search with contact fields', SEARCH_MASK_WITH_CONTACTS, None, None),
+        DEFAULT_STRATEGY,
+    ]
+
+    # Fewer detail calls: as many as the remaining budget allows
+    search_cost = search_calls * SKU_PRICES[sku_for('text_search', SEARCH_MASK)]
+    details_price = SKU_PRICES[sku_for('place_details', DETAILS_MASK)]
+    max_details = places
+    if usage.max_cost is not None:
+        max_details = min(max_details, int((usage.max_cost - search_cost + 1e-9) // details_price))
+    if usage.max_calls is not None:
+        max_details = min(max_details, usage.max_calls - search_calls)
+    if 0 <= max_details < places:
+        candidates.append(FetchStrategy(f'search+details (first {max_details})', SEARCH_MASK, DETAILS_MASK, max_details))
+
+    fitting = []
+    for strategy in candidates:
+        cost = estimate_cost(strategy, search_calls, places)
+        calls = estimate_calls(strategy, search_calls, places)
+        if usage.max_cost is not None and cost > usage.max_cost + 1e-9:
+            continue
+        if usage.max_calls is not None and calls > usage.max_calls:
+            continue
+        fitting.append((cost, calls, strategy))
+
+    if not fitting:
+        return None
+
+    # Cheapest first, then fewest calls, then most complete data
+    fitting.sort(key=lambda item: (item[0], item[1]))
+    return fitting[0][2]
+
+
+if __name__ == "__main__":
+    for budget in [None, 1.0, 0.20, 0.05]:
+        test_usage = ApiUsage(max_cost=budget)
+        plan = plan_strategy(search_calls=2, places=40, usage=test_usage)
+        if plan:
+            print(f"Budget {budget}: {plan.name} (~${estimate_cost(plan, 2, 40):.3f})")
+        else:
+            print(f"Budget {budget}: no strategy fits")
@@ -0,0 +1,136 @@
+"""
+Small persistent key/value cache with per-entry expiry.
+
+Entries are kept in memory and saved as a JSON file so that caches
+(robots.txt rules, host statistics, ...) are shared across runs.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_DIR = ".prospector_cache"
+
+
+class JsonCache:
+    """Thread-safe JSON file cache with TTL per entry."""
+
+    def __init__(self, filename: Optional[str] = None):
+        """
+        Args:
+            filename: JSON file backing the cache (None for memory only)
+        """
+        self.filepath = Path(filename) if filename else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a value if present and not expired.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Stored value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at = entry.get('expires_at')
+            if expires_at is not None and time.time() >= expires_at:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            return entry.get('value')
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds (None for no expiry)
+        """
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'expires_at': time.time() + ttl if ttl is not None else None
+            }
+            self._dirty = True
+
+    def expires_at(self, key: str) -> Optional[float]:
+        """
+        Get when a key expires.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Expiry timestamp (time.time() scale), None if the key never
+            expires or is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.get('expires_at') if entry else None
+
+    def delete(self, key: str):
+        """Remove a key if present."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def save(self) -> bool:
+        """
+        Write the cache to disk, dropping expired entries.
+
+        Returns:
+            bool: True if saved (or nothing to save)
+        """
+        if not self.filepath:
+            return True
+
+        with self._lock:
+            if not self._dirty:
+                return True
+            now = time.time()
+            entries = {
+                key: entry for key, entry in self._entries.items()
+                if entry.get('expires_at') is None or entry['expires_at'] > now
+            }
+            self._dirty = False
+
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.filepath.with_suffix(self.filepath.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(entries, cache_file, ensure_ascii=False)
+            tmp_path.replace(self.filepath)
+            return True
+        except OSError as e:
+            print(f"WARNING: Could not save cache {self.filepath}: {e}")
+            return False
+
+    def _load(self):
+        """Load entries from disk, ignoring a missing or corrupt file."""
+        if not self.filepath or not self.filepath.exists():
+            return
+
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Ignoring unreadable cache {self.filepath}: {e}")
@@ -0,0 +1,169 @@
+"""
+Circuit breakers for the scraper, per host and per hosting provider.
+
+A breaker opens after consecutive failed requests (timeouts, refused
+connections, 5xx/429 answers) and then fails fast: requests are refused
+without touching the network. After a cooldown it lets a single probe
+request through (half-open); the probe closes the breaker if it succeeds
+and reopens it, with a doubled cooldown, if it fails.
+
+Sites on the same hosting provider fail together (overloaded shared
+hosting, provider outage), so a second breaker covers each provider,
+approximated by the network of the host's address (/24 for IPv4, /48 for
+IPv6). It needs more failures to open than a host breaker, and failures
+only count when they come from several hosts.
+"""
+
+import ipaddress
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+
+class CircuitOpen(Exception):
+    """A request was refused because the breaker of its host or provider is open."""
+
+    def __init__(self, scope: str, key: str):
+        super().__init__(f"Circuit open for {scope} {key}")
+        self.scope = scope  # 'host' or 'provider'
+        self.key = key
+
+
+class _Breaker:
+    """State of one breaker."""
+
+    def __init__(self, cooldown: float):
+        self.failures = 0                     # Consecutive failures
+        self.failed_hosts: Set[str] = set()   # Hosts behind them (provider breakers)
+        self.open_until: Optional[float] = None
+        self.cooldown = cooldown
+        self.probing = False                  # Half-open probe in flight
+
+
+class CircuitBreakers:
+    """Host and provider circuit breakers shared by concurrent scrapes."""
+
+    def __init__(self, host_threshold: int = 2, provider_threshold: int = 5,
+                 provider_min_hosts: int = 2, cooldown: float = 60.0, max_cooldown: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            host_threshold: Consecutive failures that open a host's breaker
+            provider_threshold: Consecutive failures that open a provider's breaker
+            provider_min_hosts: Distinct failing hosts needed to open a provider's breaker
+            cooldown: Time an opened breaker refuses requests before a probe (seconds)
+            max_cooldown: Upper bound of the cooldown, doubled by each failed probe (seconds)
+            clock: Monotonic time source, in seconds
+        """
+        self.host_threshold = host_threshold
+        self.provider_threshold = provider_threshold
+        self.provider_min_hosts = provider_min_hosts
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+
+        self.rejected = 0   # Requests refused by an open breaker
+        self.opened = 0     # Times a breaker opened
+        self._hosts: Dict[str, _Breaker] = {}
+        self._providers: Dict[str, _Breaker] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, provider: Optional[str] = None):
+        """
+        Check that a request to a host may go out.
+
+        When a breaker's cooldown has elapsed, the caller becomes its
+        half-open probe and must report the outcome with release().
+
+        Args:
+            host: Host name
+            provider: Provider key of the host (see provider_key), None if unknown
+
+        Raises:
+            CircuitOpen: If the host's or the provider's breaker refuses the request
+        """
+        now = self.clock()
+        with self._lock:
+            probes = []
+            for scope, key, breakers in (('host', host, self._hosts), ('provider', provider, self._providers)):
+                breaker = breakers.get(key) if key else None
+                if breaker is None or breaker.open_until is None:
+                    continue
+                if now < breaker.open_until or breaker.probing:
+                    self.rejected += 1
+                    raise CircuitOpen(scope, key)
+                probes.append(breaker)
+
+            # Both breakers allow the request: only now take the probe slots
+            for breaker in probes:
+                breaker.probing = True
+
+    def release(self, host: str, provider: Optional[str], healthy: bool):
+        """
+        Report the outcome of a request allowed by acquire().
+
+        Args:
+            host: Host name
+            provider: Provider key of the host, None if unknown
+            healthy: True if the host answered normally (any status but 5xx/429)
+        """
+        now = self.clock()
+        with self._lock:
+            self._update(self._hosts, host, host, healthy, self.host_threshold, 1, now)
+            if provider:
+                self._update(self._providers, provider, host, healthy,
+                             self.provider_threshold, self.provider_min_hosts, now)
+
+    def is_open(self, host: str, provider: Optional[str] = None) -> bool:
+        """Check whether requests to a host are currently refused."""
+        now = self.clock()
+        with self._lock:
+            for key, breakers in ((host, self._hosts), (provider, self._providers)):
+                breaker = breakers.get(key) if key else None
+                if breaker and breaker.open_until is not None and (now < breaker.open_until or breaker.probing):
+                    return True
+        return False
+
+    def _update(self, breakers: Dict[str, _Breaker], key: str, host: str, healthy: bool,
+                threshold: int, min_hosts: int, now: float):
+        breaker = breakers.get(key)
+        if healthy:
+            # A closed breaker with no failure needs no state
+            if breaker is not None:
+                del breakers[key]
+            return
+
+        if breaker is None:
+            breaker = breakers[key] = _Breaker(self.cooldown)
+        breaker.failures += 1
+        breaker.failed_hosts.add(host)
+
+        if breaker.probing:
+            # Failed probe: open again, for longer
+            breaker.probing = False
+            breaker.cooldown = min(self.max_cooldown, breaker.cooldown * 2)
+            breaker.open_until = now + breaker.cooldown
+        elif breaker.open_until is None and breaker.failures >= threshold and \
+                len(breaker.failed_hosts) >= min_hosts:
+            breaker.open_until = now + breaker.cooldown
+            self.opened += 1
+
+
+def provider_key(address: Optional[str]) -> Optional[str]:
+    """
+    Provider key of an IP address: its /24 (IPv4) or /48 (IPv6) network.
+
+    Args:
+        address: IP address of a host
+
+    Returns:
+        Network in CIDR notation, None if the address is missing or invalid
+    """
+    if not address:
+        return None
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return None
+    prefix = 24 if ip.version == 4 else 48
+    return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
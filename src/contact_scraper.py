@@ -5,23 +5,101 @@ Contact scraper for extracting reservation phone numbers and emails from website
 import re
 import time
 import requests
-from bs4 import BeautifulSoup
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Mapping, Tuple
+from urllib.parse import urlsplit
 try:
-    from .phone_extractor import PhoneExtractor
+    from .phone_extractor import PhoneExtractor, detect_country, resolve_countries
+    from .html_scanner import HtmlScanner, ContactScan
+    from .dns_cache import DnsCache
+    from .adaptive_timeouts import AdaptiveTimeouts
+    from .structured_data import extract_structured_contacts
+    from .circuit_breaker import CircuitBreakers, CircuitOpen, provider_key
+    from .negative_cache import NegativeCache, failure_label
+    from .egress_pool import EgressPool
+    from .page_decoder import decode_body
+    from .site_platforms import EXTRACTORS, PlatformContacts, PlatformStats, fingerprint
+    from .page_archive import PageArchive
 except ImportError:
-    from phone_extractor import PhoneExtractor
+    from phone_extractor import PhoneExtractor, detect_country, resolve_countries
+    from html_scanner import HtmlScanner, ContactScan
+    from dns_cache import DnsCache
+    from adaptive_timeouts import AdaptiveTimeouts
+    from structured_data import extract_structured_contacts
+    from circuit_breaker import CircuitBreakers, CircuitOpen, provider_key
+    from negative_cache import NegativeCache, failure_label
+    from egress_pool import EgressPool
+    from page_decoder import decode_body
+    from site_platforms import EXTRACTORS, PlatformContacts, PlatformStats, fingerprint
+    from page_archive import PageArchive
+
+
+class SiteDeadlineExceeded(requests.exceptions.Timeout):
+    """The whole scrape of a site (attempts, waits, download) took too long."""
+
+
+# User-Agent of every request to the websites (robots.txt included)
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+
+class RetryDeferred(Exception):
+    """A transient failure whose retry is left to the caller, after a delay."""
+
+    def __init__(self, reason: str, delay: float):
+        super().__init__(f"{reason}, retry in {delay:.0f}s")
+        self.reason = reason
+        self.delay = delay
 
 
 class ContactScraper:
     """Scraper for extracting contacts from websites."""
 
-    def __init__(self):
-        self.phone_extractor = PhoneExtractor()
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        self.timeout = 10
+    def __init__(self, dns_cache: Optional[DnsCache] = None, verbose: bool = True,
+                 timeouts: Optional[AdaptiveTimeouts] = None, site_deadline: float = 20.0,
+                 countries: Optional[Iterable[str]] = None,
+                 breakers: Optional[CircuitBreakers] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 egress_pool: Optional[EgressPool] = None,
+                 archive: Optional[PageArchive] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Args:
+            dns_cache: Optional DNS cache used to skip hosts that do not exist
+            verbose: Print status messages (disable when scraping concurrently)
+            timeouts: Per-host timeouts learned from latencies (fixed defaults if None)
+            site_deadline: Maximum time spent on one site, retries included (seconds)
+            countries: Countries whose phone numbers are extracted (default: France);
+                a site's own country, detected from its domain or page, comes first
+            breakers: Circuit breakers per host and provider (new ones if None)
+            negative_cache: Sites known to be unscrapable, skipped (optional)
+            egress_pool: Proxies or source addresses to spread requests over
+                (default: direct connections through self.session)
+            archive: Archive keeping each HTML page downloaded, for offline
+                re-extraction (optional, see reextract.py)
+            session: HTTP session whose keep-alive connections are reused,
+                e.g. shared by the runs of the service (a new one if None)
+        """
+        self.countries = resolve_countries(countries)
+        self.phone_extractor = PhoneExtractor(self.countries)
+        self.scanner = HtmlScanner(self.phone_extractor.phone_pattern, self.phone_extractor.first_chars)
+        # (extractor, scanner) per country list, built on first use
+        self._phone_tools = {self.countries: (self.phone_extractor, self.scanner)}
+        self.dns_cache = dns_cache
+        self.verbose = verbose
+        self.dead_host_skips = 0
+        self.negative_cache = negative_cache
+        self.unscrapable_skips = 0
+        self.structured_hits = 0
+        self.platform_stats = PlatformStats()
+        self.headers = {'User-Agent': USER_AGENT}
+        self.timeouts = timeouts if timeouts is not None else AdaptiveTimeouts()
+        self.site_deadline = site_deadline
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
+
+        # Keep-alive connections, reused across scrapes
+        self.session = session if session is not None else requests.Session()
+        self.egress_pool = egress_pool
+        self.archive = archive
 
         # Keywords to detect reservation phone numbers
         self.reservation_keywords = [
@@ -32,20 +110,37 @@ class ContactScraper:
 
         # Email pattern
         self.email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        self.email_regex = re.compile(self.email_pattern)
+
+        # Generic emails to exclude
+        self.excluded_email_patterns = [
+            'example.com', 'test.com', 'lorem', 'ipsum',
+            'noreply', 'no-reply', 'admin@', 'webmaster@',
+            'user@domain.com', 'email@example.com'
+        ]
 
-    def scrape_contact_info(self, website_url: str) -> Dict[str, Optional[str]]:
+    def scrape_contact_info(self, website_url: str, countries: Optional[Iterable[str]] = None,
+                            retries_left: Optional[int] = None) -> Dict[str, Optional[str]]:
         """
         Scrape a website to extract reservation phone and email.
 
         Args:
             website_url: URL of the website to scrape
+            countries: Countries whose phone numbers are extracted (default: the scraper's)
+            retries_left: None to retry transient failures here, waiting between
+                attempts; otherwise the retries the caller still allows: a transient
+                failure then returns at once with 'retry_after' for the caller to
+                call again later (see HostScheduler)
 
         Returns:
-            Dict with 'reservation_phone' and 'email'
+            Dict with 'reservation_phone', 'email' and 'status'
+            (the status message also printed when verbose), plus 'retry_after'
+            (seconds) for a deferred retry
         """
         result = {
             'reservation_phone': None,
-            'email': None
+            'email': None,
+            'status': None
         }
 
         if not website_url or not website_url.strip():
@@ -56,215 +151,471 @@ class ContactScraper:
             if not website_url.startswith(('http://', 'https://')):
                 website_url = 'https://' + website_url
         except Exception:
-            print("ERROR: Invalid URL")
+            self._report(result, "ERROR: Invalid URL")
             return result
 
+        # Skip domains that do not exist without attempting a connection
+        if self.dns_cache:
+            try:
+                host = urlsplit(website_url).hostname
+            except ValueError:
+                host = None
+            if host and self.dns_cache.is_dead(host):
+                self.dead_host_skips += 1
+                self._report(result, "ERROR: Domain not found (NXDOMAIN)")
+                return result
+
+        # Skip sites that failed in a way that repeats (403, not a page...)
+        if self.negative_cache:
+            failure = self.negative_cache.lookup(website_url)
+            if failure:
+                self.unscrapable_skips += 1
+                self._report(result, f"ERROR: Known unscrapable site ({failure_label(failure)}, skipped)")
+                return result
+
         try:
             # Download page with retry on certain errors
-            response = self._download_page_with_retry(website_url)
+            if retries_left is None:
+                response = self._download_page_with_retry(website_url)
+            else:
+                response = self._download_page_with_retry(website_url, retries_left, defer=True)
             if not response:
                 return result
 
             # Check content-type
             content_type = response.headers.get('content-type', '').lower()
             if 'text/html' not in content_type and 'application/xml' not in content_type:
-                print("ERROR: Non-HTML content")
+                self._remember_failure(website_url, 'non_html')
+                self._report(result, "ERROR: Non-HTML content")
                 return result
 
             # Check response size
             if len(response.content) > 5_000_000:  # 5MB max
-                print("ERROR: Page too large")
+                self._remember_failure(website_url, 'too_large')
+                self._report(result, "ERROR: Page too large")
                 return result
 
-            # Parse HTML with error handling
+            if self.negative_cache:
+                self.negative_cache.forget(website_url)
+
+            if self.archive:
+                self.archive.append_response(website_url, response.status_code, response.headers,
+                                             response.content, final_url=response.url)
+
+            # Decoded once, with the declared charset or UTF-8/cp1252, for all extractors
+            page_text = decode_body(response.content, content_type)
+            return self.extract_contacts(page_text, website_url, countries, response.headers)
+
+        except RetryDeferred as e:
+            result['retry_after'] = e.delay
+            self._report(result, f"{e.reason}, retry deferred ({e.delay:.0f}s)")
+        except CircuitOpen as e:
+            self._report(result, f"ERROR: Circuit open ({e.scope} {e.key})")
+        except SiteDeadlineExceeded:
+            self._remember_failure(website_url, 'timeout')
+            self._report(result, f"ERROR: Site deadline exceeded (>{self.site_deadline:.0f}s)")
+        except requests.exceptions.Timeout:
+            self._remember_failure(website_url, 'timeout')
+            self._report(result, "ERROR: Timeout")
+        except requests.exceptions.ConnectionError:
+            self._report(result, "ERROR: Connection failed")
+        except requests.exceptions.HTTPError as e:
+            status_code = getattr(e.response, 'status_code', 'Unknown')
+            if status_code == 403:
+                self._remember_failure(website_url, 'forbidden')
+                self._report(result, "ERROR: Access forbidden (403)")
+            elif status_code == 404:
+                self._report(result, "ERROR: Page not found (404)")
+            elif status_code == 503:
+                self._report(result, "ERROR: Service unavailable (503)")
+            else:
+                self._report(result, f"ERROR: HTTP {status_code}")
+        except requests.exceptions.TooManyRedirects:
+            self._report(result, "ERROR: Too many redirects")
+        except requests.exceptions.RequestException as e:
+            self._report(result, f"ERROR: Network - {str(e)[:50]}")
+        except Exception as e:
+            self._report(result, f"ERROR: Unexpected - {str(e)[:50]}")
+
+        return result
+
+    def extract_contacts(self, page_text: str, website_url: str = '',
+                         countries: Optional[Iterable[str]] = None,
+                         headers: Optional[Mapping[str, str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Extract reservation phone and email from a downloaded page.
+
+        Args:
+            page_text: HTML of the page
+            website_url: URL of the page, used to detect its country
+            countries: Countries whose phone numbers are extracted (default: the scraper's)
+            headers: Response headers, used to recognize the site's platform (optional)
+
+        Returns:
+            Dict with 'reservation_phone', 'email' and 'status'
+        """
+        start = time.perf_counter()
+        platform = fingerprint(page_text, headers)
+        result, platform_hit = self._extract_contacts(page_text, website_url, countries, platform)
+        self.platform_stats.record(platform, platform_hit, time.perf_counter() - start)
+        return result
+
+    def _extract_contacts(self, page_text: str, website_url: str, countries: Optional[Iterable[str]],
+                          platform: str) -> Tuple[Dict[str, Optional[str]], bool]:
+        """
+        Extract contacts: structured data, then the platform's extractor, then the generic scan.
+
+        Returns:
+            (result, True if the platform's extractor made the generic scan unnecessary)
+        """
+        result = {
+            'reservation_phone': None,
+            'email': None,
+            'status': None
+        }
+
+        phone_extractor, scanner = self._phone_tools_for(website_url, page_text, countries)
+
+        # Contacts declared in structured data (JSON-LD, microdata) come first
+        try:
+            structured = extract_structured_contacts(page_text)
+        except Exception:
+            structured = None
+        if structured:
+            if structured.telephone:
+                result['reservation_phone'] = phone_extractor.clean_phone(structured.telephone) or None
+            if structured.email and self._is_valid_email(structured.email) and \
+                    not any(pattern in structured.email.lower() for pattern in self.excluded_email_patterns):
+                result['email'] = structured.email.lower()
+            if result['reservation_phone'] or result['email']:
+                self.structured_hits += 1
+
+        # Heuristics only for what structured data did not provide
+        if result['reservation_phone'] and result['email']:
+            self._report(result, "OK (structured data)")
+            return result, False
+
+        # Where the site's builder or booking widget puts the contacts
+        extractor = EXTRACTORS.get(platform)
+        if extractor:
             try:
-                soup = BeautifulSoup(response.text, 'html.parser')
-            except Exception as e:
-                print(f"ERROR: HTML parsing - {str(e)[:50]}")
-                return result
+                self._apply_platform_contacts(result, extractor(page_text), phone_extractor)
+            except Exception:
+                pass
+            if result['reservation_phone'] and result['email']:
+                self._report(result, f"OK ({platform})")
+                return result, True
+
+        # Scan the page once for all contact candidates
+        try:
+            scan = scanner.scan(page_text)
+        except Exception as e:
+            self._report(result, f"ERROR: HTML scanning - {str(e)[:50]}")
+            return result, False
 
-            # Extract reservation phone
+        # Extract reservation phone
+        if not result['reservation_phone']:
             try:
-                raw_phone = self._extract_reservation_phone(soup, response.text)
+                raw_phone = self._extract_reservation_phone(scan, phone_extractor)
                 if raw_phone:
-                    cleaned_phone = self.phone_extractor.clean_phone(raw_phone)
+                    cleaned_phone = phone_extractor.clean_phone(raw_phone)
                     if cleaned_phone:
                         result['reservation_phone'] = cleaned_phone
             except Exception as e:
-                print(f"ERROR: Phone extraction: {str(e)[:30]}")
+                self._report(result, f"ERROR: Phone extraction: {str(e)[:30]}")
 
-            # Extract email
+        # Extract email
+        if not result['email']:
             try:
-                extracted_email = self._extract_email(soup, response.text)
+                extracted_email = self._extract_email(scan)
                 if extracted_email:
                     result['email'] = extracted_email
             except Exception as e:
-                print(f"ERROR: Email extraction: {str(e)[:30]}")
+                self._report(result, f"ERROR: Email extraction: {str(e)[:30]}")
 
-            print("OK" if result['reservation_phone'] or result['email'] else "No contact found")
+        self._report(result, "OK" if result['reservation_phone'] or result['email'] else "No contact found")
 
-        except requests.exceptions.Timeout:
-            print("ERROR: Timeout (>10s)")
-        except requests.exceptions.ConnectionError:
-            print("ERROR: Connection failed")
-        except requests.exceptions.HTTPError as e:
-            status_code = getattr(e.response, 'status_code', 'Unknown')
-            if status_code == 403:
-                print("ERROR: Access forbidden (403)")
-            elif status_code == 404:
-                print("ERROR: Page not found (404)")
-            elif status_code == 503:
-                print("ERROR: Service unavailable (503)")
-            else:
-                print(f"ERROR: HTTP {status_code}")
-        except requests.exceptions.TooManyRedirects:
-            print("ERROR: Too many redirects")
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Network - {str(e)[:50]}")
-        except Exception as e:
-            print(f"ERROR: Unexpected - {str(e)[:50]}")
+        return result, False
 
-        # Sleep to avoid overloading servers
-        time.sleep(2)
+    def _apply_platform_contacts(self, result: Dict[str, Optional[str]], contacts: PlatformContacts,
+                                 phone_extractor: PhoneExtractor):
+        """Fill the contacts still missing with the first valid candidates of a platform extractor."""
+        if not result['reservation_phone']:
+            for raw_phone in contacts.phones:
+                cleaned_phone = phone_extractor.clean_phone(raw_phone)
+                if cleaned_phone:
+                    result['reservation_phone'] = cleaned_phone
+                    break
 
-        return result
+        if not result['email']:
+            for email in contacts.emails:
+                email = email.lower()
+                if self._is_valid_email(email) and \
+                        not any(pattern in email for pattern in self.excluded_email_patterns):
+                    result['email'] = email
+                    break
+
+    def _download_page_with_retry(self, url: str, max_retries: int = 2, defer: bool = False):
+        """
+        Download a page with retry on certain errors.
+
+        Timeouts come from the host's latency history, and all attempts,
+        waits and the body download share one site deadline. Every attempt
+        goes through the host's and provider's circuit breakers, so a host
+        that keeps failing stops being retried. With an egress pool, each
+        attempt leaves through the least-loaded egress for the host, and a
+        429 is retried at once through another egress.
+
+        With defer, a retry that needs a wait raises RetryDeferred instead of
+        sleeping: the caller retries later, with a new site deadline, and the
+        worker thread goes on with other sites meanwhile.
+        """
+        try:
+            host = (urlsplit(url).hostname or '').lower()
+        except ValueError:
+            host = ''
+        provider = self._provider(host)
+        deadline = time.monotonic() + self.site_deadline
 
-    def _download_page_with_retry(self, url: str, max_retries: int = 2):
-        """Download a page with retry on certain errors."""
         for attempt in range(max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SiteDeadlineExceeded(f"No time left for {url}")
+            connect_timeout, read_timeout = self.timeouts.timeouts(host)
+            timeout = (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+            self.breakers.acquire(host, provider)
+            egress = self.egress_pool.acquire(host) if self.egress_pool else None
+            session = egress.session if egress else self.session
+            healthy = False
+            outcome = 'failed'
+            switch_egress = False
             try:
-                response = requests.get(
+                response = session.get(
                     url,
                     headers=self.headers,
-                    timeout=self.timeout,
+                    timeout=timeout,
                     allow_redirects=True,
-                    verify=True  # Verify SSL certificates
+                    verify=True,  # Verify SSL certificates
+                    stream=True
                 )
+                self.timeouts.record(host, response.elapsed.total_seconds())
+                outcome = 'rate_limited' if response.status_code == 429 else 'ok'
 
                 # Check for specific retry-able status codes
-                if response.status_code == 503 and attempt < max_retries:
-                    print(f"  Service unavailable, retry {attempt + 1}/{max_retries}...", end=" ")
-                    time.sleep(3)  # Wait before retry
-                    continue
-                elif response.status_code == 429 and attempt < max_retries:  # Rate limit
-                    print(f"  Rate limit, retry {attempt + 1}/{max_retries}...", end=" ")
-                    time.sleep(5)  # Wait longer for rate limits
-                    continue
-
-                response.raise_for_status()
-                return response
-
+                if response.status_code == 503 and attempt < max_retries and self._can_retry(3, deadline, defer):
+                    response.close()
+                    error = requests.exceptions.HTTPError("503 Service Unavailable", response=response)
+                    retry = "Service unavailable", 3  # Wait before retry
+                elif response.status_code == 429 and attempt < max_retries and self._can_retry(5, deadline, defer):
+                    response.close()
+                    error = requests.exceptions.HTTPError("429 Too Many Requests", response=response)
+                    retry = "Rate limit", 5  # Wait longer for rate limits
+                else:
+                    try:
+                        response.raise_for_status()
+                        self._read_body(response, deadline)
+                    except Exception:
+                        response.close()
+                        raise
+                    healthy = True
+                    return response
+
+            except requests.exceptions.HTTPError as e:
+                # 4xx answers come from a working host
+                status_code = getattr(e.response, 'status_code', 500)
+                healthy = status_code < 500 and status_code != 429
+                raise
+            except SiteDeadlineExceeded:
+                raise
             except requests.exceptions.Timeout as e:
-                if attempt < max_retries:
-                    print(f"  Timeout, retry {attempt + 1}/{max_retries}...", end=" ")
-                    time.sleep(2)
-                    continue
+                used = timeout[0] if isinstance(e, requests.exceptions.ConnectTimeout) else timeout[1]
+                self.timeouts.record_timeout(host, used)
+                if attempt < max_retries and self._can_retry(2, deadline, defer):
+                    error, retry = e, ("Timeout", 2)
                 else:
                     raise e
             except requests.exceptions.ConnectionError as e:
-                if attempt < max_retries:
-                    print(f"  Connection failed, retry {attempt + 1}/{max_retries}...", end=" ")
-                    time.sleep(2)
-                    continue
+                if isinstance(e, requests.exceptions.ProxyError):
+                    # The proxy failed, the host was not reached
+                    outcome = 'proxy_failed'
+                    healthy = True
+                if attempt < max_retries and self._can_retry(2, deadline, defer):
+                    error, retry = e, ("Connection failed", 2)
                 else:
                     raise e
+            finally:
+                if egress is not None:
+                    self.egress_pool.release(egress, host, outcome)
+                    # A 429 limits one egress, not the host, while another egress is left
+                    if outcome == 'rate_limited' and self.egress_pool.has_alternative(host):
+                        healthy = switch_egress = True
+                self.breakers.release(host, provider, healthy)
+
+            # A failure that opened a breaker ends the retries: report it as is
+            if self.breakers.is_open(host, provider):
+                raise error
+
+            reason, delay = retry
+            if switch_egress:
+                reason, delay = "Rate limit, switching egress", 0
+            elif defer:
+                raise RetryDeferred(reason, delay)
+            self._log(f"  {reason}, retry {attempt + 1}/{max_retries}...")
+            time.sleep(delay)
 
         return None
 
-    def _extract_reservation_phone(self, soup: BeautifulSoup, html_text: str) -> Optional[str]:
-        """Extract reservation phone number from HTML."""
+    def _provider(self, host: str) -> Optional[str]:
+        """Provider key of a host, from its cached DNS answer (None without DNS cache)."""
+        if not self.dns_cache or not host:
+            return None
+        addresses = self.dns_cache.resolve(host)
+        return provider_key(addresses[0][1]) if addresses else None
+
+    def _can_retry(self, delay: float, deadline: float, deferred: bool = False) -> bool:
+        """
+        Check that a retry after waiting delay seconds still starts before the deadline.
+
+        A deferred retry always can: it gets a deadline of its own.
+        """
+        return deferred or time.monotonic() + delay < deadline
+
+    def _read_body(self, response: requests.Response, deadline: float):
+        """Download a streamed response body, giving up at the deadline."""
+        if hasattr(response.raw, 'read1'):
+            # urllib3 2: return what has arrived instead of waiting for a full chunk
+            stream = iter(lambda: response.raw.read1(65536, decode_content=True), b'')
+        else:
+            stream = response.iter_content(chunk_size=8192)
+
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise SiteDeadlineExceeded(f"Download of {response.url} too slow")
+        response._content = b''.join(chunks)
+
+    def _remember_failure(self, website_url: str, failure: str):
+        """Record a failure that is likely to repeat in the negative cache, if any."""
+        if self.negative_cache:
+            self.negative_cache.record(website_url, failure)
+
+    def _report(self, result: Dict[str, Optional[str]], message: str):
+        """Record the outcome of a scrape and print it if verbose."""
+        result['status'] = message
+        if self.verbose:
+            print(message)
+
+    def _log(self, message: str):
+        """Print an intermediate message (retries) if verbose."""
+        if self.verbose:
+            print(message, end=" ")
+
+    def _extract_reservation_phone(self, scan: ContactScan,
+                                   phone_extractor: Optional[PhoneExtractor] = None) -> Optional[str]:
+        """Extract reservation phone number from scanned candidates."""
+        phone_extractor = phone_extractor or self.phone_extractor
 
         # 1. Search for tel: links as priority
-        tel_links = soup.find_all('a', href=re.compile(r'^tel:'))
-        if tel_links:
-            for link in tel_links:
-                phone = link['href'].replace('tel:', '').strip()
-                cleaned_phone = self.phone_extractor.clean_phone(phone)
-                if cleaned_phone:
-                    return cleaned_phone
+        for link in scan.tel_links:
+            cleaned_phone = phone_extractor.clean_phone(link.value)
+            if cleaned_phone:
+                return cleaned_phone
 
         # 2. Search for phone numbers near reservation keywords
-        reservation_phone = self._find_phone_near_keywords(html_text)
+        reservation_phone = self._find_phone_near_keywords(scan)
         if reservation_phone:
             return reservation_phone
 
-        # 3. Fallback: take the first French phone number found
-        phones = self.phone_extractor.extract_phones(html_text)
-        if phones:
-            return phones[0]
+        # 3. Fallback: take the first phone number found
+        if scan.phones:
+            return scan.phones[0].value
 
         return None
 
-    def _find_phone_near_keywords(self, text: str) -> Optional[str]:
+    def _phone_tools_for(self, website_url: str, page_text: str,
+                         countries: Optional[Iterable[str]] = None) -> Tuple[PhoneExtractor, HtmlScanner]:
+        """
+        Phone extractor and scanner for a site: the site's detected country
+        first, then the requested countries.
+        """
+        countries = resolve_countries(countries) if countries else self.countries
+        detected = detect_country(website_url, page_text)
+        if detected and detected != countries[0]:
+            countries = resolve_countries((detected,) + countries)
+
+        tools = self._phone_tools.get(countries)
+        if tools is None:
+            extractor = PhoneExtractor(countries)
+            # Threads racing here build equivalent tools, the first stored wins
+            tools = self._phone_tools.setdefault(
+                countries, (extractor, HtmlScanner(extractor.phone_pattern, extractor.first_chars))
+            )
+        return tools
+
+    def _find_phone_near_keywords(self, scan: ContactScan) -> Optional[str]:
         """Find a phone number near reservation keywords."""
 
-        # Clean the text
-        text_lower = text.lower()
+        # No candidate anywhere means no candidate near a keyword
+        if not scan.phones:
+            return None
+
+        text_lower = scan.lower_text
+        text_length = len(scan.text)
 
-        # For each reservation keyword
+        # For each reservation keyword, in priority order
         for keyword in self.reservation_keywords:
-            # Find all positions of the keyword
-            keyword_positions = []
-            start = 0
-            while True:
-                pos = text_lower.find(keyword, start)
-                if pos == -1:
-                    break
-                keyword_positions.append(pos)
-                start = pos + 1
-
-            # For each keyword position
-            for pos in keyword_positions:
-                # Extract context around the keyword (200 characters before/after)
-                start_context = max(0, pos - 200)
-                end_context = min(len(text), pos + 200)
-                context = text[start_context:end_context]
-
-                # Search for phone numbers in this context
-                phones = self.phone_extractor.extract_phones(context)
+            pos = text_lower.find(keyword)
+            while pos != -1:
+                # Phone candidates within 200 characters before/after
+                phones = scan.phones_in_window(max(0, pos - 200), min(text_length, pos + 200))
                 if phones:
                     return phones[0]  # Take the first phone number found
+                pos = text_lower.find(keyword, pos + 1)
 
         return None
 
-    def _extract_email(self, soup: BeautifulSoup, html_text: str) -> Optional[str]:
-        """Extract email address from HTML."""
+    def _extract_email(self, scan: ContactScan) -> Optional[str]:
+        """Extract email address from scanned candidates."""
 
         # 1. Search for mailto: links as priority
-        mailto_links = soup.find_all('a', href=re.compile(r'^mailto:'))
-        if mailto_links:
-            email = mailto_links[0]['href'].replace('mailto:', '').strip()
-            # Clean email (remove parameters like ?subject=...)
-            email = email.split('?')[0]
+        if scan.mailto_links:
+            email = scan.mailto_links[0].value
             if self._is_valid_email(email):
                 return email
 
-        # 2. Search with regex in text
-        emails = re.findall(self.email_pattern, html_text)
-
-        # Filter valid emails and exclude generic ones
-        valid_emails = []
-        excluded_patterns = [
-            'example.com', 'test.com', 'lorem', 'ipsum',
-            'noreply', 'no-reply', 'admin@', 'webmaster@',
-            'user@domain.com', 'email@example.com'
-        ]
-
-        for email in emails:
-            email = email.lower()
-            if self._is_valid_email(email):
-                # Exclude generic emails
-                if not any(pattern in email for pattern in excluded_patterns):
-                    valid_emails.append(email)
+        # 2. Email candidates in page order, excluding generic ones
+        for candidate in scan.emails:
+            email = candidate.value.lower()
+            if self._is_valid_candidate(email):
+                if not any(pattern in email for pattern in self.excluded_email_patterns):
+                    return email
 
-        return valid_emails[0] if valid_emails else None
+        return None
 
     def _is_valid_email(self, email: str) -> bool:
         """Check if email is valid."""
         if not email or len(email) > 254:
             return False
 
-        return re.match(self.email_pattern, email) is not None
+        return self.email_regex.match(email) is not None
+
+    def _is_valid_candidate(self, email: str) -> bool:
+        """
+        Check an email candidate already matched by the email pattern.
+
+        Equivalent to _is_valid_email() without running the regex again:
+        a match re-checked alone only fails on its leading word boundary,
+        or on its trailing one when the TLD ends with '|'.
+        """
+        if len(email) > 254 or email[0] in '.%+-':
+            return False
+
+        if email[-1] == '|':
+            return self.email_regex.match(email) is not None
+
+        return True
 
 
 # For testing
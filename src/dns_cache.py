@@ -0,0 +1,284 @@
+"""
+DNS resolution cache for the scraping stage.
+
+Resolves website hosts concurrently as soon as they are known, caches
+the answers with their TTLs and remembers hosts that do not exist
+(NXDOMAIN) so that they are skipped without attempting a connection.
+
+TTLs come from the DNS answer when dnspython is installed; otherwise the
+system resolver is used with a default TTL.
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import dns.exception
+    import dns.resolver
+    HAS_DNSPYTHON = True
+except ImportError:
+    HAS_DNSPYTHON = False
+
+
+# The system resolver, as it was before any cache hooked socket.getaddrinfo
+_SYSTEM_GETADDRINFO = socket.getaddrinfo
+
+# One hook serves every installed cache, newest first; it goes when the last one is uninstalled
+_installed: List['DnsCache'] = []
+_previous_getaddrinfo = _SYSTEM_GETADDRINFO
+_hook_lock = threading.Lock()
+
+
+class DnsEntry:
+    """Cached DNS answer for a host."""
+
+    def __init__(self, addresses: List[Tuple[int, str]], ttl: float, dead: bool = False):
+        self.addresses = addresses  # (family, ip) pairs
+        self.dead = dead
+        self.expires_at = time.monotonic() + ttl
+
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+class DnsCache:
+    """Concurrent DNS resolver with TTL cache and dead host detection."""
+
+    # Host that always resolves, used to tell NXDOMAIN from a broken resolver
+    CANARY_HOST = "www.google.com"
+
+    def __init__(self, max_workers: int = 16, default_ttl: float = 300,
+                 dead_ttl: float = 600, min_ttl: float = 30):
+        """
+        Args:
+            max_workers: Number of concurrent resolutions
+            default_ttl: TTL when the resolver does not provide one (seconds)
+            dead_ttl: How long an NXDOMAIN host stays marked as dead (seconds)
+            min_ttl: Lower bound for TTLs taken from DNS answers (seconds)
+        """
+        self.default_ttl = default_ttl
+        self.dead_ttl = dead_ttl
+        self.min_ttl = min_ttl
+
+        self._entries: Dict[str, DnsEntry] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dns")
+        self._resolver_healthy: Optional[bool] = None
+
+        self.lookups = 0
+        self.cache_hits = 0
+
+    def prefetch(self, hosts: Iterable[str]):
+        """
+        Start resolving hosts in the background (non-blocking).
+
+        Args:
+            hosts: Host names to resolve
+        """
+        for host in hosts:
+            self._submit(host)
+
+    def resolve(self, host: str) -> Optional[List[Tuple[int, str]]]:
+        """
+        Resolve a host, waiting for a pending prefetch if any.
+
+        Args:
+            host: Host name
+
+        Returns:
+            List of (family, ip) pairs, None if the host could not be resolved
+        """
+        entry = self._get_entry(host)
+        if not entry or entry.dead or not entry.addresses:
+            return None
+        return entry.addresses
+
+    def is_dead(self, host: str) -> bool:
+        """
+        Check whether a host does not exist (NXDOMAIN).
+
+        Args:
+            host: Host name
+
+        Returns:
+            True if the host is known not to exist
+        """
+        entry = self._get_entry(host)
+        return bool(entry and entry.dead)
+
+    def install(self):
+        """
+        Serve cached answers to socket.getaddrinfo (used by requests).
+
+        Caches of concurrent runs share one process-wide hook, so they can
+        be installed and uninstalled in any order.
+        """
+        global _previous_getaddrinfo
+        with _hook_lock:
+            if self in _installed:
+                return
+            if not _installed and socket.getaddrinfo is not _getaddrinfo:
+                _previous_getaddrinfo = socket.getaddrinfo
+                socket.getaddrinfo = _getaddrinfo
+            _installed.insert(0, self)
+
+    def uninstall(self):
+        """Stop serving cached answers; the last cache out restores socket.getaddrinfo."""
+        with _hook_lock:
+            if self not in _installed:
+                return
+            _installed.remove(self)
+            # Left alone if something else replaced the hook since
+            if not _installed and socket.getaddrinfo is _getaddrinfo:
+                socket.getaddrinfo = _previous_getaddrinfo
+
+    def close(self):
+        """Uninstall the resolver hook and stop background workers."""
+        self.uninstall()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, host: str) -> Optional[Future]:
+        """Schedule a resolution unless the host is cached or pending."""
+        host = (host or '').strip().lower().rstrip('.')
+        if not host:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and not entry.is_expired():
+                return None
+            future = self._pending.get(host)
+            if future:
+                return future
+            future = self._executor.submit(self._lookup, host)
+            self._pending[host] = future
+            return future
+
+    def _get_entry(self, host: str) -> Optional[DnsEntry]:
+        """Return a fresh entry for host, resolving it if needed."""
+        host = (host or '').strip().lower().rstrip('.')
+        if not host:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and not entry.is_expired():
+                self.cache_hits += 1
+                return entry
+
+        future = self._submit(host)
+        if future:
+            try:
+                future.result()
+            except Exception:
+                return None
+
+        with self._lock:
+            return self._entries.get(host)
+
+    def _lookup(self, host: str):
+        """Resolve a host and store the answer (runs in a worker)."""
+        try:
+            addresses, ttl, dead = self._query(host)
+            with self._lock:
+                self.lookups += 1
+                self._entries[host] = DnsEntry(addresses, ttl, dead)
+        finally:
+            with self._lock:
+                self._pending.pop(host, None)
+
+    def _query(self, host: str) -> Tuple[List[Tuple[int, str]], float, bool]:
+        """Query DNS for a host: (addresses, ttl, dead)."""
+        if HAS_DNSPYTHON:
+            addresses = []
+            ttls = []
+            for record_type, family in (('A', socket.AF_INET), ('AAAA', socket.AF_INET6)):
+                try:
+                    answer = dns.resolver.resolve(host, record_type)
+                    addresses.extend((family, record.to_text()) for record in answer)
+                    ttls.append(answer.rrset.ttl)
+                except dns.resolver.NXDOMAIN:
+                    return [], self.dead_ttl, True
+                except (dns.resolver.NoAnswer, dns.exception.DNSException):
+                    continue
+            if addresses:
+                return addresses, max(self.min_ttl, min(ttls)), False
+
+        # System resolver (no TTL available)
+        try:
+            infos = self._system_getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_NONAME and self._resolver_is_healthy():
+                return [], self.dead_ttl, True
+            # Temporary failure: do not cache for long
+            return [], self.min_ttl, False
+
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if (family, sockaddr[0]) not in addresses:
+                addresses.append((family, sockaddr[0]))
+        return addresses, self.default_ttl, False
+
+    def _resolver_is_healthy(self) -> bool:
+        """
+        Check once that the system resolver answers for a known host.
+
+        Offline machines report every name as unknown; hosts must not be
+        marked as dead in that case.
+        """
+        if self._resolver_healthy is None:
+            try:
+                self._system_getaddrinfo(self.CANARY_HOST, None, 0, socket.SOCK_STREAM)
+                self._resolver_healthy = True
+            except socket.gaierror:
+                self._resolver_healthy = False
+        return self._resolver_healthy
+
+    def _system_getaddrinfo(self, *args, **kwargs):
+        """Call the real getaddrinfo, even when the hook is installed."""
+        return _SYSTEM_GETADDRINFO(*args, **kwargs)
+
+    def _cached_getaddrinfo(self, host: str, port, family: int, type: int, proto: int, flags: int) -> list:
+        """getaddrinfo results from the cached addresses of host (empty if none are fresh)."""
+        with self._lock:
+            entry = self._entries.get(host.lower().rstrip('.'))
+        if not entry or entry.is_expired() or not entry.addresses:
+            return []
+
+        results = []
+        for address_family, ip in entry.addresses:
+            if family not in (0, socket.AF_UNSPEC, address_family):
+                continue
+            results.extend(_SYSTEM_GETADDRINFO(ip, port, address_family, type, proto,
+                                               flags | socket.AI_NUMERICHOST))
+        if results:
+            self.cache_hits += 1
+        return results
+
+
+def _getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """socket.getaddrinfo replacement serving the addresses cached by the installed caches."""
+    if isinstance(host, str):
+        for cache in list(_installed):
+            results = cache._cached_getaddrinfo(host, port, family, type, proto, flags)
+            if results:
+                return results
+
+    return _previous_getaddrinfo(host, port, family, type, proto, flags)
+
+
+if __name__ == "__main__":
+    cache = DnsCache()
+    test_hosts = ["example.com", "www.python.org", "this-domain-does-not-exist-prospector.fr"]
+
+    start = time.perf_counter()
+    cache.prefetch(test_hosts)
+    for test_host in test_hosts:
+        status = "DEAD" if cache.is_dead(test_host) else cache.resolve(test_host)
+        print(f"{test_host}: {status}")
+    print(f"Resolved {len(test_hosts)} hosts in {time.perf_counter() - start:.2f}s")
+    cache.close()
@@ -0,0 +1,295 @@
+"""
+Pool of egresses (outbound proxies or local source addresses) for the scraper.
+
+Booking platforms and hosting providers rate limit by client IP, so a
+single scraping box hits 429 answers long before it runs out of bandwidth.
+With several egresses, each request to a host goes out through the
+least-loaded healthy egress for that host: the one with the fewest
+requests in flight and in the recent window for the host. An egress that
+a host answers 429 is set aside for that host only, for a backoff, and
+an egress that keeps failing is set aside for every host until its
+cooldown ends or a health check finds it working again.
+"""
+
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SourceAddressAdapter(HTTPAdapter):
+    """HTTP adapter whose connections leave from a given local address."""
+
+    def __init__(self, source_address: str, **kwargs):
+        self.source_address = source_address
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['source_address'] = (self.source_address, 0)
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Egress:
+    """One way out: a proxy, a local source address, or the default route."""
+
+    def __init__(self, proxy: Optional[str] = None, source_address: Optional[str] = None):
+        """
+        Args:
+            proxy: Proxy URL (http://, https:// or socks5:// with requests[socks])
+            source_address: Local IP address connections are bound to
+        """
+        self.proxy = proxy
+        self.source_address = source_address
+        self.name = proxy or source_address or 'direct'
+
+        # Keep-alive connections through this egress
+        self.session = requests.Session()
+        if proxy:
+            self.session.proxies = {'http': proxy, 'https': proxy}
+        if source_address:
+            adapter = SourceAddressAdapter(source_address)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+        self.requests = 0        # Requests sent
+        self.rate_limited = 0    # 429 answers
+        self.failures = 0        # Failed requests (connection errors, timeouts)
+        self.in_flight = 0
+
+        self._in_flight_hosts: Dict[str, int] = {}
+        self._recent: Dict[str, Deque[float]] = {}        # Request times per host
+        self._limited_until: Dict[str, float] = {}        # Per host, after a 429
+        self._consecutive_failures = 0
+        self._failed_hosts: Set[str] = set()
+        self.down_until: Optional[float] = None
+
+    def is_healthy(self, now: float) -> bool:
+        return self.down_until is None or now >= self.down_until
+
+    def probe(self, timeout: float = 3.0) -> bool:
+        """
+        Health check: the proxy accepts connections, or the source address
+        can be bound on this machine.
+        """
+        try:
+            if self.proxy:
+                parts = urlsplit(self.proxy)
+                default_port = 443 if parts.scheme == 'https' else 1080 if parts.scheme.startswith('socks') else 80
+                with socket.create_connection((parts.hostname, parts.port or default_port), timeout=timeout):
+                    pass
+            elif self.source_address:
+                family = socket.AF_INET6 if ':' in self.source_address else socket.AF_INET
+                with socket.socket(family, socket.SOCK_STREAM) as sock:
+                    sock.bind((self.source_address, 0))
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+def parse_egress(spec: str) -> Egress:
+    """
+    Build an egress from its command-line form.
+
+    Args:
+        spec: Proxy URL ('http://10.0.0.2:3128', 'socks5://host:1080'),
+            local source address ('192.0.2.10', '2001:db8::10') or 'direct'
+
+    Returns:
+        Egress
+
+    Raises:
+        ValueError: If the spec is neither a proxy URL nor an IP address
+    """
+    spec = spec.strip()
+    if spec == 'direct':
+        return Egress()
+    if '://' in spec:
+        if not urlsplit(spec).hostname:
+            raise ValueError(f"Invalid proxy URL: {spec}")
+        return Egress(proxy=spec)
+    try:
+        socket.inet_pton(socket.AF_INET6 if ':' in spec else socket.AF_INET, spec)
+    except OSError:
+        raise ValueError(f"Invalid egress: {spec} (expected a proxy URL, an IP address or 'direct')")
+    return Egress(source_address=spec)
+
+
+class EgressPool:
+    """Egresses shared by concurrent scrapes, with per-host load accounting."""
+
+    def __init__(self, egresses: Iterable[Egress], window: float = 60.0, rate_limit_backoff: float = 60.0,
+                 max_failures: int = 3, min_failed_hosts: int = 2, cooldown: float = 120.0):
+        """
+        Args:
+            egresses: Egresses of the pool (at least one)
+            window: Period over which requests per host are counted (seconds)
+            rate_limit_backoff: Time an egress is not used for a host after a 429 (seconds)
+            max_failures: Consecutive failures that take an egress out of the pool
+            min_failed_hosts: Distinct failing hosts needed, so one dead site does not
+                take an egress out
+            cooldown: Time a failing egress stays out of the pool (seconds)
+        """
+        self.egresses: List[Egress] = list(egresses)
+        if not self.egresses:
+            raise ValueError("An egress pool needs at least one egress")
+        self.window = window
+        self.rate_limit_backoff = rate_limit_backoff
+        self.max_failures = max_failures
+        self.min_failed_hosts = min_failed_hosts
+        self.cooldown = cooldown
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_specs(cls, specs: Iterable[str], **kwargs) -> 'EgressPool':
+        """Pool of the egresses given on the command line (see parse_egress)."""
+        return cls([parse_egress(spec) for spec in specs], **kwargs)
+
+    def acquire(self, host: str) -> Egress:
+        """
+        Choose the egress of a request to a host and count the request.
+
+        Healthy egresses not rate limited by the host come first, then the
+        fewest requests in flight to the host, in the recent window for
+        the host, and in flight overall. When every egress is out of the
+        pool the least recently failed one is used anyway: the circuit
+        breakers decide whether the host is worth a request.
+
+        Args:
+            host: Host name of the request
+
+        Returns:
+            Egress to send the request through; release() it afterwards
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept_at > self.window:
+                self._sweep(now)
+
+            candidates = [egress for egress in self.egresses if egress.is_healthy(now)]
+            if not candidates:
+                candidates = [min(self.egresses, key=lambda egress: egress.down_until)]
+
+            egress = min(candidates, key=lambda egress: (
+                egress._limited_until.get(host, 0) > now,
+                egress._in_flight_hosts.get(host, 0),
+                self._recent_count(egress, host, now),
+                egress.in_flight,
+                egress.requests,
+            ))
+
+            egress.requests += 1
+            egress.in_flight += 1
+            egress._in_flight_hosts[host] = egress._in_flight_hosts.get(host, 0) + 1
+            egress._recent.setdefault(host, deque()).append(now)
+            return egress
+
+    def release(self, egress: Egress, host: str, outcome: str):
+        """
+        Report the outcome of a request sent through an egress.
+
+        Args:
+            egress: Egress returned by acquire()
+            host: Host name of the request
+            outcome: 'ok' (any answer but 429), 'rate_limited' (429),
+                'failed' (no answer) or 'proxy_failed' (the proxy itself failed)
+        """
+        now = time.monotonic()
+        with self._lock:
+            egress.in_flight -= 1
+            count = egress._in_flight_hosts.get(host, 0) - 1
+            if count > 0:
+                egress._in_flight_hosts[host] = count
+            else:
+                egress._in_flight_hosts.pop(host, None)
+
+            if outcome == 'ok':
+                egress._limited_until.pop(host, None)
+                egress._consecutive_failures = 0
+                egress._failed_hosts.clear()
+                egress.down_until = None
+            elif outcome == 'rate_limited':
+                egress.rate_limited += 1
+                egress._limited_until[host] = now + self.rate_limit_backoff
+            else:
+                egress.failures += 1
+                egress._consecutive_failures += 1
+                egress._failed_hosts.add(host)
+                # A failing proxy is the egress's fault; failing sites only when several fail in a row
+                if outcome == 'proxy_failed' or (
+                        egress._consecutive_failures >= self.max_failures
+                        and len(egress._failed_hosts) >= self.min_failed_hosts):
+                    egress.down_until = now + self.cooldown
+
+    def has_alternative(self, host: str) -> bool:
+        """Check whether a healthy egress is not rate limited by a host."""
+        now = time.monotonic()
+        with self._lock:
+            return any(egress.is_healthy(now) and egress._limited_until.get(host, 0) <= now
+                       for egress in self.egresses)
+
+    def check_health(self, timeout: float = 3.0) -> Dict[str, bool]:
+        """
+        Probe every egress and take the failing ones out of the pool.
+
+        Args:
+            timeout: Connection timeout of each probe (seconds)
+
+        Returns:
+            Health of each egress, by name
+        """
+        health = {egress.name: egress.probe(timeout) for egress in self.egresses}
+        now = time.monotonic()
+        with self._lock:
+            for egress in self.egresses:
+                if health[egress.name]:
+                    egress.down_until = None
+                    egress._consecutive_failures = 0
+                    egress._failed_hosts.clear()
+                else:
+                    egress.down_until = now + self.cooldown
+        return health
+
+    def stats(self) -> List[Dict]:
+        """Requests, 429 answers and failures of each egress."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {'egress': egress.name, 'requests': egress.requests, 'rate_limited': egress.rate_limited,
+                 'failures': egress.failures, 'healthy': egress.is_healthy(now)}
+                for egress in self.egresses
+            ]
+
+    def close(self):
+        for egress in self.egresses:
+            egress.close()
+
+    def _sweep(self, now: float):
+        """Forget the hosts no longer counted, so long runs keep a bounded state."""
+        for egress in self.egresses:
+            for host in list(egress._recent):
+                self._recent_count(egress, host, now)
+            for host, until in list(egress._limited_until.items()):
+                if until <= now:
+                    del egress._limited_until[host]
+        self._swept_at = now
+
+    def _recent_count(self, egress: Egress, host: str, now: float) -> int:
+        """Requests to a host through an egress in the window, dropping older ones."""
+        times = egress._recent.get(host)
+        if not times:
+            return 0
+        while times and times[0] <= now - self.window:
+            times.popleft()
+        if not times:
+            del egress._recent[host]
+            return 0
+        return len(times)
@@ -1,13 +1,45 @@
 #!/usr/bin/env python3
 """
-Exporter - Export prospecting data to CSV and JSON
+Exporter - Export prospecting data to CSV and JSON, full or as a delta,
+and to Parquet or Arrow IPC when pyarrow is installed
 """
 
 import csv
+import hashlib
 import json
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+try:
+    from .phone_extractor import PHONE_FORMATS, PhoneExtractor
+except ImportError:
+    from phone_extractor import PHONE_FORMATS, PhoneExtractor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Change-set operations of a delta export
+DELTA_OPERATIONS = ('add', 'change', 'remove')
+
+# Columnar export formats (pyarrow required), with their file extension
+COLUMNAR_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+# E.164 columns, derived from the phone column they name
+E164_COLUMNS = {'google_phone_e164': 'google_phone', 'reservation_phone_e164': 'reservation_phone'}
+
+# Text columns of a columnar export, besides the typed rating, reviews and type
+COLUMNAR_TEXT_FIELDS = ['place_id', 'name', 'address', 'google_phone', 'google_phone_e164',
+                        'reservation_phone', 'reservation_phone_e164', 'email', 'website']
+
+# Phones are exported in international format: every country's calling code is recognized
+_E164_EXTRACTOR = PhoneExtractor(PHONE_FORMATS)
+
 
 class Exporter:
     """Class to export prospecting data to CSV and JSON"""
@@ -22,7 +54,9 @@ class Exporter:
             'website',
             'rating',
             'reviews',
-            'type'
+            'type',
+            # Last, so that the columns above keep their position
+            *E164_COLUMNS
         ]
 
     def export_csv(self, data: List[Dict[str, Any]], filename: str) -> bool:
@@ -45,20 +79,7 @@ class Exporter:
                 writer.writeheader()
 
                 for item in data:
-                    # Prepare data with default values
-                    row = {}
-                    for header in self.csv_headers:
-                        value = item.get(header, '')
-
-                        # Convert special values
-                        if header == 'rating' and value:
-                            row[header] = f"{value:.1f}"
-                        elif header == 'reviews' and value:
-                            row[header] = str(value)
-                        else:
-                            row[header] = str(value) if value else ''
-
-                    writer.writerow(row)
+                    writer.writerow(self._csv_row(item))
 
             print(f"OK: CSV export successful: {filename} ({len(data)} entries)")
             return True
@@ -89,7 +110,7 @@ class Exporter:
                     "export_timestamp": None,  # Will be added by CLI
                     "export_type": "prospection_hotels_restaurants"
                 },
-                "establishments": data
+                "establishments": [{**item, **e164_fields(item)} for item in data]
             }
 
             with open(filepath, 'w', encoding='utf-8') as jsonfile:
@@ -102,6 +123,233 @@ class Exporter:
             print(f"ERROR: JSON export failed: {e}")
             return False
 
+    def export_delta(self, data: List[Dict[str, Any]], filename: str, state_file: str,
+                     delta_format: str = "csv", query: str = "", limit: Optional[int] = None,
+                     complete: bool = True) -> Optional[Dict[str, int]]:
+        """
+        Export only the records added, changed or removed since the last delta export of the same query
+
+        The exported fields of each record are kept per place_id in state_file,
+        separately for each query (city and type searched); the first delta
+        export of a query adds every record. Fields the run did not learn
+        (see unknown_fields) keep their previous value instead of coming out
+        blank as a change. Records missing from the run are only removed when
+        the run is complete and searched at least as many places as the
+        previous one; otherwise they stay in the state as they were. The
+        state is updated once the change set is written.
+
+        Args:
+            data: List of establishments with their info
+            filename: Output filename (with .csv or .ndjson)
+            state_file: JSON file holding the records of the previous exports
+            delta_format: "csv" or "ndjson"
+            query: Search the records come from, each query with its own state
+            limit: Maximum number of places of the search (None for no limit)
+            complete: False for a run stopped early (time budget, interrupted): nothing is removed
+
+        Returns:
+            dict: Number of records per operation plus "unchanged", None if the export failed
+        """
+        if delta_format not in ("csv", "ndjson"):
+            print(f"ERROR: Delta export failed: unknown format {delta_format}")
+            return None
+
+        try:
+            queries = self._load_delta_state(state_file)
+            previous_state = queries.get(query)
+            previous = previous_state['records'] if previous_state else {}
+
+            current = {}
+            changes = []
+            counts = {operation: 0 for operation in DELTA_OPERATIONS}
+            counts['unchanged'] = 0
+            for item in data:
+                place_id = item.get('place_id')
+                if not place_id or place_id in current:
+                    continue
+                row = self._csv_row(item)
+                old_row = previous.get(place_id)
+                if old_row is not None:
+                    for field in self.unknown_fields(item):
+                        row[field] = old_row.get(field, '')
+                    row.update(e164_fields(row))
+                current[place_id] = row
+
+                if old_row is None:
+                    operation = 'add'
+                elif self.record_fingerprint(old_row) != self.record_fingerprint(row):
+                    operation = 'change'
+                else:
+                    counts['unchanged'] += 1
+                    continue
+                counts[operation] += 1
+                changes.append({'operation': operation, 'place_id': place_id, **row})
+
+            # A place is only gone if this run searched at least as far as the previous one
+            previous_limit = previous_state.get('limit') if previous_state else None
+            covers = limit is None or (previous_limit is not None and limit >= previous_limit)
+            missing = [place_id for place_id in previous if place_id not in current]
+            if not previous_state or (complete and covers):
+                new_limit = limit
+                for place_id in missing:
+                    counts['remove'] += 1
+                    # Removed records only carry their key
+                    changes.append({'operation': 'remove', 'place_id': place_id})
+            else:
+                new_limit = previous_limit
+                for place_id in missing:
+                    current[place_id] = previous[place_id]
+
+            filepath = Path(filename)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            with open(filepath, 'w', newline='', encoding='utf-8') as delta_file:
+                if delta_format == "csv":
+                    writer = csv.DictWriter(delta_file, fieldnames=['operation', 'place_id'] + self.csv_headers)
+                    writer.writeheader()
+                    writer.writerows(changes)
+                else:
+                    for change in changes:
+                        delta_file.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+            queries[query] = {'limit': new_limit, 'export_timestamp': time.time(), 'records': current}
+            self._save_delta_state(state_file, queries)
+
+            kept = f", {len(missing)} kept (run incomplete or narrower)" if missing and not counts['remove'] else ""
+            print(f"OK: Delta export successful: {filename} ({counts['add']} added, "
+                  f"{counts['change']} changed, {counts['remove']} removed, {counts['unchanged']} unchanged{kept})")
+            return counts
+
+        except Exception as e:
+            print(f"ERROR: Delta export failed: {e}")
+            return None
+
+    def unknown_fields(self, item: Dict[str, Any]) -> List[str]:
+        """
+        Exported fields a run left blank without learning them
+
+        Google fields are unknown when the place's details were not fetched
+        (API budget, run stopped), contacts when its website was not scraped
+        to the end (scraping disabled or stopped, site down, disallowed...).
+        Records without these markers are taken as fully known.
+
+        Args:
+            item: Record as built by the pipeline
+
+        Returns:
+            list: Field names whose previous value stands
+        """
+        if item.get('details_fetched') is False:
+            return ['google_phone', 'website', 'reservation_phone', 'email']
+        status = item.get('scrape_status')
+        if item.get('website') and status is not None and not (status.startswith('OK') or status == 'No contact found'):
+            return ['reservation_phone', 'email']
+        return []
+
+    def record_fingerprint(self, row: Dict[str, str]) -> str:
+        """
+        Fingerprint of an exported row
+
+        The E.164 columns are left out: they follow from the phone columns,
+        and states saved without them keep their fingerprints.
+
+        Args:
+            row: Row as written to CSV (see _csv_row)
+
+        Returns:
+            str: Hex digest, equal for rows with equal exported fields
+        """
+        payload = json.dumps([row.get(header, '') for header in self.csv_headers if header not in E164_COLUMNS],
+                             ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _csv_row(self, item: Dict[str, Any]) -> Dict[str, str]:
+        """Prepare a record for CSV, with default values"""
+        row = {}
+        for header in self.csv_headers:
+            value = item.get(header, '')
+
+            # Convert special values
+            if header == 'rating' and value:
+                row[header] = f"{value:.1f}"
+            elif header == 'reviews' and value:
+                row[header] = str(value)
+            elif header in E164_COLUMNS:
+                row[header] = _E164_EXTRACTOR.to_e164(row[E164_COLUMNS[header]])
+            else:
+                row[header] = str(value) if value else ''
+        return row
+
+    def _load_delta_state(self, state_file: str) -> Dict[str, Dict[str, Any]]:
+        """State of the previous delta exports per query (empty if none)"""
+        filepath = Path(state_file)
+        if not filepath.exists():
+            return {}
+        with open(filepath, 'r', encoding='utf-8') as state:
+            content = json.load(state)
+        if 'queries' not in content:
+            # Fingerprints only, without the query they came from
+            print(f"WARNING: Delta state {state_file} from a previous version ignored, records exported as added")
+            return {}
+        queries = content['queries']
+        if not isinstance(queries, dict):
+            raise ValueError(f"invalid state file {state_file}")
+        return queries
+
+    def _save_delta_state(self, state_file: str, queries: Dict[str, Dict[str, Any]]):
+        """Replace the delta state atomically"""
+        filepath = Path(state_file)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = filepath.with_suffix(filepath.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as state:
+            json.dump({'export_timestamp': time.time(), 'queries': queries}, state, ensure_ascii=False)
+        tmp_path.replace(filepath)
+
+    def export_columnar(self, data: List[Dict[str, Any]], filename: str,
+                        columnar_format: str = "parquet") -> bool:
+        """
+        Export data to Parquet or Arrow IPC, with typed columns (see ColumnarWriter)
+
+        Args:
+            data: List of establishments with their info
+            filename: Output filename (with .parquet or .arrow)
+            columnar_format: "parquet" or "arrow"
+
+        Returns:
+            bool: True if export succeeded
+        """
+        try:
+            with ColumnarWriter(filename, columnar_format) as writer:
+                for item in data:
+                    writer.write(item)
+
+            print(f"OK: {columnar_format.capitalize()} export successful: {filename} ({len(data)} entries)")
+            return True
+
+        except Exception as e:
+            print(f"ERROR: {columnar_format.capitalize()} export failed: {e}")
+            return False
+
+    def finish_columnar(self, writer: 'ColumnarWriter') -> bool:
+        """
+        Close a columnar export fed record by record as the run went
+
+        Args:
+            writer: ColumnarWriter holding the records
+
+        Returns:
+            bool: True if export succeeded
+        """
+        label = writer.columnar_format.capitalize()
+        try:
+            count = writer.close()
+            print(f"OK: {label} export successful: {writer.filename} ({count} entries)")
+            return True
+
+        except Exception as e:
+            writer.abort()
+            print(f"ERROR: {label} export failed: {e}")
+            return False
+
     def export_both(self, data: List[Dict[str, Any]], base_filename: str) -> Dict[str, bool]:
         """
         Export data to both CSV and JSON
@@ -149,6 +397,138 @@ class Exporter:
         return errors
 
 
+class ColumnarWriter:
+    """
+    Streaming Parquet / Arrow IPC writer, one row group per chunk of records
+
+    Records are buffered and written every row_group_size records, so a
+    large run is exported as it arrives with flat memory. Columns are
+    typed: float rating, integer reviews, categorical (dictionary) type.
+    The file appears under its name once closed.
+    """
+
+    def __init__(self, filename: str, columnar_format: str = "parquet", row_group_size: int = 10_000):
+        """
+        Args:
+            filename: Output filename (with .parquet or .arrow)
+            columnar_format: "parquet" or "arrow" (Arrow IPC file)
+            row_group_size: Records per row group (record batch for Arrow)
+
+        Raises:
+            ValueError: Unknown format
+            ImportError: pyarrow is not installed
+        """
+        if columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"unknown columnar format {columnar_format}")
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is required for columnar export (pip install pyarrow)")
+
+        self.filename = filename
+        self.columnar_format = columnar_format
+        self.row_group_size = max(1, row_group_size)
+        self.count = 0
+        self.schema = pa.schema(
+            [(field, pa.string()) for field in COLUMNAR_TEXT_FIELDS]
+            + [('rating', pa.float64()), ('reviews', pa.int64()),
+               ('type', pa.dictionary(pa.int8(), pa.string()))]
+        )
+
+        self._filepath = Path(filename)
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self._filepath.with_suffix(self._filepath.suffix + '.tmp')
+        if columnar_format == "parquet":
+            self._writer = pq.ParquetWriter(str(self._tmp_path), self.schema)
+        else:
+            # Arrow IPC files only accept a dictionary that grows by deltas
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(str(self._tmp_path), self.schema, options=options)
+        self._buffer: List[Dict[str, Any]] = []
+        self._categories: Dict[str, int] = {}   # Dictionary of the type column, in order of appearance
+
+    def write(self, record: Dict[str, Any]):
+        """Add a record, writing a row group when the buffer is full"""
+        self._buffer.append({**record, **e164_fields(record)})
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> int:
+        """
+        Write the last row group and publish the file
+
+        Returns:
+            int: Number of records written
+        """
+        self._flush()
+        self._writer.close()
+        self._tmp_path.replace(self._filepath)
+        return self.count
+
+    def abort(self):
+        """Drop the file being written"""
+        try:
+            self._writer.close()
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = {field: [_text(item.get(field)) for item in self._buffer] for field in COLUMNAR_TEXT_FIELDS}
+        columns['rating'] = [_number(item.get('rating'), float) for item in self._buffer]
+        columns['reviews'] = [_number(item.get('reviews'), int) for item in self._buffer]
+        indices = []
+        for item in self._buffer:
+            category = _text(item.get('type'))
+            indices.append(None if category is None else self._categories.setdefault(category, len(self._categories)))
+        columns['type'] = pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int8()), pa.array(list(self._categories), type=pa.string())
+        )
+        batch = pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        if self.columnar_format == "parquet":
+            self._writer.write_batch(batch, row_group_size=len(self._buffer))
+        else:
+            self._writer.write_batch(batch)
+        self.count += len(self._buffer)
+        self._buffer = []
+
+
+def e164_fields(item: Dict[str, Any]) -> Dict[str, str]:
+    """
+    E.164 form of the phones of a record
+
+    Args:
+        item: Record or exported row
+
+    Returns:
+        dict: Value of each E.164 column, "" when the phone is missing or not valid
+    """
+    return {column: _E164_EXTRACTOR.to_e164(str(item.get(phone) or '')) for column, phone in E164_COLUMNS.items()}
+
+
+def _text(value: Any) -> Optional[str]:
+    """Text column value, null when empty"""
+    return str(value) if value not in (None, '') else None
+
+
+def _number(value: Any, kind: type) -> Optional[Any]:
+    """Float or integer column value, null when empty or invalid"""
+    if value in (None, ''):
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
 def demo_export():
     """Test function for the exporter"""
 
@@ -201,12 +581,33 @@ def demo_export():
     # Test both export
     both_results = exporter.export_both(test_data, "test_combined")
 
+    # Test delta export: everything added, then one change and one removal
+    Path("test_delta.state.json").unlink(missing_ok=True)
+    first_delta = exporter.export_delta(test_data, "test_delta.csv", "test_delta.state.json")
+    changed_data = [dict(test_data[0], email='reservation@petitbistro.fr')]
+    second_delta = exporter.export_delta(changed_data, "test_delta.ndjson", "test_delta.state.json", "ndjson")
+    delta_success = first_delta == {'add': 2, 'change': 0, 'remove': 0, 'unchanged': 0} and \
+        second_delta == {'add': 0, 'change': 1, 'remove': 1, 'unchanged': 0}
+
     print(f"Results:")
     print(f"  CSV: {'OK' if csv_success else 'FAILED'}")
     print(f"  JSON: {'OK' if json_success else 'FAILED'}")
     print(f"  Both: CSV={'OK' if both_results['csv'] else 'FAILED'}, JSON={'OK' if both_results['json'] else 'FAILED'}")
-
-    return csv_success and json_success and all(both_results.values())
+    print(f"  Delta: {'OK' if delta_success else 'FAILED'}")
+
+    # Test columnar export, typed columns read back
+    if HAS_PYARROW:
+        parquet_success = exporter.export_columnar(test_data, "test_export.parquet")
+        if parquet_success:
+            table = pq.read_table("test_export.parquet")
+            parquet_success = table.schema.field('reviews').type == pa.int64() and \
+                table.column('rating').to_pylist() == [4.5, 4.2]
+        print(f"  Parquet: {'OK' if parquet_success else 'FAILED'}")
+    else:
+        parquet_success = True
+        print("  Parquet: skipped (pyarrow not installed)")
+
+    return csv_success and json_success and all(both_results.values()) and delta_success and parquet_success
 
 
 if __name__ == "__main__":
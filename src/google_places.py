@@ -3,10 +3,15 @@ Google Places API client for hotel and restaurant prospecting.
 """
 
 import os
-import time
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
+try:
+    from .api_budget import ApiUsage, SEARCH_MASK, DETAILS_MASK
+    from .rate_limiter import RateLimiter
+except ImportError:
+    from api_budget import ApiUsage, SEARCH_MASK, DETAILS_MASK
+    from rate_limiter import RateLimiter
 
 # Load environment variables
 load_dotenv()
@@ -17,12 +22,29 @@ class GooglePlacesClient:
 
     BASE_URL = "https://places.googleapis.com/v1"
 
-    def __init__(self):
-        """Initialize client with API key from environment."""
+    def __init__(self, usage: Optional[ApiUsage] = None,
+                 session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize client with API key from environment.
+
+        Args:
+            usage: Call accounting and budget (a new unlimited one if None)
+            session: HTTP session to reuse connections (a new one if None)
+            rate_limiter: Limiter shared by clients (1 call per second if None)
+        """
         self.api_key = os.getenv('GOOGLE_MAPS_API_KEY')
         if not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY must be set in environment or .env file")
 
+        self.usage = usage if usage is not None else ApiUsage()
+        self.session = session if session is not None else requests.Session()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(1.0)
+
+        # Field masks decide the billed SKU (see api_budget)
+        self.search_field_mask = SEARCH_MASK
+        self.details_field_mask = DETAILS_MASK
+
     def search_places(self, city: str, place_type: str = "restaurant", limit: int = 20) -> List[Dict]:
         """
         Search for places in a city using Text Search API.
@@ -43,22 +65,52 @@ class GooglePlacesClient:
         else:
             text_query = f"{place_type}s in {city}"
 
+        places, _ = self.search_text(text_query, page_size=min(limit, 20))  # Max 20 per request
+        if not places:
+            print(f"WARNING: No {place_type} establishments found in {city}")
+        return places
+
+    def search_text(self, text_query: str, page_size: int = 20,
+                    page_token: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of Text Search results.
+
+        Args:
+            text_query: Free-text query (e.g. "brasserie in Lyon")
+            page_size: Results per page (max 20)
+            page_token: Token of the page to fetch, from the previous page
+
+        Returns:
+            (places, token of the next page or None)
+        """
         url = f"{self.BASE_URL}/places:searchText"
 
+        # The page token is an Essentials field: asking for it costs nothing more
+        field_mask = self.search_field_mask
+        if 'nextPageToken' not in field_mask:
+            field_mask += ',nextPageToken'
+
         headers = {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': self.api_key,
-            'X-Goog-FieldMask': 'places.displayName,places.formattedAddress,places.id,places.rating,places.userRatingCount'
+            'X-Goog-FieldMask': field_mask
         }
 
         payload = {
             'textQuery': text_query,
             'languageCode': 'fr',
-            'maxResultCount': min(limit, 20)  # Max 20 per request
+            'pageSize': min(page_size, 20)
         }
+        if page_token:
+            payload['pageToken'] = page_token
+
+        # Count the call (raises BudgetExceeded before spending)
+        self.usage.charge('text_search', self.search_field_mask)
 
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            # Respect API rate limits
+            self.rate_limiter.wait()
+            response = self.session.post(url, headers=headers, json=payload, timeout=10)
 
             # Handle HTTP errors with detailed messages
             if response.status_code == 401:
@@ -74,8 +126,6 @@ class GooglePlacesClient:
             data = response.json()
 
             places = data.get('places', [])
-            if not places:
-                print(f"WARNING: No {place_type} establishments found in {city}")
 
             # Transform to compatible format
             transformed_places = []
@@ -88,6 +138,11 @@ class GooglePlacesClient:
                         'rating': place.get('rating'),
                         'user_ratings_total': place.get('userRatingCount', 0)
                     }
+                    # Contact fields, when requested in the search field mask
+                    if 'websiteUri' in self.search_field_mask:
+                        transformed_place['website'] = place.get('websiteUri')
+                        transformed_place['international_phone_number'] = place.get('nationalPhoneNumber')
+
                     # Validate essential fields
                     if not transformed_place['place_id']:
                         print(f"WARNING: Place without ID ignored: {transformed_place['name']}")
@@ -98,13 +153,10 @@ class GooglePlacesClient:
                     print(f"WARNING: Error parsing place: {e}")
                     continue
 
-            # Sleep to respect API rate limits
-            time.sleep(1)
-
-            return transformed_places
+            return transformed_places, data.get('nextPageToken') or None
 
         except requests.Timeout:
-            raise requests.RequestException(f"Timeout during search in {city} (>10s)")
+            raise requests.RequestException(f"Timeout during search '{text_query}' (>10s)")
         except requests.ConnectionError:
             raise requests.RequestException("Connection error to Google Places API")
         except requests.HTTPError as e:
@@ -135,11 +187,16 @@ class GooglePlacesClient:
         headers = {
             'Content-Type': 'application/json',
             'X-Goog-Api-Key': self.api_key,
-            'X-Goog-FieldMask': 'displayName,formattedAddress,nationalPhoneNumber,websiteUri,rating,userRatingCount'
+            'X-Goog-FieldMask': self.details_field_mask
         }
 
+        # Count the call (raises BudgetExceeded before spending)
+        self.usage.charge('place_details', self.details_field_mask)
+
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            # Respect API rate limits
+            self.rate_limiter.wait()
+            response = self.session.get(url, headers=headers, timeout=10)
 
             # Handle HTTP errors with detailed messages
             if response.status_code == 401:
@@ -173,8 +230,6 @@ class GooglePlacesClient:
                     'user_ratings_total': data.get('userRatingCount', 0)
                 }
 
-                # Sleep to respect API rate limits
-                time.sleep(1)
                 return result
 
             except Exception as e:
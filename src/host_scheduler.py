@@ -0,0 +1,238 @@
+"""
+Per-host polite scheduler for concurrent scraping.
+
+Runs fetches concurrently across hosts while each host gets at most one
+request at a time, spaced by its own robots.txt Crawl-delay (or a default
+delay). URLs disallowed by robots.txt are never fetched.
+
+Transient failures (503, 429, timeouts) can be retried without holding a
+worker: the fetch returns at once with a 'retry_after' delay, the URL goes
+to a retry queue ordered by the time it may run again, and workers go on
+with other sites until it is due. A retry budget caps the retries of a run,
+so a bad network day cannot double its length.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+
+try:
+    from .robots_cache import RobotsCache
+    from .url_utils import url_host
+except ImportError:
+    from robots_cache import RobotsCache
+    from url_utils import url_host
+
+
+# Returned by the item reader once the items are exhausted
+_END = object()
+
+# Deferred retries of the scraping entry points: per URL, and per run
+MAX_RETRIES = 2
+RETRY_BUDGET = 100
+
+
+class HostScheduler:
+    """Concurrent scheduler enforcing per-host crawl delays and robots.txt."""
+
+    def __init__(self, robots_cache: Optional[RobotsCache] = None, max_workers: int = 8,
+                 default_delay: float = 2.0, max_delay: float = 60.0,
+                 slots: Optional[threading.Semaphore] = None, lookahead: Optional[int] = None,
+                 max_retries: int = 0, retry_budget: Optional[int] = None):
+        """
+        Args:
+            robots_cache: robots.txt cache (robots.txt ignored if None)
+            max_workers: Maximum number of concurrent fetches (all hosts)
+            default_delay: Delay between two requests to the same host (seconds)
+            max_delay: Upper bound for Crawl-delay values (seconds)
+            slots: Semaphore shared by several schedulers to cap their total
+                concurrency (e.g. concurrent jobs of the service)
+            lookahead: Maximum number of items read ahead of the fetches
+                (default: 4 per worker)
+            max_retries: Deferred retries allowed per URL; when > 0, fetch is
+                called as fetch(url, retries_left=n) and may return a result
+                with 'retry_after' (seconds) to be called again later
+            retry_budget: Maximum number of deferred retries per run (None: no limit)
+        """
+        self.robots_cache = robots_cache
+        self.max_workers = max(1, max_workers)
+        self.default_delay = default_delay
+        self.max_delay = max_delay
+        self.slots = slots
+        self.lookahead = max(1, lookahead if lookahead is not None else 4 * self.max_workers)
+        self.max_retries = max(0, max_retries)
+        self.retry_budget = retry_budget
+
+        self.disallowed = 0
+        self.retries = 0               # Deferred retries scheduled
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Tuple[Hashable, str]],
+            fetch: Callable[[str], Dict[str, Any]]) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """
+        Fetch URLs concurrently, yielding results as they complete.
+
+        Items are read as they come: they may be a stream fed by an earlier
+        stage, and fetches start while it is still producing. At most
+        lookahead items wait in the scheduler; beyond that reading pauses,
+        so a slow scraping stage holds back the stage feeding it.
+
+        A result with 'retry_after' is not yielded: its URL is fetched again
+        once the delay is over (and the host's crawl delay too). Fetches are
+        told how many retries they have left; once the retry budget is spent
+        or promised to fetches in progress, they are told none, so every URL
+        ends with a result of its own.
+
+        Args:
+            items: (key, url) pairs to fetch
+            fetch: Function fetching a URL and returning a result dict
+
+        Yields:
+            (key, result) pairs in completion order. URLs disallowed by
+            robots.txt yield {'status': 'Disallowed by robots.txt'}.
+        """
+        source = iter(items)
+        queues: Dict[str, Deque[Tuple[Hashable, str]]] = {}
+        next_allowed: Dict[str, float] = {}
+        running: Dict[Future, Tuple[str, Hashable, str, bool]] = {}
+        busy_hosts = set()
+        # Deferred retries: (not before, order, host, key, url)
+        retry_queue: List[Tuple[float, int, str, Hashable, str]] = []
+        order = itertools.count()
+        attempts: Dict[Hashable, int] = {}     # Deferred retries so far per key
+        budget = self.retry_budget             # Retries left in this run (None: no limit)
+        reserved = 0                           # Fetches in progress allowed one more retry
+        queued = 0
+        exhausted = False
+        next_item: Optional[Future] = None
+
+        # Items are read in a thread of their own: a stream may block
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-input")
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scrape")
+        try:
+            while True:
+                # Take in the items read so far, then read on while there is room
+                while next_item is not None and next_item.done():
+                    item = next_item.result()
+                    next_item = None
+                    if item is _END:
+                        exhausted = True
+                        break
+                    key, url = item
+                    host = url_host(url) or url
+                    queues.setdefault(host, deque()).append((key, url))
+                    next_allowed.setdefault(host, 0.0)
+                    queued += 1
+                    if queued < self.lookahead:
+                        next_item = reader.submit(next, source, _END)
+                if not exhausted and next_item is None and queued < self.lookahead:
+                    next_item = reader.submit(next, source, _END)
+
+                if exhausted and not queues and not running and not retry_queue:
+                    break
+
+                # Due retries go first in their host's queue: they have waited already
+                now = time.monotonic()
+                while retry_queue and retry_queue[0][0] <= now:
+                    _, _, host, key, url = heapq.heappop(retry_queue)
+                    queues.setdefault(host, deque()).appendleft((key, url))
+                    next_allowed.setdefault(host, 0.0)
+                    queued += 1
+
+                # Start work on every idle host whose delay has elapsed
+                for host in list(queues):
+                    if len(running) >= self.max_workers:
+                        break
+                    if host in busy_hosts or next_allowed[host] > now:
+                        continue
+                    key, url = queues[host].popleft()
+                    queued -= 1
+                    if not queues[host]:
+                        del queues[host]
+                    retries_left = None
+                    if self.max_retries:
+                        retries_left = self.max_retries - attempts.get(key, 0)
+                        if budget is not None and budget <= reserved:
+                            retries_left = 0
+                    reserving = bool(retries_left) and budget is not None
+                    reserved += reserving
+                    future = executor.submit(self._fetch_politely, url, fetch, retries_left)
+                    running[future] = (host, key, url, reserving)
+                    busy_hosts.add(host)
+
+                if len(running) >= self.max_workers:
+                    # Nothing can start before a fetch finishes, whatever the delays
+                    timeout = None
+                else:
+                    # Ready hosts were all started: wait for the next delay or retry to end
+                    waiting = [next_allowed[host] for host in queues if host not in busy_hosts]
+                    if retry_queue:
+                        waiting.append(retry_queue[0][0])
+                    timeout = max(0.0, min(waiting) - time.monotonic()) if waiting else None
+                pending = set(running)
+                if next_item is not None:
+                    pending.add(next_item)
+                elif queued < self.lookahead and not exhausted:
+                    continue  # Room freed up: read on first
+
+                if not pending:
+                    # Every remaining host is waiting for its crawl delay
+                    time.sleep(timeout or 0.0)
+                    continue
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future is next_item:
+                        continue  # Taken in at the top of the loop
+                    host, key, url, reserving = running.pop(future)
+                    busy_hosts.discard(host)
+                    reserved -= reserving
+                    result, delay = future.result()
+                    next_allowed[host] = time.monotonic() + delay
+
+                    retry_after = result.pop('retry_after', None)
+                    if retry_after is not None:
+                        attempts[key] = attempts.get(key, 0) + 1
+                        if budget is not None:
+                            budget -= 1
+                        self.retries += 1
+                        heapq.heappush(retry_queue, (time.monotonic() + retry_after, next(order), host, key, url))
+                        continue
+                    attempts.pop(key, None)
+                    yield key, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # No read in progress once run() is over: the caller may read on
+            reader.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch_politely(self, url: str, fetch: Callable[..., Dict[str, Any]],
+                        retries_left: Optional[int] = None) -> Tuple[Dict[str, Any], float]:
+        """Check robots.txt, fetch the URL and return (result, host delay)."""
+        delay = self.default_delay
+
+        if self.robots_cache:
+            full_url = url if url.startswith(('http://', 'https://')) else 'https://' + url
+            crawl_delay = self.robots_cache.crawl_delay(full_url)
+            if crawl_delay is not None:
+                delay = min(crawl_delay, self.max_delay)
+
+            if not self.robots_cache.can_fetch(full_url):
+                with self._lock:
+                    self.disallowed += 1
+                return {'reservation_phone': None, 'email': None,
+                        'status': 'Disallowed by robots.txt'}, delay
+
+        kwargs = {} if retries_left is None else {'retries_left': retries_left}
+        try:
+            if self.slots is None:
+                return fetch(url, **kwargs), delay
+            with self.slots:
+                return fetch(url, **kwargs), delay
+        except Exception as e:
+            return {'reservation_phone': None, 'email': None,
+                    'status': f"ERROR: {str(e)[:30]}", 'failed': True}, delay
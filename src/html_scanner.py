@@ -0,0 +1,221 @@
+"""
+One-pass contact scanner over raw HTML.
+
+Walks the document once with a single master regex and emits every
+contact candidate the extractors need, in document order:
+- tel: hrefs of <a> tags
+- mailto: hrefs of <a> tags
+- phone number candidates
+- email candidates
+
+Each candidate carries its position so that ranking (tel links first,
+then phones near reservation keywords, then first phone) can run on the
+candidate lists without rescanning the page.
+"""
+
+import re
+from bisect import bisect_left
+from html import unescape
+from typing import List, NamedTuple, Optional
+try:
+    from .phone_extractor import PhoneExtractor
+except ImportError:
+    from phone_extractor import PhoneExtractor
+
+
+# Same pattern as ContactScraper.email_pattern
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+# Markup tokens. Phones and emails never contain '<' or '>', so matches
+# inside a token can be found by rescanning the token alone.
+_MARKUP_PATTERN = (
+    r'(?P<comment><!--.*?-->)'
+    r'|(?P<script>(?i:<script\b[^>]*>).*?(?i:</script\s*>))'
+    r'|(?P<style>(?i:<style\b[^>]*>).*?(?i:</style\s*>))'
+    r'|(?P<tag><[A-Za-z](?:"[^"]*"|\'[^\']*\'|[^>"\'])*>)'
+)
+
+# Attributes of a start tag, close to what html.parser accepts
+ATTR_REGEX = re.compile(
+    r'([^\s"\'>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]*)))?'
+)
+
+# Characters that may continue an email right after a phone match
+_EMAIL_CHARS = frozenset(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-@'
+)
+
+
+class ContactCandidate(NamedTuple):
+    """A contact candidate found in a page."""
+    kind: str    # 'tel', 'mailto', 'phone' or 'email'
+    value: str
+    start: int
+    end: int
+
+
+class ContactScan:
+    """Candidates found by one scan of a page."""
+
+    def __init__(self, text: str, phone_regex: re.Pattern):
+        self.text = text
+        self.tel_links: List[ContactCandidate] = []
+        self.mailto_links: List[ContactCandidate] = []
+        self.phones: List[ContactCandidate] = []
+        self.emails: List[ContactCandidate] = []
+        self._phone_regex = phone_regex
+        self._phone_starts: Optional[List[int]] = None
+        self._lower_text: Optional[str] = None
+
+    @property
+    def lower_text(self) -> str:
+        """Lowercased page text, computed once."""
+        if self._lower_text is None:
+            self._lower_text = self.text.lower()
+        return self._lower_text
+
+    def phones_in_window(self, start: int, end: int) -> List[str]:
+        """
+        Return the phones a scan of text[start:end] alone would find.
+
+        Uses the candidates of the full scan and only rescans the window
+        when a candidate crosses one of its bounds.
+
+        Args:
+            start: Window start offset
+            end: Window end offset
+
+        Returns:
+            List of raw phone numbers, in document order
+        """
+        if not self.phones:
+            return []
+
+        if self._phone_starts is None:
+            self._phone_starts = [phone.start for phone in self.phones]
+
+        first = bisect_left(self._phone_starts, start)
+        last = bisect_left(self._phone_starts, end, lo=first)
+
+        crosses_start = first > 0 and self.phones[first - 1].end > start
+        crosses_end = last > first and self.phones[last - 1].end > end
+        if crosses_start or crosses_end:
+            return self._phone_regex.findall(self.text, start, end)
+
+        return [phone.value for phone in self.phones[first:last]]
+
+
+class HtmlScanner:
+    """Fused scanner emitting links, phones and emails in a single pass."""
+
+    def __init__(self, phone_pattern: str = PhoneExtractor.PHONE_PATTERN, phone_first_chars: str = '+0'):
+        """
+        Args:
+            phone_pattern: Phone regex, without capturing groups
+            phone_first_chars: Characters a phone match can start with
+        """
+        self.phone_regex = re.compile(phone_pattern, re.IGNORECASE)
+        # Start characters beyond the usual '0' and '+' (e.g. Spanish numbers)
+        self._extra_first_chars = tuple(char for char in phone_first_chars if char not in '0+')
+        self.email_regex = re.compile(EMAIL_PATTERN)
+
+        text_pattern = f'(?P<email>{EMAIL_PATTERN})|(?P<phone>{phone_pattern})'
+        self._text_regex = re.compile(text_pattern, re.DOTALL)
+        self._master_regex = re.compile(f'{_MARKUP_PATTERN}|{text_pattern}', re.DOTALL)
+
+    def scan(self, html_text: str) -> ContactScan:
+        """
+        Scan a page once and collect all contact candidates.
+
+        Args:
+            html_text: Raw HTML of the page
+
+        Returns:
+            ContactScan with candidates in document order
+        """
+        scan = ContactScan(html_text or '', self.phone_regex)
+        self._scan_span(scan, self._master_regex, 0, len(scan.text))
+        return scan
+
+    def _scan_span(self, scan: ContactScan, regex: re.Pattern, start: int, end: int):
+        """Scan text[start:end] and append candidates to the scan."""
+        text = scan.text
+        # End of the last email emitted ahead of the scan position
+        email_floor = start
+
+        for match in regex.finditer(text, start, end):
+            kind = match.lastgroup
+            m_start, m_end = match.span()
+
+            if kind == 'phone':
+                scan.phones.append(ContactCandidate('phone', match.group(), m_start, m_end))
+
+                # An email may start inside the phone (e.g. "06 12 34 56 78@x.fr")
+                if m_end < end and text[m_end] in _EMAIL_CHARS and m_end > email_floor:
+                    email_match = self.email_regex.search(text, max(m_start, email_floor), end)
+                    if email_match and email_match.start() < m_end:
+                        scan.emails.append(ContactCandidate('email', email_match.group(), *email_match.span()))
+                        email_floor = email_match.end()
+
+            elif kind == 'email':
+                if m_start >= email_floor:
+                    scan.emails.append(ContactCandidate('email', match.group(), m_start, m_end))
+                    email_floor = m_end
+                else:
+                    # Overlaps an email already emitted: resume the email scan after it
+                    email_match = self.email_regex.search(text, email_floor, end)
+                    if email_match and email_match.start() < m_end:
+                        scan.emails.append(ContactCandidate('email', email_match.group(), *email_match.span()))
+                        email_floor = email_match.end()
+                # Phones can start inside an email (digits in local part or domain)
+                self._scan_phones(scan, m_start, m_end)
+
+            else:
+                token = match.group()
+                if kind == 'tag':
+                    self._collect_link(scan, token, m_start, m_end)
+                # Phones start with '0' or '+' (or an extra first character), emails need '@'
+                if '@' in token or '0' in token or '+' in token or \
+                        (self._extra_first_chars and any(char in token for char in self._extra_first_chars)):
+                    self._scan_span(scan, self._text_regex, m_start, m_end)
+
+    def _scan_phones(self, scan: ContactScan, start: int, end: int):
+        """Collect phones inside a span already matched as an email."""
+        for match in self.phone_regex.finditer(scan.text, start, end):
+            scan.phones.append(ContactCandidate('phone', match.group(), *match.span()))
+
+    def _collect_link(self, scan: ContactScan, tag: str, start: int, end: int):
+        """Record tel: and mailto: hrefs of an <a> start tag."""
+        if tag[1] not in 'aA' or tag[2] not in ' \t\n\r\f/>':
+            return
+
+        href = None
+        for attr in ATTR_REGEX.finditer(tag, 2, len(tag) - 1):
+            if attr.group(1).lower() == 'href':
+                # Last duplicate wins, as in BeautifulSoup
+                href = attr.group(2) or attr.group(3) or attr.group(4) or ''
+
+        if not href:
+            return
+
+        href = unescape(href)
+        if href.startswith('tel:'):
+            phone = href.replace('tel:', '').strip()
+            scan.tel_links.append(ContactCandidate('tel', phone, start, end))
+        elif href.startswith('mailto:'):
+            # Drop parameters like ?subject=...
+            email = href.replace('mailto:', '').strip().split('?')[0]
+            scan.mailto_links.append(ContactCandidate('mailto', email, start, end))
+
+
+if __name__ == "__main__":
+    scanner = HtmlScanner()
+    sample = (
+        '<html><body><a href="tel:+33123456789">Call</a>'
+        '<p>Reservations: 01 23 45 67 89</p>'
+        '<a href="mailto:contact@bistro.fr?subject=Hello">Mail us</a>'
+        '</body></html>'
+    )
+    result = scanner.scan(sample)
+    for candidate in result.tel_links + result.mailto_links + result.phones + result.emails:
+        print(candidate)
@@ -0,0 +1,113 @@
+"""
+Persistent negative cache of websites that cannot be scraped.
+
+Some sites fail the same way on every run: they answer 403 to our
+User-Agent, link to a PDF instead of a page, serve pages over the size
+cap, or never answer in time. Their failure is remembered, per host or per
+URL depending on its class, for a TTL specific to the class, and their
+scrapes are skipped until it expires.
+"""
+
+import threading
+from typing import Dict, NamedTuple, Optional
+
+try:
+    from .cache_store import JsonCache
+    from .url_utils import normalize_url, url_host
+except ImportError:
+    from cache_store import JsonCache
+    from url_utils import normalize_url, url_host
+
+
+class FailureClass(NamedTuple):
+    """How a kind of failure is remembered."""
+    scope: str        # 'host' (whole site) or 'url' (this page only)
+    ttl: float        # How long scrapes are skipped (seconds)
+    min_count: int    # Failures in a row before scrapes are skipped
+    label: str        # Shown in status messages
+
+
+DAY = 86400
+
+FAILURE_CLASSES: Dict[str, FailureClass] = {
+    # Bot protection answers the same to every page of the host
+    'forbidden': FailureClass('host', 7 * DAY, 1, '403'),
+    # The website link of the place points to a document, not a page
+    'non_html': FailureClass('url', 30 * DAY, 1, 'non-HTML'),
+    'too_large': FailureClass('url', 30 * DAY, 1, 'too large'),
+    # A single timeout may be bad luck: skip hosts that keep timing out
+    'timeout': FailureClass('host', 3 * DAY, 2, 'timeout'),
+}
+
+
+class NegativeCache:
+    """Failure classes of unscrapable hosts and URLs, with a TTL per class."""
+
+    def __init__(self, cache: Optional[JsonCache] = None):
+        """
+        Args:
+            cache: Persistent cache for failures (memory only if None)
+        """
+        self.cache = cache if cache is not None else JsonCache()
+        self._lock = threading.Lock()
+
+    def lookup(self, url: str) -> Optional[str]:
+        """
+        Check whether a URL is known to be unscrapable.
+
+        Args:
+            url: Website URL
+
+        Returns:
+            Failure class to skip the URL for, None if it should be scraped
+        """
+        for key in self._keys(url):
+            entry = self.cache.get(key)
+            if not entry:
+                continue
+            failure = FAILURE_CLASSES.get(entry.get('failure'))
+            if failure and entry.get('count', 0) >= failure.min_count:
+                return entry['failure']
+        return None
+
+    def record(self, url: str, failure: str):
+        """
+        Remember a failure of a URL.
+
+        Args:
+            url: Website URL
+            failure: Failure class (key of FAILURE_CLASSES)
+        """
+        failure_class = FAILURE_CLASSES[failure]
+        key = self._key(url, failure_class.scope)
+        if not key:
+            return
+
+        with self._lock:
+            entry = self.cache.get(key) or {}
+            count = entry.get('count', 0) + 1 if entry.get('failure') == failure else 1
+            self.cache.set(key, {'failure': failure, 'count': count}, failure_class.ttl)
+
+    def forget(self, url: str):
+        """Clear the failures of a URL and its host after a successful download."""
+        for key in self._keys(url):
+            if self.cache.get(key) is not None:
+                self.cache.delete(key)
+
+    def save(self) -> bool:
+        """Persist the failures."""
+        return self.cache.save()
+
+    def _keys(self, url: str):
+        return [key for key in (self._key(url, 'host'), self._key(url, 'url')) if key]
+
+    @staticmethod
+    def _key(url: str, scope: str) -> str:
+        value = url_host(url) if scope == 'host' else normalize_url(url)
+        return f"{scope}:{value}" if value else ""
+
+
+def failure_label(failure: str) -> str:
+    """Human-readable name of a failure class."""
+    failure_class = FAILURE_CLASSES.get(failure)
+    return failure_class.label if failure_class else failure
@@ -0,0 +1,293 @@
+"""
+Append-only archive of the raw pages downloaded by the scraper.
+
+Improving PhoneExtractor or the email filters used to mean scraping every
+website again. With an archive, each HTML response is kept as a WARC-style
+record (WARC/1.1 headers, then the HTTP status line, headers and body),
+compressed as its own gzip member and appended to one file, so the file
+stays readable with standard WARC tools and a record can be decompressed
+alone. Metadata records link place_ids to the URL of their website.
+
+A sidecar index (<archive>.idx, one tab-separated line per record: offset,
+compressed length, record type, URL, place_ids) lets readers jump to any
+record without decompressing the ones before it; reextract.py hands these
+offsets to worker processes reading the archive through mmap. A record
+whose index line is missing (the writer was killed in between) is ignored;
+without an index file, one is rebuilt by walking the gzip members.
+"""
+
+import gzip
+import mmap
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, Tuple
+
+
+# Response headers that describe the transfer, not the body as archived
+_TRANSFER_HEADERS = frozenset({'content-encoding', 'transfer-encoding', 'content-length', 'connection'})
+
+# Compressed bytes fed at a time when walking the gzip members
+_SCAN_CHUNK = 65536
+
+
+class ArchiveEntry(NamedTuple):
+    """Index line of a record."""
+    offset: int
+    length: int                     # Compressed length (bytes)
+    record_type: str                # 'response' or 'metadata'
+    url: str
+    place_ids: Tuple[str, ...]      # Metadata records only
+
+
+class ArchivedPage(NamedTuple):
+    """Response read back from the archive."""
+    url: str                        # URL requested (the place's website)
+    final_url: str                  # URL after redirects
+    status: int
+    headers: Dict[str, str]         # Lowercase names
+    body: bytes
+    date: str
+
+
+class PageArchive:
+    """Writer (and index reader) of a page archive."""
+
+    def __init__(self, path: str, compresslevel: int = 6, writable: bool = True):
+        """
+        Args:
+            path: Archive file (e.g. pages.warc.gz), created or appended to
+            compresslevel: gzip level of each record (1 fastest, 9 smallest)
+            writable: Open the archive for appending now, so that a path that
+                cannot be written fails before any page is downloaded
+
+        Raises:
+            OSError: If the archive cannot be opened for appending
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.compresslevel = compresslevel
+        self.records = 0               # Records appended by this writer
+        self._file = None
+        self._index = None
+        self._lock = threading.Lock()
+        if writable:
+            self._open()
+
+    def append_response(self, url: str, status: int, headers: Mapping[str, str], body: bytes,
+                        final_url: Optional[str] = None):
+        """
+        Archive a downloaded page.
+
+        Args:
+            url: URL requested (the place's website)
+            status: HTTP status code
+            headers: Response headers
+            body: Raw body, as downloaded (content encoding removed)
+            final_url: URL after redirects (default: url)
+        """
+        lines = [f"HTTP/1.1 {status}"]
+        lines += [f"{name}: {value}" for name, value in headers.items() if name.lower() not in _TRANSFER_HEADERS]
+        block = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8', 'replace') + body
+        warc_headers = {'Content-Type': 'application/http;msgtype=response'}
+        if final_url and final_url != url:
+            warc_headers['WARC-Final-URI'] = final_url
+        self._append('response', url, warc_headers, block)
+
+    def link_places(self, url: str, place_ids: Iterable[str]):
+        """
+        Record that places use the page archived for a URL.
+
+        Args:
+            url: URL of the archived page
+            place_ids: Places whose website it is
+        """
+        place_ids = tuple(place_id for place_id in place_ids if place_id)
+        if not place_ids:
+            return
+        block = ''.join(f"place-id: {place_id}\r\n" for place_id in place_ids).encode('utf-8')
+        self._append('metadata', url, {'Content-Type': 'application/warc-fields'}, block, place_ids)
+
+    def entries(self) -> Iterator[ArchiveEntry]:
+        """Index of the archive, in file order (rebuilt first if missing)."""
+        if not os.path.exists(self.path):
+            return
+        if not os.path.exists(self.index_path):
+            self.rebuild_index()
+        with open(self.index_path, encoding='utf-8') as index:
+            for line in index:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 5:
+                    continue    # Line cut short by a crash
+                offset, length, record_type, url, place_ids = fields
+                yield ArchiveEntry(int(offset), int(length), record_type, url,
+                                   tuple(place_ids.split(',')) if place_ids else ())
+
+    def rebuild_index(self) -> int:
+        """
+        Write the index from the archive itself, walking its gzip members.
+
+        Returns:
+            Number of records indexed
+        """
+        count = 0
+        with open(self.path, 'rb') as f, open(self.index_path, 'w', encoding='utf-8') as index:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                offset = 0
+                while offset < len(buffer):
+                    member = _member_length(buffer, offset)
+                    if member is None:
+                        break   # Truncated last record
+                    warc_headers, block = read_record(buffer, offset, member)
+                    record_type = warc_headers.get('warc-type', '')
+                    place_ids = _block_place_ids(block) if record_type == 'metadata' else ()
+                    index.write(_index_line(offset, member, record_type,
+                                            warc_headers.get('warc-target-uri', ''), place_ids))
+                    offset += member
+                    count += 1
+        return count
+
+    def close(self):
+        with self._lock:
+            for handle in (self._file, self._index):
+                if handle:
+                    handle.close()
+            self._file = self._index = None
+
+    def __enter__(self) -> 'PageArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open(self):
+        """Open the archive and its index for appending."""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # An index behind its archive would hide the records appended from now on
+        if os.path.exists(self.path) and not os.path.exists(self.index_path):
+            self.rebuild_index()
+        self._file = open(self.path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+
+    def _append(self, record_type: str, url: str, extra_headers: Dict[str, str], block: bytes,
+                place_ids: Tuple[str, ...] = ()):
+        """Compress one record, append it, then its index line."""
+        header_lines = [
+            "WARC/1.1",
+            f"WARC-Type: {record_type}",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f"WARC-Target-URI: {url}",
+        ]
+        header_lines += [f"{name}: {value}" for name, value in extra_headers.items()]
+        header_lines.append(f"Content-Length: {len(block)}")
+        record = ('\r\n'.join(header_lines) + '\r\n\r\n').encode('utf-8') + block + b'\r\n\r\n'
+        # Compressed outside the lock: scrapes archive concurrently
+        member = gzip.compress(record, compresslevel=self.compresslevel)
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(member)
+            self._file.flush()
+            self._index.write(_index_line(offset, len(member), record_type, url, place_ids))
+            self._index.flush()
+            self.records += 1
+
+
+def read_record(buffer, offset: int, length: int) -> Tuple[Dict[str, str], bytes]:
+    """
+    Decompress and split one record.
+
+    Args:
+        buffer: Archive contents (mmap or bytes)
+        offset: Offset of the record's gzip member
+        length: Compressed length of the record
+
+    Returns:
+        (WARC headers with lowercase names, record block)
+    """
+    record = gzip.decompress(buffer[offset:offset + length])
+    head, _, rest = record.partition(b'\r\n\r\n')
+    headers = _parse_headers(head.decode('utf-8', 'replace').split('\r\n')[1:])
+    size = int(headers.get('content-length', len(rest)))
+    return headers, rest[:size]
+
+
+def parse_response(warc_headers: Dict[str, str], block: bytes) -> ArchivedPage:
+    """Status, headers and body of an archived response record."""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('utf-8', 'replace').split('\r\n')
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        status = 0
+    url = warc_headers.get('warc-target-uri', '')
+    return ArchivedPage(url, warc_headers.get('warc-final-uri', url), status, _parse_headers(lines[1:]),
+                        body, warc_headers.get('warc-date', ''))
+
+
+def _parse_headers(lines: Iterable[str]) -> Dict[str, str]:
+    headers = {}
+    for line in lines:
+        name, separator, value = line.partition(':')
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _block_place_ids(block: bytes) -> Tuple[str, ...]:
+    fields = block.decode('utf-8', 'replace').split('\r\n')
+    return tuple(line.partition(':')[2].strip() for line in fields if line.startswith('place-id:'))
+
+
+def _index_line(offset: int, length: int, record_type: str, url: str, place_ids: Tuple[str, ...]) -> str:
+    # URLs and place_ids never contain tabs or newlines once requested
+    return f"{offset}\t{length}\t{record_type}\t{url}\t{','.join(place_ids)}\n"
+
+
+def _member_length(buffer, offset: int) -> Optional[int]:
+    """Compressed length of the gzip member at offset, None if it is truncated."""
+    decompressor = zlib.decompressobj(wbits=31)
+    position = offset
+    while not decompressor.eof:
+        if position >= len(buffer):
+            return None
+        chunk = buffer[position:position + _SCAN_CHUNK]
+        position += len(chunk)
+        try:
+            decompressor.decompress(chunk)
+        except zlib.error:
+            return None
+    return position - offset - len(decompressor.unused_data)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'pages.warc.gz')
+        with PageArchive(path) as archive:
+            archive.append_response('https://bistro.example/', 200, {'Content-Type': 'text/html'},
+                                    '<a href="tel:+33142722841">Réserver</a>'.encode('utf-8'))
+            archive.link_places('https://bistro.example/', ['place-1', 'place-2'])
+
+        os.remove(f"{path}.idx")
+        reader = PageArchive(path, writable=False)
+        print(f"Rebuilt index: {reader.rebuild_index()} records")
+        with open(path, 'rb') as f:
+            data = f.read()
+        for entry in reader.entries():
+            warc_headers, block = read_record(data, entry.offset, entry.length)
+            if entry.record_type == 'response':
+                page = parse_response(warc_headers, block)
+                print(f"{entry.offset:>5} response {page.url} {page.status} {page.headers} {page.body!r}")
+            else:
+                print(f"{entry.offset:>5} metadata {entry.url} {entry.place_ids}")
@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 """
-French phone number extraction and formatting module.
+Phone number extraction and formatting module.
 
-Supported formats:
+Supported countries: France, Belgium, Switzerland and Spain. Each country
+is described by a PhoneFormat in PHONE_FORMATS; an extractor combines the
+patterns of its countries into one regex, so a page is scanned once
+whatever the number of countries.
+
+Supported formats (France):
 - +33 X XX XX XX XX
 - 0X XX XX XX XX
 - 0X.XX.XX.XX.XX
@@ -11,11 +16,121 @@ Supported formats:
 """
 
 import re
-from typing import List, Optional
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class PhoneFormat(NamedTuple):
+    """How a country's phone numbers are written and normalized."""
+    country: str                        # ISO 3166-1 alpha-2 code
+    calling_code: str                   # International prefix, without '+'
+    trunk_prefix: str                   # National prefix dropped in E.164 ('' if none)
+    first_digits: str                   # Valid first digits of the national number
+    rest_pattern: str                   # National number after its first digit, as written on pages
+    lengths: Tuple[int, ...]            # Valid lengths of the national number
+    groups: Dict[int, Tuple[int, ...]]  # Display grouping of the national number, per length
+
+
+PHONE_FORMATS: Dict[str, PhoneFormat] = {
+    # +33 1 23 45 67 89, 01 23 45 67 89
+    'FR': PhoneFormat('FR', '33', '0', '123456789', r'(?:[\s.-]*\d{2}){4}',
+                      (9,), {9: (1, 2, 2, 2, 2)}),
+    # +32 2 123 45 67, 02 123 45 67, 0470 12 34 56
+    'BE': PhoneFormat('BE', '32', '0', '123456789', r'(?:[\s./-]*\d){7,8}(?!\d)',
+                      (8, 9), {8: (1, 3, 2, 2), 9: (3, 2, 2, 2)}),
+    # +41 44 123 45 67, 044 123 45 67
+    'CH': PhoneFormat('CH', '41', '0', '123456789', r'\d(?:[\s./-]*\d){7}(?!\d)',
+                      (9,), {9: (2, 3, 2, 2)}),
+    # +34 912 345 678, 912 34 56 78 (no national prefix)
+    'ES': PhoneFormat('ES', '34', '', '6789', r'(?:[\s.-]*\d){8}(?!\d)',
+                      (9,), {9: (3, 3, 3)}),
+}
+
+
+def phone_alternatives(fmt: PhoneFormat) -> List[str]:
+    """
+    Regex alternatives matching a country's numbers, no capturing groups.
+
+    Every alternative starts with a literal character: a flat alternation
+    of those keeps the regex engine's first-character skip, so one scan
+    for several countries costs about as much as one for a single country.
+    """
+    first = f'[{fmt.first_digits}]'
+    alternatives = [rf'\+{fmt.calling_code}\s*' + (r'(?:\(0\)\s*)?' if fmt.trunk_prefix else '')
+                    + first + fmt.rest_pattern]
+    if fmt.trunk_prefix:
+        alternatives.append(re.escape(fmt.trunk_prefix) + r'\s*' + first + fmt.rest_pattern)
+    else:
+        # Without national prefix, the number must not continue other digits
+        alternatives.extend(rf'{digit}(?<![\d+]\d)' + fmt.rest_pattern for digit in fmt.first_digits)
+    return alternatives
+
+
+DEFAULT_COUNTRIES = ('FR',)
+
+# Country top-level domains, for detection from a site's URL
+_COUNTRY_TLDS = {'fr': 'FR', 'be': 'BE', 'ch': 'CH', 'es': 'ES'}
+
+# <html lang="fr-BE">: the region part names the country
+_HTML_LANG_REGEX = re.compile(r'<html\b[^>]*\blang\s*=\s*["\']?[a-z]{2,3}[-_]([a-z]{2})\b', re.IGNORECASE)
+
+
+def resolve_countries(countries: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Validate country codes, keeping order and dropping duplicates.
+
+    Args:
+        countries: ISO country codes (default: France)
+
+    Returns:
+        Upper-case country codes
+
+    Raises:
+        ValueError: If a country is not supported
+    """
+    resolved = []
+    for country in countries or DEFAULT_COUNTRIES:
+        country = country.upper()
+        if country not in PHONE_FORMATS:
+            raise ValueError(f"Unsupported country: {country} "
+                             f"(supported: {', '.join(PHONE_FORMATS)})")
+        if country not in resolved:
+            resolved.append(country)
+    return tuple(resolved)
+
+
+def detect_country(url: str = '', html_text: str = '') -> Optional[str]:
+    """
+    Guess a site's country from its domain, then from its <html lang>.
+
+    Args:
+        url: Site URL
+        html_text: Raw HTML of the page (only the start is read)
+
+    Returns:
+        Supported country code, None if nothing points to one
+    """
+    if url:
+        try:
+            host = urlsplit(url if '//' in url else '//' + url).hostname or ''
+        except ValueError:
+            host = ''
+        country = _COUNTRY_TLDS.get(host.rsplit('.', 1)[-1])
+        if country:
+            return country
+
+    if html_text:
+        match = _HTML_LANG_REGEX.search(html_text, 0, 2048)
+        if match and match.group(1).upper() in PHONE_FORMATS:
+            return match.group(1).upper()
+
+    return None
 
 
 class PhoneExtractor:
-    """French phone number extractor."""
+    """Phone number extractor for one or more countries."""
 
     # Regex pattern for French phone numbers
     PHONE_PATTERN = r'(?:\+33|0)\s*[1-9](?:[\s.-]*\d{2}){4}'
@@ -29,12 +144,27 @@ class PhoneExtractor:
         'call us', 'call'
     ]
 
-    def __init__(self):
-        self.phone_regex = re.compile(self.PHONE_PATTERN, re.IGNORECASE)
+    def __init__(self, countries: Optional[Iterable[str]] = None):
+        """
+        Args:
+            countries: Countries whose numbers are extracted, the first one
+                winning when a national number is valid in several (default: France)
+        """
+        self.countries = resolve_countries(countries)
+        self.formats = [PHONE_FORMATS[country] for country in self.countries]
+        self.phone_pattern = '|'.join(
+            alternative for fmt in self.formats for alternative in phone_alternatives(fmt)
+        )
+        self.phone_regex = re.compile(self.phone_pattern, re.IGNORECASE)
+        # Characters a number can start with: '+', national prefixes, first digits
+        self.first_chars = ''.join(sorted({
+            char for fmt in self.formats
+            for char in '+' + (fmt.trunk_prefix[:1] or fmt.first_digits)
+        }))
 
     def extract_phones(self, text: str) -> List[str]:
         """
-        Extract all French phone numbers from text.
+        Extract all phone numbers of the extractor's countries from text.
 
         Args:
             text: Text to analyze
@@ -48,38 +178,87 @@ class PhoneExtractor:
         phones = self.phone_regex.findall(text)
         return phones
 
-    def clean_phone(self, phone: str) -> str:
+    def parse(self, phone: str) -> Optional[Tuple[PhoneFormat, str]]:
         """
-        Clean and format a phone number.
+        Identify a number's country and national number.
+
+        International numbers are matched on their calling code, national
+        ones against each country in order.
 
         Args:
             phone: Raw phone number
 
         Returns:
-            Cleaned phone number in format +33 X XX XX XX XX
+            (country format, national number), None if not a valid number
         """
         if not phone:
-            return ""
+            return None
 
         # Remove all non-numeric characters except +
         cleaned = re.sub(r'[^\d+]', '', phone)
+        if cleaned.startswith('00'):
+            cleaned = '+' + cleaned[2:]
+
+        for fmt in self.formats:
+            if cleaned.startswith('+'):
+                if not cleaned.startswith(fmt.calling_code, 1):
+                    continue
+                national = cleaned[1 + len(fmt.calling_code):]
+                # "+32 (0)2 ..." keeps the national prefix
+                if fmt.trunk_prefix and national.startswith(fmt.trunk_prefix) and \
+                        len(national) - len(fmt.trunk_prefix) in fmt.lengths:
+                    national = national[len(fmt.trunk_prefix):]
+            elif fmt.trunk_prefix:
+                if not cleaned.startswith(fmt.trunk_prefix):
+                    continue
+                national = cleaned[len(fmt.trunk_prefix):]
+            else:
+                national = cleaned
+
+            if len(national) in fmt.lengths and national[:1] in fmt.first_digits and national.isdigit():
+                return fmt, national
 
-        # Convert 0X to +33X
-        if cleaned.startswith('0'):
-            cleaned = '+33' + cleaned[1:]
+        return None
 
-        # Check that number starts with +33
-        if not cleaned.startswith('+33'):
+    def to_e164(self, phone: str) -> str:
+        """
+        Normalize a phone number to E.164.
+
+        Args:
+            phone: Raw phone number
+
+        Returns:
+            Number as +<calling code><national number>, "" if not valid
+        """
+        parsed = self.parse(phone)
+        if not parsed:
             return ""
+        fmt, national = parsed
+        return f"+{fmt.calling_code}{national}"
+
+    def clean_phone(self, phone: str) -> str:
+        """
+        Clean and format a phone number.
 
-        # Check length (must be +33XXXXXXXXX = 12 characters)
-        if len(cleaned) != 12:
+        Args:
+            phone: Raw phone number
+
+        Returns:
+            Cleaned phone number, international format grouped the
+            country's way (+33 X XX XX XX XX for France), "" if not valid
+        """
+        parsed = self.parse(phone)
+        if not parsed:
             return ""
 
-        # Format: +33 X XX XX XX XX
-        formatted = f"+33 {cleaned[3]} {cleaned[4:6]} {cleaned[6:8]} {cleaned[8:10]} {cleaned[10:12]}"
+        fmt, national = parsed
+        parts = []
+        start = 0
+        for size in fmt.groups[len(national)]:
+            parts.append(national[start:start + size])
+            start += size
 
-        return formatted
+        return f"+{fmt.calling_code} " + ' '.join(parts)
 
     def find_reservation_phone(self, html_content: str, tel_links: List[str] = None) -> Optional[str]:
         """
@@ -189,6 +368,69 @@ def test_phone_extraction():
             print(f"  Cleaned: '{phone}' -> '{cleaned}'")
         print()
 
+    extractor = PhoneExtractor(PHONE_FORMATS)
+    test_cases = [
+        "Brussels: +32 2 123 45 67",
+        "Gent: 09 123 45 67",
+        "GSM: 0470 12 34 56",
+        "Zurich: +41 44 123 45 67",
+        "Geneva: 022 345 67 89",
+        "Madrid: +34 912 34 56 78",
+        "Barcelona: 933 456 789",
+        "Order 123456789012 is not a phone",
+    ]
+
+    print("=== Multi-country Extraction Test ===")
+    for i, text in enumerate(test_cases, 1):
+        phones = extractor.extract_phones(text)
+        print(f"Test {i}: '{text}'")
+        for phone in phones:
+            print(f"  '{phone}' -> '{extractor.clean_phone(phone)}' ({extractor.to_e164(phone)})")
+        print()
+
+
+def benchmark_phone_extraction(repeat: int = 20):
+    """
+    Microbenchmark: the French-only path against the combined scan.
+
+    Times the legacy French pattern, the table-built French extractor,
+    one combined scan for all countries and one pass per country, on the
+    same synthetic page text.
+    """
+    filler = "Bienvenue dans notre restaurant, cuisine de saison et produits frais. " * 40
+    numbers = ["01 23 45 67 89", "+33 6 12 34 56 78", "+32 2 123 45 67",
+               "044 123 45 67", "+34 912 34 56 78", "Réf. 2023-11-04"]
+    text = ''.join(filler + number + "\n" for number in numbers) * 20
+
+    legacy = re.compile(PhoneExtractor.PHONE_PATTERN, re.IGNORECASE)
+    french = PhoneExtractor(['FR'])
+    combined = PhoneExtractor(PHONE_FORMATS)
+    separate = [PhoneExtractor([country]) for country in PHONE_FORMATS]
+
+    def best_of(scan) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scan()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    size_kb = len(text) / 1024
+    cases = [
+        ("French, legacy pattern", lambda: legacy.findall(text)),
+        ("French, pattern table", lambda: french.extract_phones(text)),
+        ("All countries, combined scan", lambda: combined.extract_phones(text)),
+        ("All countries, one pass each", lambda: [e.extract_phones(text) for e in separate]),
+    ]
+
+    print(f"=== Phone Extraction Benchmark ({size_kb:.0f} KB of text, best of {repeat}) ===")
+    for label, scan in cases:
+        seconds = best_of(scan)
+        print(f"{label:<30} {seconds * 1000:8.2f} ms  {size_kb / 1024 / seconds:8.1f} MB/s")
+
 
 if __name__ == "__main__":
-    test_phone_extraction()
+    if '--benchmark' in sys.argv[1:]:
+        benchmark_phone_extraction()
+    else:
+        test_phone_extraction()
@@ -0,0 +1,1127 @@
+"""
+Prospecting pipeline: Google search and details, then website scraping.
+
+prospect() is the library entry point. It runs the pipeline in the
+background and returns an iterator of finished records, reporting progress
+as ProgressEvent objects instead of printing. The stage functions below
+are shared by the CLI (prospector.py) and the service (service.py).
+"""
+
+import asyncio
+import functools
+import itertools
+import math
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+try:
+    from .google_places import GooglePlacesClient
+    from .api_budget import ApiUsage, BudgetExceeded, FetchStrategy, plan_strategy, estimate_cost
+    from .contact_scraper import ContactScraper, USER_AGENT
+    from .rate_limiter import RateLimiter
+    from .phone_extractor import resolve_countries
+    from .dns_cache import DnsCache
+    from .cache_store import JsonCache, DEFAULT_CACHE_DIR
+    from .robots_cache import RobotsCache
+    from .adaptive_timeouts import AdaptiveTimeouts
+    from .negative_cache import NegativeCache
+    from .place_dedup import PlaceDeduplicator
+    from .egress_pool import EgressPool
+    from .page_archive import PageArchive
+    from .host_scheduler import HostScheduler, MAX_RETRIES, RETRY_BUDGET
+    from .url_utils import normalize_url, request_host
+    from .work_queue import WorkQueue, QueueScheduler
+except ImportError:
+    from google_places import GooglePlacesClient
+    from api_budget import ApiUsage, BudgetExceeded, FetchStrategy, plan_strategy, estimate_cost
+    from contact_scraper import ContactScraper, USER_AGENT
+    from rate_limiter import RateLimiter
+    from phone_extractor import resolve_countries
+    from dns_cache import DnsCache
+    from cache_store import JsonCache, DEFAULT_CACHE_DIR
+    from robots_cache import RobotsCache
+    from adaptive_timeouts import AdaptiveTimeouts
+    from negative_cache import NegativeCache
+    from place_dedup import PlaceDeduplicator
+    from egress_pool import EgressPool
+    from page_archive import PageArchive
+    from host_scheduler import HostScheduler, MAX_RETRIES, RETRY_BUDGET
+    from url_utils import normalize_url, request_host
+    from work_queue import WorkQueue, QueueScheduler
+
+
+ESTABLISHMENT_TYPES = ("hotel", "restaurant", "all")
+
+# Name keywords telling the establishment type, also used as search synonyms
+HOTEL_KEYWORDS = ['hotel', 'auberge', 'gite', 'chambre', 'suite', 'resort']
+RESTAURANT_KEYWORDS = ['restaurant', 'bistro', 'brasserie', 'cafe', 'pizzeria', 'bar', 'bouillon']
+
+# Cities searched arrondissement by arrondissement with query expansion
+ARRONDISSEMENTS = {'paris': 20, 'lyon': 9, 'marseille': 16}
+
+
+class ProgressEvent(NamedTuple):
+    """Progress of a prospect() run."""
+    stage: str                              # 'plan', 'search', 'details', 'scrape', 'budget' or 'done'
+    message: str                            # Human-readable line, as printed by the CLI
+    data: Optional[Dict[str, Any]] = None   # Stage results (counts, statistics)
+
+
+class _Closed(Exception):
+    """Raised inside the pipeline once its consumer is gone."""
+
+
+class _Failure(NamedTuple):
+    error: BaseException
+
+
+_DONE = object()
+
+
+class ProspectRun:
+    """
+    Iterator (and async iterator) over the records of a running pipeline.
+
+    Records are handed over through a bounded buffer: a slow consumer slows
+    the pipeline down instead of letting records pile up in memory.
+    """
+
+    def __init__(self, on_event: Optional[Callable[[ProgressEvent], None]] = None, buffer: int = 100,
+                 time_budget: Optional[float] = None):
+        """
+        Args:
+            on_event: Called with each ProgressEvent, from the pipeline thread
+            buffer: Maximum number of finished records waiting for the consumer
+            time_budget: Seconds after which the pipeline is stopped (None for no limit)
+        """
+        self.on_event = on_event
+        self.time_budget = time_budget
+        self.usage: Optional[ApiUsage] = None
+        self.place_ids: List[str] = []        # Search order, filled after the search
+        self.duplicates: Dict[str, str] = {}  # Merged place_id -> place_id kept
+        self.stats: Dict[str, int] = {}       # Scraping statistics, filled at the end
+        self.stop = threading.Event()         # Skip remaining work, flush records as they are
+        self.partial = threading.Event()      # Places left out (search error or budget, details stopped)
+        self.time_budget_reached = False      # Stopped by the time budget
+        self._closed = threading.Event()
+        self._records: queue.Queue = queue.Queue(maxsize=max(1, buffer))
+        self._finished = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def complete(self) -> bool:
+        """
+        Whether the run delivered every place its search could reach.
+
+        False once it was stopped or left places out: places missing from
+        it may still exist (see Exporter.export_delta).
+        """
+        return not self.stop.is_set() and not self.partial.is_set()
+
+    def cancel(self):
+        """Stop the pipeline early; records not finished yet are still delivered as they are."""
+        self.stop.set()
+
+    def close(self):
+        """Stop the pipeline and drop the records not consumed yet."""
+        self.stop.set()
+        self._closed.set()
+
+    def __enter__(self) -> 'ProspectRun':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self) -> 'ProspectRun':
+        return self
+
+    def __next__(self) -> Dict:
+        item = self._next_item()
+        if item is _DONE:
+            raise StopIteration
+        return item
+
+    def __aiter__(self) -> 'ProspectRun':
+        return self
+
+    async def __anext__(self) -> Dict:
+        item = await asyncio.get_running_loop().run_in_executor(None, self._next_item)
+        if item is _DONE:
+            raise StopAsyncIteration
+        return item
+
+    def _next_item(self) -> Any:
+        """Wait for the next record, _DONE at the end; re-raise pipeline errors."""
+        if self._finished:
+            return _DONE
+        item = self._records.get()
+        if item is _DONE or isinstance(item, _Failure):
+            self._finished = True
+            if isinstance(item, _Failure):
+                raise item.error
+        return item
+
+    def _start(self, target: Callable[['ProspectRun'], None]):
+        self._thread = threading.Thread(target=self._run, args=(target,), name="prospect", daemon=True)
+        self._thread.start()
+
+    def _run(self, target: Callable[['ProspectRun'], None]):
+        timer = None
+        if self.time_budget is not None:
+            timer = threading.Timer(self.time_budget, self._expire)
+            timer.daemon = True
+            timer.start()
+        try:
+            target(self)
+            end = _DONE
+        except _Closed:
+            return
+        except BaseException as e:
+            end = _Failure(e)
+        finally:
+            if timer:
+                timer.cancel()
+        self._put(end, force=True)
+
+    def _expire(self):
+        """Time budget reached: stop like cancel(), finished records are kept."""
+        if self.stop.is_set():
+            return
+        self.time_budget_reached = True
+        self._emit('budget', f"\nWARNING: Time budget of {self.time_budget:.0f}s reached, "
+                             f"finishing with the work done")
+        self.stop.set()
+
+    def _put(self, item: Any, force: bool = False):
+        """Hand an item to the consumer, waiting while the buffer is full."""
+        while True:
+            if self._closed.is_set():
+                if force:
+                    return
+                raise _Closed()
+            try:
+                self._records.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _emit(self, stage: str, message: str, data: Optional[Dict[str, Any]] = None):
+        if self.on_event:
+            self.on_event(ProgressEvent(stage, message, data))
+
+    def _publish(self, record: Dict):
+        self._put(record)
+
+
+class _StageLink:
+    """Bounded queue between two pipeline stages running at the same time."""
+
+    def __init__(self, maxsize: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._closed = threading.Event()   # Consumer gone: items are dropped
+
+    def put(self, item: Any):
+        """Hand an item to the next stage, waiting while it is behind."""
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._closed.set()
+
+
+def run_overlapped(produce: Callable[[Callable[[Any], None]], Any],
+                   consume: Callable[[Iterable[Any]], Any], maxsize: int = 32) -> Tuple[Any, Any]:
+    """
+    Run two pipeline stages at the same time, linked by a bounded queue.
+
+    The producer runs in a thread and hands each item over with the
+    function it receives; the consumer iterates over the items as they
+    come. A consumer that falls behind makes the producer wait once
+    maxsize items are queued, so memory stays flat and the run takes
+    about as long as its slowest stage.
+
+    Args:
+        produce: Producer stage, called with the function handing items over
+        consume: Consumer stage, called with the iterable of items
+        maxsize: Maximum number of items queued between the stages
+
+    Returns:
+        (producer result, consumer result)
+
+    Raises:
+        Exception: An error of either stage
+    """
+    link = _StageLink(maxsize)
+    produced: Dict[str, Any] = {}
+
+    def run_producer():
+        try:
+            produced['result'] = produce(link.put)
+            link.put(_DONE)
+        except BaseException as e:
+            link.put(_Failure(e))
+
+    producer = threading.Thread(target=run_producer, name="stage", daemon=True)
+    producer.start()
+    try:
+        consumed = consume(link)
+    finally:
+        producer.join()
+    return produced.get('result'), consumed
+
+
+class SharedResources:
+    """
+    Warm resources shared by the runs of a long-running process (see service.py).
+
+    With them, prospect() reuses the Google session and rate limit, the DNS
+    answers, robots.txt rules, learned timeouts, unscrapable sites, website
+    connections, egresses and page archive, and scrapes within concurrency
+    slots shared by all runs. Statistics stay per run: each run still gets
+    its own scraper, circuit breakers and scheduler.
+    """
+
+    def __init__(self, workers: int = 8, cache_dir: str = DEFAULT_CACHE_DIR,
+                 egresses: Optional[List[str]] = None, archive: Optional[str] = None):
+        """
+        Args:
+            workers: Maximum number of websites scraped at once, all runs together
+            cache_dir: Folder for caches shared across runs
+            egresses: Proxy URLs or local source addresses to scrape through (default: direct)
+            archive: Archive file the downloaded pages of every run are appended to (optional)
+
+        Raises:
+            ValueError: If an egress is invalid
+            OSError: If the archive cannot be opened for appending
+        """
+        # Google API: one keep-alive session and one rate limit for all runs
+        self.api_session = requests.Session()
+        self.api_rate_limiter = RateLimiter(1.0)
+
+        # Scraping: warm connections and caches, shared concurrency cap
+        self.dns_cache = DnsCache()
+        self.dns_cache.install()
+        self.timeouts = AdaptiveTimeouts(JsonCache(f"{cache_dir}/latency.json"))
+        self.negative_cache = NegativeCache(JsonCache(f"{cache_dir}/unscrapable.json"))
+        self.robots_cache = RobotsCache(JsonCache(f"{cache_dir}/robots.json"), user_agent=USER_AGENT)
+        self.session = requests.Session()
+        self.scrape_slots = threading.Semaphore(max(1, workers))
+        self.egress_pool = EgressPool.from_specs(egresses) if egresses else None
+        if self.egress_pool:
+            self.egress_pool.check_health()
+        # One writer for every run: concurrent writers would interleave records
+        self.archive = PageArchive(archive) if archive else None
+
+    def save(self):
+        """Persist the caches learned so far."""
+        self.robots_cache.save()
+        self.timeouts.save()
+        self.negative_cache.save()
+
+    def close(self):
+        """Persist the caches and release connections, resolver hook and archive."""
+        self.save()
+        self.dns_cache.close()
+        if self.egress_pool:
+            self.egress_pool.close()
+        if self.archive:
+            self.archive.close()
+        self.session.close()
+        self.api_session.close()
+
+
+def prospect(city: str, types: str = "all", limit: int = 20, scrape: bool = True, expand: bool = False,
+             workers: int = 8, cache_dir: str = DEFAULT_CACHE_DIR,
+             max_api_cost: Optional[float] = None, max_api_calls: Optional[int] = None,
+             site_deadline: float = 20.0, work_queue: Optional[str] = None, queue_timeout: float = 600,
+             country: str = "FR", time_budget: Optional[float] = None, egresses: Optional[List[str]] = None,
+             dedup: bool = True, archive: Optional[str] = None, retry_budget: int = RETRY_BUDGET,
+             shared: Optional[SharedResources] = None,
+             on_event: Optional[Callable[[ProgressEvent], None]] = None, buffer: int = 100) -> ProspectRun:
+    """
+    Prospect a city and stream the finished records.
+
+    Example:
+        with prospect("Lyon", "hotel", limit=10) as run:
+            for record in run:
+                print(record['name'], record['email'])
+
+    Args:
+        city: City to prospect
+        types: 'hotel', 'restaurant' or 'all'
+        limit: Maximum number of establishments
+        scrape: Scrape websites for reservation phone and email
+        expand: Search with synonym and arrondissement queries (more places, more searches)
+        workers: Number of websites scraped concurrently
+        cache_dir: Folder for caches shared across runs
+        max_api_cost: Maximum estimated Google API cost in USD (None for no limit)
+        max_api_calls: Maximum number of Google API calls (None for no limit)
+        site_deadline: Maximum time spent scraping one site, retries included (seconds)
+        work_queue: Work queue file: scraping is done by scrape_worker.py processes
+        queue_timeout: With work_queue, seconds to wait without results before giving up
+        country: Country of the city, whose phone numbers are extracted first
+            (FR, BE, CH or ES; with work_queue, the workers' --country applies)
+        time_budget: Seconds after which the run stops and delivers what is
+            finished, best places first (None for no limit)
+        egresses: Proxy URLs or local source addresses websites are scraped
+            through, spread per host (None for direct connections; see egress_pool.py)
+        dedup: Merge places listed several times before details and scraping (see place_dedup.py)
+        archive: Archive file the downloaded pages are appended to, for offline
+            re-extraction with reextract.py (local scraping only; None to keep no pages)
+        retry_budget: Maximum number of deferred retries of transient scrape
+            failures for the run (local scraping; 0 for no retries)
+        shared: Warm resources of a long-running process; their egresses and
+            archive are used instead of egresses and archive (optional)
+        on_event: Called with each ProgressEvent (from a background thread)
+        buffer: Maximum number of finished records held for the consumer
+
+    Returns:
+        ProspectRun yielding records in completion order
+
+    Raises:
+        ValueError: Invalid arguments or missing Google API key
+        BudgetExceeded: Budget too low for the search itself
+    """
+    if not city or not city.strip():
+        raise ValueError("City cannot be empty")
+    if types not in ESTABLISHMENT_TYPES:
+        raise ValueError(f"Invalid type: {types} (expected {', '.join(ESTABLISHMENT_TYPES)})")
+    if limit <= 0:
+        raise ValueError(f"Invalid limit: {limit} (must be > 0)")
+    if workers <= 0:
+        raise ValueError(f"Invalid workers: {workers} (must be > 0)")
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError(f"Invalid time budget: {time_budget} (must be > 0)")
+    if retry_budget < 0:
+        raise ValueError(f"Invalid retry budget: {retry_budget} (must be >= 0)")
+    countries = resolve_countries([country])
+    # Egresses and archive of the run, closed with it unless shared
+    if shared:
+        egress_pool, page_archive = None, None
+    else:
+        egress_pool = EgressPool.from_specs(egresses) if egresses and scrape and not work_queue else None
+        page_archive = PageArchive(archive) if archive and scrape and not work_queue else None
+
+    run = ProspectRun(on_event, buffer, time_budget)
+    run.usage = ApiUsage(max_cost=max_api_cost, max_calls=max_api_calls)
+    if shared:
+        google_client = GooglePlacesClient(usage=run.usage, session=shared.api_session,
+                                           rate_limiter=shared.api_rate_limiter)
+    else:
+        google_client = GooglePlacesClient(usage=run.usage)
+
+    # Choose the cheapest fetch strategy that fits the API budget
+    search_calls = estimate_expanded_searches(types, limit) if expand else (2 if types == "all" else 1)
+    strategy = plan_strategy(search_calls, limit, run.usage)
+    if strategy is None:
+        raise BudgetExceeded("API budget too low for the search itself")
+    google_client.search_field_mask = strategy.search_field_mask
+    if strategy.details_field_mask:
+        google_client.details_field_mask = strategy.details_field_mask
+
+    def run_stages(run: ProspectRun):
+        run._emit('plan', f"API plan: {strategy.name} (estimated ~${estimate_cost(strategy, search_calls, limit):.3f})",
+                  {'strategy': strategy.name})
+
+        # Google Places search
+        run._emit('search', f"Searching for establishments in {city}...")
+        search = search_expanded if expand else search_establishments
+        establishments = search(google_client, city, types, limit, log=lambda message: run._emit('search', message),
+                                partial=run.partial)
+        if not establishments:
+            run._emit('search', f"ERROR: No establishments found for {city}", {'found': 0})
+            return
+        run._emit('search', f"OK: {len(establishments)} establishments found", {'found': len(establishments)})
+
+        # Copies of a place would each cost a details call and a scrape
+        if dedup:
+            establishments, run.duplicates = merge_duplicates(
+                establishments, countries, log=lambda message: run._emit('search', message)
+            )
+        run.place_ids = [place['place_id'] for place in establishments]
+
+        dns_cache = None
+        if scrape and not work_queue:
+            dns_cache = shared.dns_cache if shared else DnsCache()
+        try:
+            # Enrich with Google details
+            run._emit('details', "Fetching details..." if strategy.details_field_mask
+                      else "Contact fields fetched with the search, no details calls")
+
+            def details(on_record: Callable[[Dict], None]) -> int:
+                return enrich_places(
+                    google_client, establishments, strategy, dns_cache,
+                    log=lambda message: run._emit('details', message),
+                    on_record=on_record, stop=run.stop, partial=run.partial
+                )
+
+            if not scrape:
+                built = details(run._publish)
+            else:
+                # Websites are scraped as their details arrive
+                run._emit('scrape', "Scraping websites for contacts as details arrive...")
+                built, run.stats = run_overlapped(details, lambda stream: scrape_records(
+                    stream, workers, cache_dir, dns_cache, site_deadline, work_queue, queue_timeout,
+                    countries=countries, egress_pool=shared.egress_pool if shared else egress_pool,
+                    archive=shared.archive if shared else page_archive, retry_budget=retry_budget, shared=shared,
+                    log=lambda message: run._emit('scrape', message), on_record=run._publish, stop=run.stop
+                ), maxsize=4 * workers)
+        finally:
+            if dns_cache and not shared:
+                dns_cache.close()
+            if egress_pool:
+                egress_pool.close()
+            if page_archive:
+                page_archive.close()
+
+        run._emit('done', f"{built} establishments processed",
+                  {'records': built, 'api_calls': run.usage.total_calls, 'api_cost': run.usage.total_cost})
+
+    run._start(run_stages)
+    return run
+
+
+def scrape_records(records: Iterable[Dict], workers: int, cache_dir: str,
+                   dns_cache: Optional[DnsCache] = None, site_deadline: float = 20.0,
+                   work_queue: Optional[str] = None,
+                   queue_timeout: float = 600, countries: Optional[List[str]] = None,
+                   egress_pool: Optional[EgressPool] = None,
+                   archive: Optional[PageArchive] = None, retry_budget: int = RETRY_BUDGET,
+                   shared: Optional[SharedResources] = None,
+                   log: Callable[[str], None] = print,
+                   on_record: Optional[Callable[[Dict], None]] = None,
+                   stop: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    Scrape records' websites locally, or through workers with a work queue.
+
+    Args:
+        records: Records to update in place, a list or a stream (see scrape_places)
+        workers: Number of websites scraped concurrently (local scraping)
+        cache_dir: Folder for caches shared across runs
+        dns_cache: DNS cache holding the prefetched website hosts (local scraping)
+        site_deadline: Maximum time spent on one site (local scraping, seconds)
+        work_queue: Work queue file (None to scrape locally)
+        queue_timeout: Seconds to wait for workers without results
+        countries: Phone countries, first one preferred (local scraping, default: France)
+        egress_pool: Proxies or source addresses to scrape through (local scraping, optional)
+        archive: Archive of the downloaded pages (local scraping, optional)
+        retry_budget: Maximum number of deferred retries for the run (local scraping)
+        shared: Warm caches, connections and scraping slots of a long-running
+            process, used instead of loading the caches from cache_dir (optional)
+        log: Function receiving progress lines
+        on_record: Called with each record once it is final (optional)
+        stop: When set, remaining sites are left unscraped (optional)
+
+    Returns:
+        Scraping statistics (see scrape_places)
+    """
+    if work_queue:
+        # Workers scrape, results are merged here as they come back
+        scheduler = QueueScheduler(WorkQueue(work_queue), timeout=queue_timeout, log=log)
+        return scrape_places(ContactScraper(verbose=False), records, scheduler,
+                             log=log, on_record=on_record, stop=stop)
+
+    if shared:
+        timeouts, negative_cache, robots_cache = shared.timeouts, shared.negative_cache, shared.robots_cache
+    else:
+        # Timeouts learned from each host's latencies in previous runs
+        timeouts = AdaptiveTimeouts(JsonCache(f"{cache_dir}/latency.json"))
+        # Sites that failed in a lasting way in previous runs
+        negative_cache = NegativeCache(JsonCache(f"{cache_dir}/unscrapable.json"))
+        # robots.txt rules and crawl delays, cached across runs
+        robots_cache = RobotsCache(JsonCache(f"{cache_dir}/robots.json"), user_agent=USER_AGENT)
+    scraper = ContactScraper(dns_cache=dns_cache, verbose=False, timeouts=timeouts, site_deadline=site_deadline,
+                             countries=countries, negative_cache=negative_cache, egress_pool=egress_pool,
+                             archive=archive, session=shared.session if shared else None)
+
+    # Egresses that are down now start out of the pool (shared ones were checked when created)
+    if egress_pool and not shared:
+        health = egress_pool.check_health()
+        down = [name for name, healthy in health.items() if not healthy]
+        log(f"  {len(health) - len(down)}/{len(health)} egresses up" + (f" (down: {', '.join(down)})" if down else ""))
+
+    # Connections reuse the prefetched DNS answers
+    if dns_cache:
+        dns_cache.install()
+
+    # Transient failures are retried later, workers go on with other sites meanwhile
+    scheduler = HostScheduler(robots_cache, max_workers=workers, slots=shared.scrape_slots if shared else None,
+                              max_retries=MAX_RETRIES, retry_budget=retry_budget)
+
+    try:
+        return scrape_places(scraper, records, scheduler, log=log, on_record=on_record, stop=stop)
+    finally:
+        robots_cache.save()
+        timeouts.save()
+        negative_cache.save()
+
+
+def enrich_places(google_client: GooglePlacesClient, establishments: List[Dict], strategy: FetchStrategy,
+                  dns_cache: Optional[DnsCache] = None, log: Callable[[str], None] = print,
+                  on_record: Optional[Callable[[Dict], None]] = None,
+                  stop: Optional[threading.Event] = None,
+                  partial: Optional[threading.Event] = None) -> int:
+    """
+    Fetch Google details for places and build their records.
+
+    Records are handed to on_record as they are built, not kept: memory
+    does not grow with the run.
+
+    Places are processed by decreasing place_priority, so that a run
+    stopped early or short of details budget has the best places complete.
+
+    Args:
+        google_client: Google Places client
+        establishments: Places from the search
+        strategy: Fetch strategy chosen by the API planner
+        dns_cache: DNS cache to prefetch website hosts into (optional)
+        log: Function receiving progress lines
+        on_record: Called with each record as it is built, one per place,
+            with basic info when details are missing
+        stop: When set, remaining places keep their basic info only (optional)
+        partial: Set when places are left without a record (interrupted,
+            too many failures) (optional)
+
+    Returns:
+        Number of records built
+    """
+    built = 0
+    failed_details = 0
+    max_failures = len(establishments) // 2  # Allow up to 50% failures
+    budget_reached = False
+    stopped = False
+
+    def add(record: Dict):
+        nonlocal built
+        built += 1
+        if on_record:
+            on_record(record)
+
+    for i, place in enumerate(sorted(establishments, key=place_priority, reverse=True), 1):
+        if stop is not None and stop.is_set() and not stopped:
+            log(f"  Stopped, {len(establishments) - i + 1} establishments kept without details")
+            stopped = True
+
+        # Search already returned contact fields, or no budget left for details
+        if not strategy.details_field_mask or budget_reached or stopped or \
+                (strategy.max_details is not None and i > strategy.max_details):
+            contact_data = build_record(place, place if not strategy.details_field_mask else None)
+            add(contact_data)
+            if dns_cache and contact_data['website']:
+                dns_cache.prefetch([request_host(contact_data['website'])])
+            continue
+
+        place_name = place.get('name', 'N/A')
+
+        try:
+            details = google_client.get_place_details(place['place_id'])
+
+            if details:
+                # Base data with validation
+                contact_data = build_record(place, details)
+                add(contact_data)
+                log(f"  {i}/{len(establishments)} - {place_name}... OK")
+
+                # Resolve the website host in the background, ahead of scraping
+                if dns_cache and contact_data['website']:
+                    dns_cache.prefetch([request_host(contact_data['website'])])
+            else:
+                # Place details failed, but keep basic info
+                add(build_record(place))
+                failed_details += 1
+                log(f"  {i}/{len(establishments)} - {place_name}... WARNING: No details")
+
+        except BudgetExceeded as e:
+            # Keep basic info for this place and the remaining ones
+            log(f"  {i}/{len(establishments)} - {place_name}... STOPPED: {e}")
+            add(build_record(place))
+            budget_reached = True
+        except KeyboardInterrupt:
+            log("\nERROR: Interrupted by user")
+            if partial is not None:
+                partial.set()
+            break
+        except Exception as e:
+            failed_details += 1
+            log(f"  {i}/{len(establishments)} - {place_name}... ERROR: {str(e)[:30]}")
+
+            # Keep basic info even if details fail
+            try:
+                add(build_record(place))
+            except Exception:
+                if partial is not None:
+                    partial.set()
+                continue
+
+            # Stop if too many failures
+            if failed_details > max_failures:
+                log(f"\nERROR: Too many failures ({failed_details}/{len(establishments)}), stopping")
+                if partial is not None and i < len(establishments):
+                    partial.set()
+                break
+
+    if budget_reached:
+        log("\nWARNING: API budget reached, remaining establishments exported without details")
+
+    if failed_details > 0:
+        log(f"\nWARNING: {failed_details}/{len(establishments)} establishments without complete details")
+
+    return built
+
+
+def scrape_places(scraper: ContactScraper, records: Iterable[Dict], scheduler: HostScheduler,
+                  log: Callable[[str], None] = print,
+                  on_record: Optional[Callable[[Dict], None]] = None,
+                  stop: Optional[threading.Event] = None,
+                  countries: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Scrape the websites of records and fill in reservation phone and email.
+
+    Each distinct website is scraped once (see normalize_url) and its
+    contacts are copied to every record using it. Records may be a list,
+    whose sites are scheduled by decreasing priority of their best place
+    (see place_priority), or a stream from the details stage (see
+    run_overlapped), scraped as they arrive.
+
+    Args:
+        scraper: Contact scraper
+        records: Records to update in place, a list or an iterable filled as they are built
+        scheduler: Per-host scheduler running the scrapes
+        log: Function receiving progress lines
+        on_record: Called with each record once it is final (optional)
+        stop: When set, remaining sites are left unscraped (optional)
+        countries: Phone countries for this run (default: the scraper's)
+
+    Returns:
+        Statistics: 'successful', 'failed', 'avoided_fetches', 'distinct_sites'
+    """
+    stats = {'successful': 0, 'failed': 0, 'avoided_fetches': 0, 'distinct_sites': 0}
+    total = None
+    if isinstance(records, list):
+        # The first place of a site is then its best one
+        records = sorted(records, key=place_priority, reverse=True)
+        total = len({normalize_url(data['website']) or data['website'] for data in records if data.get('website')})
+
+    places_by_site: Dict[str, List[Dict]] = {}
+    results: Dict[str, Dict] = {}     # Contacts of the sites scraped so far
+    counts = {'records': 0, 'without_website': 0}
+    lock = threading.Lock()           # Sites are read in the scheduler's reader thread
+    fetch = scraper.scrape_contact_info
+    if countries:
+        fetch = functools.partial(fetch, countries=countries)
+
+    def apply(contact_info: Dict, places: List[Dict]):
+        """Copy a site's contacts to its places."""
+        for data in places:
+            data['scrape_status'] = contact_info.get('status') or ''
+        if contact_info.get('failed'):
+            return
+        for data in places:
+            contact_found = False
+            if contact_info.get('reservation_phone'):
+                data['reservation_phone'] = contact_info['reservation_phone']
+                contact_found = True
+
+            if contact_info.get('email'):
+                data['email'] = contact_info['email']
+                contact_found = True
+
+            if contact_found:
+                stats['successful'] += 1
+
+    def link_archived(site_key: str, places: List[Dict]):
+        """Tie places to their site's archived page, for offline re-extraction."""
+        status = results[site_key].get('status') or ''
+        # Only pages that were downloaded and read are in the archive
+        if scraper.archive and (status.startswith('OK') or status == 'No contact found'):
+            scraper.archive.link_places(places_by_site[site_key][0]['website'],
+                                        [data['place_id'] for data in places])
+
+    def site_urls() -> Iterator[Tuple[str, str]]:
+        """Distinct sites to scrape, records without one being final at once."""
+        for data in records:
+            counts['records'] += 1
+            if not data.get('website'):
+                counts['without_website'] += 1
+                if on_record:
+                    on_record(data)
+                continue
+
+            site_key = normalize_url(data['website']) or data['website']
+            with lock:
+                places = places_by_site.get(site_key)
+                if places is None:
+                    places_by_site[site_key] = [data]
+                    stats['distinct_sites'] += 1
+                else:
+                    # Sites shared by several places (chains, hotel groups) are scraped once
+                    stats['avoided_fetches'] += 1
+                    places.append(data)
+                    if site_key in results:
+                        apply(results[site_key], [data])
+                        link_archived(site_key, [data])
+                        if on_record:
+                            on_record(data)
+                    continue
+
+            # Once stopped, sites are only collected, to be delivered unscraped
+            if stop is None or not stop.is_set():
+                yield site_key, data['website']
+
+    sites = site_urls()
+    scraped = scheduler.run(sites, fetch)
+    try:
+        for i, (site_key, contact_info) in enumerate(scraped, 1):
+            with lock:
+                places = list(places_by_site[site_key])
+                results[site_key] = contact_info
+                if contact_info.get('failed'):
+                    stats['failed'] += 1
+                apply(contact_info, places)
+                link_archived(site_key, places)
+
+            shared = f" ({len(places)} places)" if len(places) > 1 else ""
+            progress = f"{i}/{total}" if total is not None else f"{i}"
+            log(f"  {progress} - {places[0]['name'][:30]}... {contact_info.get('status')}{shared}")
+
+            if on_record:
+                for data in places:
+                    on_record(data)
+
+            if stop is not None and stop.is_set():
+                break
+
+    except KeyboardInterrupt:
+        log("\nERROR: Scraping interrupted by user")
+    finally:
+        scraped.close()
+
+    # Read the records still coming (e.g. the details stage finishing after a stop)
+    for _ in sites:
+        pass
+
+    # Records of sites that were never scraped are final as they are
+    unfinished = [places for site_key, places in places_by_site.items() if site_key not in results]
+    if unfinished and stop is not None and stop.is_set():
+        log(f"\nWARNING: Stopped, {len(unfinished)} sites left unscraped")
+    if on_record:
+        for places in unfinished:
+            for data in places:
+                on_record(data)
+
+    # Summary of scraping results
+    if counts['without_website']:
+        log(f"  {counts['without_website']}/{counts['records']} establishments without website")
+    if not stats['distinct_sites']:
+        log("  ERROR: No websites to scrape")
+        return stats
+    log(f"\nScraping complete: {stats['successful']} successful, {stats['failed']} failed")
+    if stats['avoided_fetches']:
+        log(f"  {stats['avoided_fetches']} fetches avoided ({stats['distinct_sites']} distinct sites)")
+    if scraper.structured_hits:
+        log(f"  {scraper.structured_hits} sites with contacts from structured data (JSON-LD, microdata)")
+    if scraper.platform_stats:
+        for platform in scraper.platform_stats.summary():
+            log(f"  Platform {platform['platform']}: {platform['pages']} pages, "
+                f"{platform['hit_rate']:.0%} complete without generic scan, {platform['ms_per_page']:.1f} ms/page")
+    if scraper.dead_host_skips:
+        log(f"  {scraper.dead_host_skips} sites skipped (domain not found)")
+    if scraper.unscrapable_skips:
+        log(f"  {scraper.unscrapable_skips} sites skipped (unscrapable in a previous run)")
+    if scraper.breakers.rejected:
+        log(f"  {scraper.breakers.rejected} requests failed fast (circuit open for their host or provider)")
+    if scheduler.disallowed:
+        log(f"  {scheduler.disallowed} sites skipped (disallowed by robots.txt)")
+    if scheduler.retries:
+        log(f"  {scheduler.retries} transient failures retried later, without blocking a worker")
+    if scraper.egress_pool:
+        for egress in scraper.egress_pool.stats():
+            log(f"  Egress {egress['egress']}: {egress['requests']} requests, {egress['rate_limited']} rate limited, "
+                f"{egress['failures']} failed" + ("" if egress['healthy'] else " (down)"))
+
+    return stats
+
+
+def merge_duplicates(establishments: List[Dict], countries: Optional[List[str]] = None,
+                     log: Callable[[str], None] = print) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Merge the places the search returned several times under different place_ids.
+
+    Each group of duplicates is merged into its place with the highest
+    place_priority (see PlaceDeduplicator).
+
+    Args:
+        establishments: Places from the search
+        countries: Phone countries of the city (default: France)
+        log: Function receiving progress lines
+
+    Returns:
+        (places without duplicates, place_id of each merged duplicate -> place_id kept)
+    """
+    deduplicator = PlaceDeduplicator(countries)
+    kept, duplicates = deduplicator.dedupe(establishments, priority=place_priority)
+    if duplicates:
+        log(f"  {len(duplicates)} duplicate listings merged ({len(kept)} distinct establishments, "
+            f"{deduplicator.comparisons} comparisons)")
+    return kept, duplicates
+
+
+def place_priority(place: Dict) -> float:
+    """
+    Expected prospecting value of a place, to process the best ones first.
+
+    Well-rated places with many reviews come first; places known to have no
+    website (nothing to scrape) are halved.
+
+    Args:
+        place: Place from the search, or record
+
+    Returns:
+        Priority score, higher first
+    """
+    try:
+        rating = float(place.get('rating') or 0)
+        reviews = int(place.get('user_ratings_total') or place.get('reviews') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+    value = rating * math.log1p(max(0, reviews))
+    if 'website' in place and not place['website']:
+        value *= 0.5
+    return value
+
+
+def build_record(place: Dict, details: Optional[Dict] = None) -> Dict:
+    """
+    Build an export record from a search result and its details.
+
+    Args:
+        place: Place from the search
+        details: Place details (None if unavailable)
+
+    Returns:
+        Record with the export fields, plus whether details were fetched and
+        the status of the website's scrape ('' until scraped), which tell
+        fields left blank from fields known to be empty
+    """
+    details_fetched = details is not None
+    details = details or {}
+    return {
+        'name': place.get('name', '').strip() or 'N/A',
+        'address': place.get('formatted_address', '').strip() or 'N/A',
+        'place_id': place['place_id'],
+        'google_phone': details.get('international_phone_number', '').strip() if details.get('international_phone_number') else '',
+        'website': details.get('website', '').strip() if details.get('website') else '',
+        'rating': place.get('rating', ''),
+        'reviews': place.get('user_ratings_total', ''),
+        'type': determine_type(place),
+        'reservation_phone': '',
+        'email': '',
+        'details_fetched': details_fetched,
+        'scrape_status': ''
+    }
+
+
+def search_establishments(client: GooglePlacesClient, city: str, establishment_type: str, limit: int,
+                          log: Callable[[str], None] = print,
+                          partial: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    Search for establishments via Google Places.
+
+    A type whose search fails or is cut by the API budget is skipped and
+    partial (optional) is set: places of that type may exist all the same.
+    """
+    results = []
+
+    if establishment_type == "all":
+        types_to_search = ["restaurant", "hotel"]
+    else:
+        types_to_search = [establishment_type]
+
+    for search_type in types_to_search:
+        query = f"{search_type} in {city}"
+
+        try:
+            places = client.search_places(city, search_type)
+
+            # Limit results
+            type_limit = limit // len(types_to_search) if establishment_type == "all" else limit
+            results.extend(places[:type_limit])
+
+        except BudgetExceeded as e:
+            log(f"WARNING: {e}, skipping remaining searches")
+            if partial is not None:
+                partial.set()
+            break
+        except Exception as e:
+            log(f"WARNING: Search error for {search_type}: {e}")
+            if partial is not None:
+                partial.set()
+            continue
+
+    return results[:limit]
+
+
+def expansion_queries(city: str, search_type: str) -> List[str]:
+    """
+    Build the expanded queries of a type: every synonym in the whole city,
+    then in each arrondissement for cities that have them.
+
+    Args:
+        city: City to search
+        search_type: 'hotel' or 'restaurant'
+
+    Returns:
+        Text queries, most general first
+    """
+    keywords = HOTEL_KEYWORDS if search_type == 'hotel' else RESTAURANT_KEYWORDS
+    areas = [city]
+    for number in range(1, ARRONDISSEMENTS.get(city.strip().lower(), 0) + 1):
+        areas.append(f"{city} {number}{'er' if number == 1 else 'e'} arrondissement")
+    return [f"{keyword} in {area}" for area in areas for keyword in keywords]
+
+
+def estimate_expanded_searches(establishment_type: str, limit: int) -> int:
+    """Rough number of Text Search calls of an expanded search (about 10 new places per call)."""
+    types_count = 2 if establishment_type == "all" else 1
+    return types_count * max(1, math.ceil(limit / types_count / 10))
+
+
+def search_expanded(client: GooglePlacesClient, city: str, establishment_type: str, limit: int,
+                    max_workers: int = 4, min_new_ratio: float = 0.5,
+                    log: Callable[[str], None] = print,
+                    partial: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    Search with many synonym and arrondissement queries run concurrently.
+
+    Results are merged on place_id. A query stops paginating once less than
+    min_new_ratio of a page is new places, and no query is started once
+    enough places were found.
+
+    Args:
+        client: Google Places client
+        city: City to search
+        establishment_type: 'hotel', 'restaurant' or 'all'
+        limit: Maximum number of places
+        max_workers: Queries run at the same time
+        min_new_ratio: Fraction of new places a page needs for the query to continue
+        log: Function receiving progress lines
+        partial: Set when a query fails or the API budget stops the search (optional)
+
+    Returns:
+        Unique places, restaurants first as with search_establishments
+    """
+    max_workers = max(1, max_workers)
+    types_to_search = ["restaurant", "hotel"] if establishment_type == "all" else [establishment_type]
+    type_limit = limit // len(types_to_search) if establishment_type == "all" else limit
+
+    # Interleave types so both progress at the same pace
+    queries_by_type = [[(search_type, query) for query in expansion_queries(city, search_type)]
+                       for search_type in types_to_search]
+    pending = deque(item for group in itertools.zip_longest(*queries_by_type) for item in group if item)
+
+    seen = set()
+    found: Dict[str, List[Dict]] = {search_type: [] for search_type in types_to_search}
+    stats = {'queries': 0, 'calls': 0}
+    budget_reached = threading.Event()
+    lock = threading.Lock()
+
+    def type_full(search_type: str) -> bool:
+        return len(found[search_type]) >= type_limit
+
+    def run_query(search_type: str, query: str):
+        page_token = None
+        while not budget_reached.is_set():
+            with lock:
+                if type_full(search_type):
+                    return
+            try:
+                places, page_token = client.search_text(query, page_token=page_token)
+            except BudgetExceeded as e:
+                if not budget_reached.is_set():
+                    budget_reached.set()
+                    log(f"WARNING: {e}, skipping remaining searches")
+                if partial is not None:
+                    partial.set()
+                return
+            except Exception as e:
+                log(f"WARNING: Search error for '{query}': {e}")
+                if partial is not None:
+                    partial.set()
+                return
+
+            with lock:
+                stats['calls'] += 1
+                new_places = 0
+                for place in places:
+                    if place['place_id'] in seen:
+                        continue
+                    seen.add(place['place_id'])
+                    new_places += 1
+                    if not type_full(search_type):
+                        found[search_type].append(place)
+
+            # Mostly places already seen: further pages of this query are not worth a call
+            if not page_token or new_places < min_new_ratio * len(places):
+                return
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search") as executor:
+        running = set()
+        while pending or running:
+            while pending and len(running) < max_workers and not budget_reached.is_set():
+                search_type, query = pending.popleft()
+                with lock:
+                    if type_full(search_type):
+                        continue
+                    stats['queries'] += 1
+                running.add(executor.submit(run_query, search_type, query))
+            if not running:
+                break
+            _, running = wait(running, return_when=FIRST_COMPLETED)
+
+    unique = sum(len(places) for places in found.values())
+    log(f"  {stats['queries']} queries, {stats['calls']} searches, {unique} unique places")
+
+    results = []
+    for search_type in types_to_search:
+        results.extend(found[search_type])
+    return results[:limit]
+
+
+def determine_type(place: Dict) -> str:
+    """Determine establishment type from search context."""
+    # For now, we use the search type rather than Google types
+    # because Google Places v1 data doesn't return detailed types
+    name = place.get('name', '').lower()
+    address = place.get('formatted_address', '').lower()
+
+    # Hotel keywords
+    if any(keyword in name for keyword in HOTEL_KEYWORDS):
+        return 'hotel'
+
+    # Restaurant keywords
+    if any(keyword in name for keyword in RESTAURANT_KEYWORDS):
+        return 'restaurant'
+
+    # Default to restaurant if ambiguous
+    return 'restaurant'
+
@@ -0,0 +1,391 @@
+"""
+Detection of places listed several times under different place_ids.
+
+Google sometimes returns the same restaurant as several places whose names
+or addresses differ slightly ("Le Petit Zinc" and "Petit Zinc (Le)", "12 r.
+de la Roquette" and "12 Rue de la Roquette"), and each copy then costs a
+details call, a scrape and an export row. Comparing every pair of places
+is quadratic, so places are first put into blocks sharing a cheap key:
+the postcode with one distinctive name word, or the phone number when the
+search returned it. Only places sharing a block are compared, with a fuzzy
+name and address score, and each group of duplicates is merged into its
+best place before details and scraping.
+"""
+
+import difflib
+import re
+import sys
+import time
+import unicodedata
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from .phone_extractor import PhoneExtractor, resolve_countries
+except ImportError:
+    from phone_extractor import PhoneExtractor, resolve_countries
+
+
+# Words telling what a place is rather than which one it is, by category
+TYPE_WORDS = {
+    'hotel': 'hotel', 'hostel': 'hotel', 'auberge': 'hotel', 'gite': 'hotel', 'chambre': 'hotel',
+    'chambres': 'hotel', 'suite': 'hotel', 'suites': 'hotel', 'resort': 'hotel', 'residence': 'hotel',
+    'hostal': 'hotel',
+    'restaurant': 'restaurant', 'resto': 'restaurant', 'bistro': 'restaurant', 'bistrot': 'restaurant',
+    'brasserie': 'restaurant', 'cafe': 'restaurant', 'pizzeria': 'restaurant', 'bar': 'restaurant',
+    'bouillon': 'restaurant', 'trattoria': 'restaurant', 'taverne': 'restaurant', 'creperie': 'restaurant',
+    'restaurante': 'restaurant',
+}
+
+# Articles and prepositions of place names and streets (French, Spanish, English)
+STOPWORDS = frozenset({
+    'le', 'la', 'les', 'l', 'de', 'du', 'des', 'd', 'et', 'au', 'aux', 'a', 'chez', 'en', 'sur',
+    'el', 'los', 'las', 'del', 'y', 'the', 'and', 'of',
+})
+
+# Street abbreviations, expanded before addresses are compared
+STREET_ABBREVIATIONS = {
+    'r': 'rue', 'bd': 'boulevard', 'bld': 'boulevard', 'bvd': 'boulevard', 'av': 'avenue', 'ave': 'avenue',
+    'pl': 'place', 'fg': 'faubourg', 'fbg': 'faubourg', 'st': 'saint', 'ste': 'sainte', 'imp': 'impasse',
+    'rte': 'route', 'pas': 'passage', 'sq': 'square', 'c': 'carrer', 'cl': 'calle', 'avda': 'avenida',
+}
+
+# Postcode after a comma and before the locality: "..., 75011 Paris", "..., 1000 Bruxelles"
+_POSTCODE_REGEX = re.compile(r',\s*(\d{4,5})\s+[^\d,]')
+_WORD_REGEX = re.compile(r'[a-z0-9]+')
+_NUMBER_REGEX = re.compile(r'\b\d+\b')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase text without accents or punctuation runs."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_WORD_REGEX.findall(text.lower()))
+
+
+def name_tokens(name: Optional[str]) -> FrozenSet[str]:
+    """Distinctive words of a place name: no articles, no type words ('hotel', 'bistro')."""
+    words = normalize_text(name).split()
+    tokens = frozenset(word for word in words if word not in STOPWORDS and word not in TYPE_WORDS)
+    # A name made of generic words only ("Le Bistrot") is its own token
+    return tokens or frozenset(words)
+
+
+def name_categories(name: Optional[str]) -> Set[str]:
+    """Categories ('hotel', 'restaurant') the type words of a name point to."""
+    return {TYPE_WORDS[word] for word in normalize_text(name).split() if word in TYPE_WORDS}
+
+
+def postcode(address: Optional[str]) -> str:
+    """Postcode of an address, empty string if none is found."""
+    match = _POSTCODE_REGEX.search(address or '')
+    return match.group(1) if match else ''
+
+
+def street_parts(address: Optional[str]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Street numbers and street words of an address (the part before the postcode).
+
+    Returns:
+        (numbers, words), abbreviations expanded
+    """
+    address = address or ''
+    match = _POSTCODE_REGEX.search(address)
+    street = normalize_text(address[:match.start()] if match else address.split(',')[0])
+    numbers = frozenset(_NUMBER_REGEX.findall(street))
+    words = frozenset(
+        STREET_ABBREVIATIONS.get(word, word) for word in street.split()
+        if not word.isdigit() and word not in STOPWORDS and word not in ('bis', 'ter')
+    )
+    return numbers, words
+
+
+class PlaceKey(NamedTuple):
+    """Normalized fields of a place, computed once for all its comparisons."""
+    tokens: FrozenSet[str]          # Distinctive name words
+    sorted_name: str                # Distinctive words, sorted, for typo tolerance
+    categories: FrozenSet[str]      # 'hotel' / 'restaurant' from the name
+    numbers: FrozenSet[str]         # Street numbers
+    street: FrozenSet[str]          # Street words
+    postcode: str
+    phone: str                      # E.164, empty if unknown
+
+
+def name_similarity(key_a: PlaceKey, key_b: PlaceKey, minimum: float = 0.0) -> float:
+    """
+    Fuzzy similarity of two place names, from 0 to 1.
+
+    The best of the distinctive word overlap (word order and generic words
+    ignored) and of the character similarity of the sorted words (typos).
+
+    Args:
+        key_a: PlaceKey of the first place
+        key_b: PlaceKey of the second place
+        minimum: Score below which the exact value does not matter: the
+            character similarity is skipped when its upper bounds are lower
+
+    Returns:
+        Similarity score
+    """
+    if not key_a.tokens or not key_b.tokens:
+        return 0.0
+    overlap = len(key_a.tokens & key_b.tokens) / max(len(key_a.tokens), len(key_b.tokens))
+    floor = max(overlap, minimum)
+    if overlap == 1.0:
+        return overlap
+    matcher = difflib.SequenceMatcher(None, key_a.sorted_name, key_b.sorted_name, autojunk=False)
+    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+        return overlap
+    return max(overlap, matcher.ratio())
+
+
+def address_similarity(key_a: PlaceKey, key_b: PlaceKey) -> float:
+    """
+    Fuzzy similarity of two street addresses, from 0 to 1.
+
+    Different street numbers mean different places; otherwise the share of
+    street words of the shorter address found in the other one.
+    """
+    if not key_a.street or not key_b.street:
+        return 0.0
+    if key_a.numbers and key_b.numbers and not key_a.numbers & key_b.numbers:
+        return 0.0
+    return len(key_a.street & key_b.street) / min(len(key_a.street), len(key_b.street))
+
+
+class PlaceDeduplicator:
+    """Finds and merges duplicate places with a blocking index."""
+
+    def __init__(self, countries: Optional[Iterable[str]] = None, name_threshold: float = 0.85,
+                 address_threshold: float = 0.6, phone_name_threshold: float = 0.5,
+                 max_block_size: int = 50):
+        """
+        Args:
+            countries: Phone countries used to normalize phone numbers (default: France)
+            name_threshold: Name similarity needed, with a matching address, for a duplicate
+            address_threshold: Address similarity needed, with a matching name
+            phone_name_threshold: Name similarity needed for places with the same phone number
+            max_block_size: Blocks larger than this are skipped: their key (a very common
+                word in a postcode) tells nothing, and comparing them would be quadratic again
+        """
+        self.phone_extractor = PhoneExtractor(resolve_countries(countries))
+        self.name_threshold = name_threshold
+        self.address_threshold = address_threshold
+        self.phone_name_threshold = phone_name_threshold
+        self.max_block_size = max_block_size
+        self.comparisons = 0      # Pairs scored by the last find_duplicates()
+        self.skipped_blocks = 0   # Blocks over max_block_size in the last find_duplicates()
+
+    def place_key(self, place: Dict) -> PlaceKey:
+        """
+        Normalize the fields of a place once, for blocking and comparisons.
+
+        Args:
+            place: Place from the search, or record
+
+        Returns:
+            PlaceKey of the place
+        """
+        name = place.get('name')
+        address = place.get('formatted_address') or place.get('address')
+        tokens = name_tokens(name)
+        numbers, street = street_parts(address)
+        phone = place.get('international_phone_number') or place.get('google_phone')
+        return PlaceKey(
+            tokens=tokens,
+            sorted_name=' '.join(sorted(tokens)),
+            categories=frozenset(name_categories(name)),
+            numbers=numbers,
+            street=street,
+            postcode=postcode(address),
+            phone=self.phone_extractor.to_e164(phone) if phone else '',
+        )
+
+    def blocking_keys(self, key: PlaceKey) -> Set[Tuple[str, str]]:
+        """Blocks of a place: postcode with each distinctive name word, and phone number."""
+        blocks = {('name', f"{key.postcode} {token}") for token in key.tokens}
+        if key.phone:
+            blocks.add(('phone', key.phone))
+        return blocks
+
+    def is_duplicate(self, key_a: PlaceKey, key_b: PlaceKey) -> bool:
+        """
+        Decide whether two places are the same establishment.
+
+        Args:
+            key_a: PlaceKey of the first place
+            key_b: PlaceKey of the second place
+
+        Returns:
+            True for the same name at the same address, or the same phone
+            number under a similar name
+        """
+        # A hotel and its restaurant share name and address but are two prospects
+        if key_a.categories and key_b.categories and not key_a.categories & key_b.categories:
+            return False
+
+        same_phone = bool(key_a.phone) and key_a.phone == key_b.phone
+        name_score = name_similarity(key_a, key_b,
+                                     self.phone_name_threshold if same_phone else self.name_threshold)
+        if same_phone and name_score >= self.phone_name_threshold:
+            return True
+        if name_score < self.name_threshold:
+            return False
+        return address_similarity(key_a, key_b) >= self.address_threshold
+
+    def find_duplicates(self, places: List[Dict]) -> List[List[int]]:
+        """
+        Group duplicate places, comparing only the places of a same block.
+
+        Args:
+            places: Places from the search, or records
+
+        Returns:
+            Groups of two or more indexes into places, each group one establishment
+        """
+        keys = [self.place_key(place) for place in places]
+        blocks: Dict[Tuple[str, str], List[int]] = {}
+        for i, key in enumerate(keys):
+            for block in self.blocking_keys(key):
+                blocks.setdefault(block, []).append(i)
+
+        # Union-find: duplicates of duplicates are one group
+        parent = list(range(len(places)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        compared: Set[Tuple[int, int]] = set()
+        self.comparisons = 0
+        self.skipped_blocks = 0
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            if len(members) > self.max_block_size:
+                self.skipped_blocks += 1
+                continue
+            for position, i in enumerate(members):
+                for j in members[position + 1:]:
+                    if (i, j) in compared or root(i) == root(j):
+                        continue
+                    compared.add((i, j))
+                    self.comparisons += 1
+                    if self.is_duplicate(keys[i], keys[j]):
+                        parent[root(j)] = root(i)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(places)):
+            groups.setdefault(root(i), []).append(i)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def dedupe(self, places: List[Dict],
+               priority: Optional[Callable[[Dict], float]] = None) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Merge each group of duplicate places into its best place.
+
+        The kept place takes the contact fields it lacks (website, phone)
+        from its duplicates. Places keep their order.
+
+        Args:
+            places: Places from the search
+            priority: Score choosing the place kept in a group, highest kept
+                (default: the first place of the group)
+
+        Returns:
+            (places without duplicates, place_id of each merged duplicate -> place_id kept)
+        """
+        merged: Dict[str, str] = {}
+        dropped: Set[int] = set()
+        for group in self.find_duplicates(places):
+            kept = max(group, key=lambda i: priority(places[i])) if priority else group[0]
+            for i in group:
+                if i == kept:
+                    continue
+                for field in ('website', 'international_phone_number'):
+                    if places[i].get(field) and not places[kept].get(field):
+                        places[kept][field] = places[i][field]
+                merged[places[i]['place_id']] = places[kept]['place_id']
+                dropped.add(i)
+        return [place for i, place in enumerate(places) if i not in dropped], merged
+
+
+def dedupe_places(places: List[Dict], countries: Optional[Iterable[str]] = None,
+                  priority: Optional[Callable[[Dict], float]] = None) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Merge the places listed several times (see PlaceDeduplicator.dedupe).
+
+    Args:
+        places: Places from the search
+        countries: Phone countries of the city (default: France)
+        priority: Score choosing the place kept in a group, highest kept
+
+    Returns:
+        (places without duplicates, place_id of each merged duplicate -> place_id kept)
+    """
+    return PlaceDeduplicator(countries).dedupe(places, priority)
+
+
+def benchmark_dedup(count: int = 5000):
+    """
+    Microbenchmark: blocked comparisons against all pairs on synthetic
+    places, a tenth of them listed twice with a variant name and address.
+    """
+    streets = ['Rue de la Roquette', 'Boulevard Voltaire', 'Avenue Parmentier', 'Rue Oberkampf',
+               'Rue de Charonne', 'Rue du Faubourg Saint-Antoine']
+    words = ['Zinc', 'Comptoir', 'Marché', 'Canard', 'Olivier', 'Cigale', 'Moulin', 'Fontaine',
+             'Tilleul', 'Rosier', 'Pavé', 'Galopin', 'Bouchon', 'Potager', 'Soleil', 'Ardoise']
+    places = []
+    for i in range(count):
+        name = f"Le {words[i % len(words)]} {words[(i // len(words)) % len(words)]} {i}"
+        address = f"{i % 180 + 1} {streets[i % len(streets)]}, 750{i % 20 + 1:02d} Paris, France"
+        places.append({'place_id': f"p{i}", 'name': name, 'formatted_address': address})
+        if i % 10 == 0:
+            variant = address.replace('Rue ', 'r. ').replace('Boulevard ', 'Bd ')
+            places.append({'place_id': f"p{i}-dup", 'name': f"{name.replace('Le ', '')} (Le)",
+                           'formatted_address': variant})
+
+    deduplicator = PlaceDeduplicator()
+    start = time.perf_counter()
+    groups = deduplicator.find_duplicates(places)
+    blocked = time.perf_counter() - start
+
+    # All pairs, on a sample: the full run would take minutes
+    sample = places[:1000]
+    start = time.perf_counter()
+    keys = [deduplicator.place_key(place) for place in sample]
+    for i, key in enumerate(keys):
+        for other in keys[i + 1:]:
+            deduplicator.is_duplicate(key, other)
+    sampled = time.perf_counter() - start
+    all_pairs = len(places) * (len(places) - 1) // 2
+    estimated = sampled * all_pairs / (len(sample) * (len(sample) - 1) // 2)
+
+    print(f"=== Duplicate Detection Benchmark ({len(places)} places, {count // 10} listed twice) ===")
+    print(f"Blocked:   {deduplicator.comparisons:>10} comparisons {blocked:8.2f} s  {len(groups)} groups found")
+    print(f"All pairs: {all_pairs:>10} comparisons {estimated:8.2f} s  (estimated from {len(sample)} places)")
+
+
+if __name__ == "__main__":
+    if '--benchmark' in sys.argv[1:]:
+        benchmark_dedup()
+    else:
+        samples = [
+            {'place_id': 'a', 'name': 'Le Petit Zinc', 'formatted_address': '12 Rue de la Roquette, 75011 Paris, France'},
+            {'place_id': 'b', 'name': 'Petit Zinc (Le)', 'formatted_address': '12 r. de la Roquette, 75011 Paris'},
+            {'place_id': 'c', 'name': 'Le Petit Zinc', 'formatted_address': '40 Rue de la Roquette, 75011 Paris, France'},
+            {'place_id': 'd', 'name': 'Hôtel Lutetia', 'formatted_address': '45 Bd Raspail, 75006 Paris, France'},
+            {'place_id': 'e', 'name': 'Brasserie Lutetia', 'formatted_address': '45 Boulevard Raspail, 75006 Paris'},
+            {'place_id': 'f', 'name': 'Chez Janou', 'formatted_address': '2 Rue Roger Verlomme, 75003 Paris',
+             'international_phone_number': '01 42 72 28 41'},
+            {'place_id': 'g', 'name': 'Janou Restaurant', 'formatted_address': 'Rue Roger Verlomme, Paris',
+             'international_phone_number': '+33 1 42 72 28 41'},
+        ]
+        kept, merged = dedupe_places(samples)
+        for place in kept:
+            print(f"{place['place_id']}  {place['name']:<20} {place['formatted_address']}")
+        for duplicate, place_id in merged.items():
+            print(f"{duplicate} merged into {place_id}")
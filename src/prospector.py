@@ -5,13 +5,14 @@ Main CLI for hotel and restaurant prospecting.
 
 import argparse
 import sys
-import time
 import requests
-from typing import List, Dict, Optional
 
-from google_places import GooglePlacesClient
-from contact_scraper import ContactScraper
-from exporter import Exporter
+from api_budget import BudgetExceeded
+from exporter import COLUMNAR_FORMATS, HAS_PYARROW, ColumnarWriter, Exporter
+from cache_store import DEFAULT_CACHE_DIR
+from host_scheduler import RETRY_BUDGET
+from pipeline import ProgressEvent, prospect
+from phone_extractor import PHONE_FORMATS
 
 
 def main():
@@ -46,6 +47,18 @@ def main():
         help="Disable website scraping (faster)"
     )
 
+    parser.add_argument(
+        "--expand",
+        action="store_true",
+        help="Search synonyms (brasserie, auberge...) and arrondissements to find more places"
+    )
+
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Keep places listed several times under different Google IDs (default: merged before details)"
+    )
+
     parser.add_argument(
         "--output",
         default="prospection",
@@ -59,203 +72,222 @@ def main():
         help="Export format (default: csv)"
     )
 
+    parser.add_argument(
+        "--columnar",
+        choices=list(COLUMNAR_FORMATS),
+        help="Also write typed columns to <output>.parquet or <output>.arrow as records arrive "
+             "(requires pyarrow)"
+    )
+
+    parser.add_argument(
+        "--delta",
+        choices=["csv", "ndjson"],
+        help="Also write the records added, changed or removed since the previous delta export "
+             "to <output>.delta.<format> (state kept in <output>.delta-state.json)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of websites scraped concurrently (default: 8)"
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Folder for caches shared across runs (default: {DEFAULT_CACHE_DIR})"
+    )
+
+    parser.add_argument(
+        "--max-api-cost",
+        type=float,
+        help="Maximum estimated Google API cost for the run, in USD"
+    )
+
+    parser.add_argument(
+        "--max-api-calls",
+        type=int,
+        help="Maximum number of Google API calls for the run"
+    )
+
+    parser.add_argument(
+        "--country",
+        type=str.upper,
+        choices=list(PHONE_FORMATS),
+        default="FR",
+        help="Country of the city, for phone number formats (default: FR)"
+    )
+
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop after this many seconds and export what is done, best places first (default: no limit)"
+    )
+
+    parser.add_argument(
+        "--site-deadline",
+        type=float,
+        default=20.0,
+        help="Maximum seconds spent scraping one website, retries included (default: 20)"
+    )
+
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=RETRY_BUDGET,
+        help="Maximum number of transient scrape failures (503, 429, timeouts) retried later in the run "
+             f"(default: {RETRY_BUDGET})"
+    )
+
+    parser.add_argument(
+        "--egress",
+        action="append",
+        metavar="SPEC",
+        help="Proxy URL (http://host:port) or local source address to scrape through; "
+             "repeat to spread requests per host over several egresses (default: direct)"
+    )
+
+    parser.add_argument(
+        "--archive",
+        help="Append every page downloaded to this archive (e.g. pages.warc.gz), "
+             "for offline re-extraction with reextract.py"
+    )
+
+    parser.add_argument(
+        "--queue",
+        help="Work queue file (SQLite, on shared storage): scraping is done by scrape_worker.py processes"
+    )
+
+    parser.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=600,
+        help="With --queue, stop waiting after this many seconds without results (default: 600)"
+    )
+
     args = parser.parse_args()
 
-    # Initialize clients
-    print(f"Searching for establishments in {args.city}...")
+    # Validate arguments
+    if args.limit <= 0:
+        print(f"ERROR: Invalid limit: {args.limit} (must be > 0)")
+        sys.exit(1)
+    elif args.workers <= 0:
+        print(f"ERROR: Invalid workers: {args.workers} (must be > 0)")
+        sys.exit(1)
+    elif args.time_budget is not None and args.time_budget <= 0:
+        print(f"ERROR: Invalid time budget: {args.time_budget} (must be > 0)")
+        sys.exit(1)
+    elif args.retry_budget < 0:
+        print(f"ERROR: Invalid retry budget: {args.retry_budget} (must be >= 0)")
+        sys.exit(1)
+    elif args.columnar and not HAS_PYARROW:
+        print("ERROR: --columnar requires pyarrow")
+        print("  Install it with: pip install pyarrow")
+        sys.exit(1)
+    if args.archive and args.queue:
+        print("WARNING: --archive is ignored with --queue, start the workers with --archive instead")
+    if args.limit > 500:
+        print(f"WARNING: Very high limit: {args.limit}, this may take a while")
 
-    try:
-        google_client = GooglePlacesClient()
-        scraper = ContactScraper() if not args.no_scrape else None
-        exporter = Exporter()
+    budget_set = args.max_api_cost is not None or args.max_api_calls is not None
 
-        # Validate arguments
-        if args.limit <= 0:
-            print(f"ERROR: Invalid limit: {args.limit} (must be > 0)")
-            sys.exit(1)
-        elif args.limit > 500:
-            print(f"WARNING: Very high limit: {args.limit}, this may take a while")
+    def print_event(event: ProgressEvent):
+        # The plan only matters when a budget constrains it
+        if event.stage == 'plan' and not budget_set:
+            return
+        if event.stage != 'done':
+            print(event.message)
 
+    try:
+        run = prospect(
+            args.city,
+            args.type,
+            args.limit,
+            scrape=not args.no_scrape,
+            expand=args.expand,
+            workers=args.workers,
+            cache_dir=args.cache_dir,
+            max_api_cost=args.max_api_cost,
+            max_api_calls=args.max_api_calls,
+            site_deadline=args.site_deadline,
+            work_queue=args.queue,
+            queue_timeout=args.queue_timeout,
+            country=args.country,
+            time_budget=args.time_budget,
+            egresses=args.egress,
+            dedup=not args.keep_duplicates,
+            archive=args.archive,
+            retry_budget=args.retry_budget,
+            on_event=print_event
+        )
     except ValueError as e:
         if "GOOGLE_MAPS_API_KEY" in str(e):
             print("ERROR: Missing Google API key")
             print("  Create a .env file with GOOGLE_MAPS_API_KEY=your_key")
-            sys.exit(1)
         else:
             print(f"ERROR: Configuration error: {e}")
-            sys.exit(1)
+        sys.exit(1)
+    except BudgetExceeded:
+        print("ERROR: API budget too low for the search itself")
+        sys.exit(1)
     except Exception as e:
         print(f"ERROR: Unexpected initialization error: {e}")
         sys.exit(1)
 
-    # Google Places search
-    try:
-        establishments = search_establishments(
-            google_client,
-            args.city,
-            args.type,
-            args.limit
-        )
+    exporter = Exporter()
+    enriched_data = []
 
-        if not establishments:
-            print(f"ERROR: No establishments found for {args.city}")
-            print(f"  Check the spelling of '{args.city}' or try a more well-known city")
+    # Columnar output is written in row groups as records arrive
+    columnar = None
+    if args.columnar:
+        columnar_file = f"{args.output}.{COLUMNAR_FORMATS[args.columnar]}"
+        try:
+            columnar = ColumnarWriter(columnar_file, args.columnar)
+        except OSError as e:
+            print(f"ERROR: Cannot write {columnar_file}: {e}")
             sys.exit(1)
 
-        print(f"OK: {len(establishments)} establishments found")
+    def collect(records):
+        for record in records:
+            enriched_data.append(record)
+            if columnar:
+                columnar.write(record)
 
-    except ValueError as e:
-        print(f"ERROR: Search parameter error: {e}")
-        sys.exit(1)
+    try:
+        try:
+            collect(run)
+        except KeyboardInterrupt:
+            print("\nERROR: Interrupted by user")
+            # Remaining places are delivered without further work
+            run.cancel()
+            collect(run)
     except requests.RequestException as e:
+        if columnar:
+            columnar.abort()
         print(f"ERROR: Google Places connection error: {e}")
         print("  Check your internet connection and API key")
         sys.exit(1)
     except Exception as e:
-        print(f"ERROR: Unexpected search error: {e}")
+        if columnar:
+            columnar.abort()
+        print(f"ERROR: Unexpected error: {e}")
         sys.exit(1)
 
-    # Enrich with Google details
-    print("Fetching details...")
-    enriched_data = []
-    failed_details = 0
-    max_failures = len(establishments) // 2  # Allow up to 50% failures
-
-    for i, place in enumerate(establishments, 1):
-        place_name = place.get('name', 'N/A')
-        print(f"  {i}/{len(establishments)} - {place_name}...", end=" ")
-
-        try:
-            details = google_client.get_place_details(place['place_id'])
-
-            if details:
-                # Base data with validation
-                contact_data = {
-                    'name': place.get('name', '').strip() or 'N/A',
-                    'address': place.get('formatted_address', '').strip() or 'N/A',
-                    'place_id': place['place_id'],
-                    'google_phone': details.get('international_phone_number', '').strip() if details.get('international_phone_number') else '',
-                    'website': details.get('website', '').strip() if details.get('website') else '',
-                    'rating': place.get('rating', ''),
-                    'reviews': place.get('user_ratings_total', ''),
-                    'type': determine_type(place),
-                    'reservation_phone': '',
-                    'email': ''
-                }
-
-                enriched_data.append(contact_data)
-                print("OK")
-            else:
-                # Place details failed, but keep basic info
-                contact_data = {
-                    'name': place.get('name', '').strip() or 'N/A',
-                    'address': place.get('formatted_address', '').strip() or 'N/A',
-                    'place_id': place['place_id'],
-                    'google_phone': '',
-                    'website': '',
-                    'rating': place.get('rating', ''),
-                    'reviews': place.get('user_ratings_total', ''),
-                    'type': determine_type(place),
-                    'reservation_phone': '',
-                    'email': ''
-                }
-                enriched_data.append(contact_data)
-                failed_details += 1
-                print("WARNING: No details")
-
-            time.sleep(1)  # Respect API rate limits
-
-        except KeyboardInterrupt:
-            print("\nERROR: Interrupted by user")
-            break
-        except Exception as e:
-            failed_details += 1
-            print(f"ERROR: {str(e)[:30]}")
-
-            # Keep basic info even if details fail
-            try:
-                contact_data = {
-                    'name': place.get('name', '').strip() or 'N/A',
-                    'address': place.get('formatted_address', '').strip() or 'N/A',
-                    'place_id': place['place_id'],
-                    'google_phone': '',
-                    'website': '',
-                    'rating': place.get('rating', ''),
-                    'reviews': place.get('user_ratings_total', ''),
-                    'type': determine_type(place),
-                    'reservation_phone': '',
-                    'email': ''
-                }
-                enriched_data.append(contact_data)
-            except Exception:
-                continue
-
-            # Stop if too many failures
-            if failed_details > max_failures:
-                print(f"\nERROR: Too many failures ({failed_details}/{len(establishments)}), stopping")
-                break
-
-    if failed_details > 0:
-        print(f"\nWARNING: {failed_details}/{len(establishments)} establishments without complete details")
-
-    # Scrape websites if requested
-    if scraper and not args.no_scrape:
-        print("\nScraping websites for contacts...")
-
-        sites_to_scrape = [data for data in enriched_data if data.get('website')]
-        sites_without_website = len(enriched_data) - len(sites_to_scrape)
-
-        if sites_without_website > 0:
-            print(f"  {sites_without_website}/{len(enriched_data)} establishments without website")
-
-        if not sites_to_scrape:
-            print("  ERROR: No websites to scrape")
-        else:
-            scraping_failures = 0
-            successful_scrapes = 0
-            max_scraping_failures = len(sites_to_scrape) // 3  # Allow up to 33% failures
-
-            for i, data in enumerate(enriched_data, 1):
-                if not data.get('website'):
-                    continue
-
-                print(f"  {i}/{len(enriched_data)} - {data['name'][:30]}... ", end="")
-
-                try:
-                    contact_info = scraper.scrape_contact_info(data['website'])
-
-                    # Update data with extracted information
-                    contact_found = False
-                    if contact_info.get('reservation_phone'):
-                        data['reservation_phone'] = contact_info['reservation_phone']
-                        contact_found = True
-
-                    if contact_info.get('email'):
-                        data['email'] = contact_info['email']
-                        contact_found = True
-
-                    if contact_found:
-                        successful_scrapes += 1
-
-                except KeyboardInterrupt:
-                    print("\nERROR: Scraping interrupted by user")
-                    break
-                except Exception as e:
-                    scraping_failures += 1
-                    print(f"ERROR: {str(e)[:30]}")
-
-                    # Stop if too many scraping failures
-                    if scraping_failures > max_scraping_failures:
-                        print(f"\nWARNING: Too many scraping failures ({scraping_failures}/{len(sites_to_scrape)})")
-                        print("  Continuing without scraping remaining sites...")
-                        break
+    if not run.place_ids:
+        if columnar:
+            columnar.abort()
+        print(f"  Check the spelling of '{args.city}' or try a more well-known city")
+        sys.exit(1)
 
-            # Summary of scraping results
-            if sites_to_scrape:
-                print(f"\nScraping complete: {successful_scrapes} successful, {scraping_failures} failed")
+    # Records arrive as they finish, export them in search order
+    search_order = {place_id: i for i, place_id in enumerate(run.place_ids)}
+    enriched_data.sort(key=lambda record: search_order.get(record.get('place_id'), len(search_order)))
 
     # Final data validation
     if not enriched_data:
+        if columnar:
+            columnar.abort()
         print("ERROR: No data to export")
         sys.exit(1)
 
@@ -292,6 +324,30 @@ def main():
             else:
                 print("OK")
 
+        if columnar:
+            print(f"  Exporting {args.columnar.capitalize()}...", end=" ")
+            if not exporter.finish_columnar(columnar):
+                export_success = False
+                print("FAILED")
+            else:
+                print("OK")
+
+        if args.delta:
+            print("  Exporting delta...", end=" ")
+            delta_counts = exporter.export_delta(
+                enriched_data, f"{args.output}.delta.{args.delta}",
+                f"{args.output}.delta-state.json", args.delta,
+                query=f"{args.city.strip().lower()}|{args.type}" + ("|expand" if args.expand else ""),
+                limit=args.limit, complete=run.complete
+            )
+            if delta_counts is None:
+                export_success = False
+                print("FAILED")
+            else:
+                print("OK")
+                if not run.complete:
+                    print("  WARNING: Incomplete run, missing places kept in the delta state")
+
         if not export_success:
             print("ERROR: Export failed")
             sys.exit(1)
@@ -309,7 +365,7 @@ def main():
         sys.exit(1)
 
     print(f"\nProspecting completed successfully!")
-    print(f"Generated files: {args.output}.{args.format}")
+    print(f"Generated files: {args.output}.{args.format}" + (f", {columnar.filename}" if columnar else ""))
 
     # Statistics summary
     stats_summary = []
@@ -320,58 +376,17 @@ def main():
     print(f"Summary:")
     print(f"  - {len(enriched_data)} establishments exported")
     print(f"  - {successful_places} with complete Google data")
+    if run.duplicates:
+        print(f"  - {len(run.duplicates)} duplicate listings merged")
     if not args.no_scrape:
         print(f"  - {with_reservation_phone} with reservation phone")
         print(f"  - {with_email} with email address")
+    if run.time_budget_reached:
+        print(f"  - Stopped by the {args.time_budget:.0f}s time budget: best places were processed first")
 
-
-def search_establishments(client: GooglePlacesClient, city: str, establishment_type: str, limit: int) -> List[Dict]:
-    """Search for establishments via Google Places."""
-    results = []
-
-    if establishment_type == "all":
-        types_to_search = ["restaurant", "hotel"]
-    else:
-        types_to_search = [establishment_type]
-
-    for search_type in types_to_search:
-        query = f"{search_type} in {city}"
-
-        try:
-            places = client.search_places(city, search_type)
-
-            # Limit results
-            type_limit = limit // len(types_to_search) if establishment_type == "all" else limit
-            results.extend(places[:type_limit])
-
-            time.sleep(1)  # Rate limiting
-
-        except Exception as e:
-            print(f"WARNING: Search error for {search_type}: {e}")
-            continue
-
-    return results[:limit]
-
-
-def determine_type(place: Dict) -> str:
-    """Determine establishment type from search context."""
-    # For now, we use the search type rather than Google types
-    # because Google Places v1 data doesn't return detailed types
-    name = place.get('name', '').lower()
-    address = place.get('formatted_address', '').lower()
-
-    # Hotel keywords
-    hotel_keywords = ['hotel', 'auberge', 'gite', 'chambre', 'suite', 'resort']
-    if any(keyword in name for keyword in hotel_keywords):
-        return 'hotel'
-
-    # Restaurant keywords
-    restaurant_keywords = ['restaurant', 'bistro', 'brasserie', 'cafe', 'pizzeria', 'bar', 'bouillon']
-    if any(keyword in name for keyword in restaurant_keywords):
-        return 'restaurant'
-
-    # Default to restaurant if ambiguous
-    return 'restaurant'
+    print("Google API usage:")
+    for line in run.usage.summary():
+        print(f"  - {line}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,29 @@
+"""
+Thread-safe rate limiter shared by concurrent callers.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces calls by a minimum interval, across all threads."""
+
+    def __init__(self, min_interval: float = 1.0):
+        """
+        Args:
+            min_interval: Minimum delay between two calls (seconds)
+        """
+        self.min_interval = min_interval
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed, then reserve it."""
+        with self._lock:
+            now = time.monotonic()
+            call_at = max(now, self._next_call)
+            self._next_call = call_at + self.min_interval
+
+        if call_at > now:
+            time.sleep(call_at - now)
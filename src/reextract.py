@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Offline re-extraction of contacts from a page archive.
+
+Re-runs the current extractors (PhoneExtractor, email filters, site
+platforms...) over the pages a previous run archived with --archive, and
+updates the reservation phone and email of the exported records, without
+any network access. Pages are spread over one process per core; each
+process maps the archive into memory once and decompresses only the
+records it is given.
+
+Records are matched to pages by place_id (metadata records written while
+scraping), then by website URL, normalized as for scraping.
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from contact_scraper import ContactScraper
+from exporter import Exporter
+from page_archive import ArchiveEntry, PageArchive, parse_response, read_record
+from page_decoder import decode_body
+from phone_extractor import PHONE_FORMATS
+from url_utils import normalize_url
+
+
+# Per worker process: the mapped archive and a scraper used for extraction only
+_buffer: Optional[mmap.mmap] = None
+_scraper: Optional[ContactScraper] = None
+
+
+def init_worker(archive_path: str, country: str):
+    """Map the archive and build the extractors once per worker process."""
+    global _buffer, _scraper
+    with open(archive_path, 'rb') as f:
+        _buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _scraper = ContactScraper(verbose=False, countries=[country])
+
+
+def extract_page(task: Tuple[str, int, int]) -> Tuple[str, Dict]:
+    """
+    Extract the contacts of one archived page (in a worker process).
+
+    Args:
+        task: (site key, offset, compressed length) of the response record
+
+    Returns:
+        (site key, result of ContactScraper.extract_contacts)
+    """
+    site_key, offset, length = task
+    try:
+        page = parse_response(*read_record(_buffer, offset, length))
+        content_type = page.headers.get('content-type', '')
+        page_text = decode_body(page.body, content_type)
+        return site_key, _scraper.extract_contacts(page_text, page.final_url, headers=page.headers)
+    except Exception as e:
+        return site_key, {'reservation_phone': None, 'email': None, 'status': f"ERROR: {str(e)[:50]}",
+                          'failed': True}
+
+
+def index_archive(archive: PageArchive) -> Tuple[Dict[str, ArchiveEntry], Dict[str, str]]:
+    """
+    Latest page of each site and the site of each place.
+
+    Returns:
+        (response entry by normalized URL, normalized URL by place_id)
+    """
+    pages: Dict[str, ArchiveEntry] = {}
+    place_sites: Dict[str, str] = {}
+    for entry in archive.entries():
+        site_key = normalize_url(entry.url) or entry.url
+        if entry.record_type == 'response':
+            pages[site_key] = entry     # Later records are newer
+        elif entry.record_type == 'metadata':
+            for place_id in entry.place_ids:
+                place_sites[place_id] = site_key
+    return pages, place_sites
+
+
+def load_records(filename: str) -> List[Dict]:
+    """Records of a JSON or CSV export."""
+    if filename.endswith('.csv'):
+        with open(filename, newline='', encoding='utf-8') as f:
+            records = list(csv.DictReader(f))
+        # Numbers as the exporter expects them
+        for record in records:
+            for field, kind in (('rating', float), ('reviews', int)):
+                try:
+                    record[field] = kind(record[field]) if record.get(field) else ''
+                except ValueError:
+                    record[field] = ''
+        return records
+    with open(filename, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['establishments'] if isinstance(data, dict) else data
+
+
+def reextract(records: List[Dict], archive_path: str, country: str = "FR",
+              workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Update the contacts of records from their archived pages.
+
+    Args:
+        records: Exported records, updated in place
+        archive_path: Page archive written by the scraper
+        country: Country of the city, for phone number formats
+        workers: Worker processes (default: one per core)
+
+    Returns:
+        Statistics: 'records', 'matched', 'pages', 'failed', 'phones_changed', 'emails_changed'
+    """
+    pages, place_sites = index_archive(PageArchive(archive_path, writable=False))
+
+    records_by_site: Dict[str, List[Dict]] = {}
+    for record in records:
+        site_key = place_sites.get(record.get('place_id') or '')
+        if site_key not in pages:
+            site_key = normalize_url(record.get('website') or '')
+        if site_key in pages:
+            records_by_site.setdefault(site_key, []).append(record)
+
+    stats = {'records': len(records), 'matched': sum(len(group) for group in records_by_site.values()),
+             'pages': len(records_by_site), 'failed': 0, 'phones_changed': 0, 'emails_changed': 0}
+    if not records_by_site:
+        return stats
+
+    # Offset order: workers read the archive front to back
+    tasks = sorted(((site_key, pages[site_key].offset, pages[site_key].length) for site_key in records_by_site),
+                   key=lambda task: task[1])
+    processes = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    chunksize = max(1, min(64, len(tasks) // (processes * 4)))
+
+    with Pool(processes, initializer=init_worker, initargs=(archive_path, country)) as pool:
+        for site_key, result in pool.imap_unordered(extract_page, tasks, chunksize=chunksize):
+            if result.get('failed'):
+                stats['failed'] += 1
+                continue
+            for record in records_by_site[site_key]:
+                phone = result.get('reservation_phone') or ''
+                email = result.get('email') or ''
+                if phone != (record.get('reservation_phone') or ''):
+                    stats['phones_changed'] += 1
+                if email != (record.get('email') or ''):
+                    stats['emails_changed'] += 1
+                record['reservation_phone'] = phone
+                record['email'] = email
+                record['scrape_status'] = result.get('status') or ''
+
+    return stats
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Re-extract contacts of exported records from archived pages, without network access"
+    )
+    parser.add_argument("--archive", required=True, help="Page archive written with prospector.py --archive")
+    parser.add_argument("--input", required=True, help="Records to update: JSON or CSV export")
+    parser.add_argument("--output", help="Output filename without extension (default: the input's, overwritten)")
+    parser.add_argument("--format", choices=["csv", "json", "both"],
+                        help="Export format (default: the input's)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--country", type=str.upper, choices=list(PHONE_FORMATS), default="FR",
+                        help="Country of the city, for phone number formats (default: FR)")
+    args = parser.parse_args()
+
+    if args.workers is not None and args.workers <= 0:
+        print(f"ERROR: Invalid workers: {args.workers} (must be > 0)")
+        sys.exit(1)
+    if not os.path.isfile(args.archive):
+        print(f"ERROR: Archive not found: {args.archive}")
+        sys.exit(1)
+
+    try:
+        records = load_records(args.input)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: Cannot read records from {args.input}: {e}")
+        sys.exit(1)
+
+    start = time.monotonic()
+    stats = reextract(records, args.archive, args.country, args.workers)
+    elapsed = time.monotonic() - start
+
+    print(f"OK: {stats['pages']} archived pages re-extracted in {elapsed:.1f}s "
+          f"({stats['matched']}/{stats['records']} records matched)")
+    print(f"  - {stats['phones_changed']} reservation phones changed")
+    print(f"  - {stats['emails_changed']} emails changed")
+    if stats['failed']:
+        print(f"  WARNING: {stats['failed']} pages could not be read")
+
+    output = args.output or os.path.splitext(args.input)[0]
+    export_format = args.format or ('csv' if args.input.endswith('.csv') else 'json')
+    exporter = Exporter()
+    success = True
+    if export_format in ["csv", "both"]:
+        success = exporter.export_csv(records, f"{output}.csv") and success
+    if export_format in ["json", "both"]:
+        success = exporter.export_json(records, f"{output}.json") and success
+    if not success:
+        print("ERROR: Export failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
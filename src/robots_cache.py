@@ -0,0 +1,198 @@
+"""
+robots.txt cache with per-host rules and crawl delays.
+
+Each host's robots.txt is fetched once and kept in a persistent cache
+with a TTL, so later runs reuse it without another request. Parsed rules
+expire with their cache entry, so a long-running process (service, worker)
+picks up robots.txt changes too.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+try:
+    from .cache_store import JsonCache
+except ImportError:
+    from cache_store import JsonCache
+
+
+class RobotsCache:
+    """Fetches, caches and evaluates robots.txt rules per host."""
+
+    def __init__(self, cache: Optional[JsonCache] = None, user_agent: str = "*",
+                 ttl: float = 86400, error_ttl: float = 3600, timeout: float = 5):
+        """
+        Args:
+            cache: Persistent cache for robots.txt bodies (memory only if None)
+            user_agent: User-Agent sent and matched against robots.txt rules
+            ttl: How long a fetched robots.txt is reused (seconds)
+            error_ttl: How long a failed fetch is remembered (seconds)
+            timeout: Timeout for fetching robots.txt (seconds)
+        """
+        self.cache = cache if cache is not None else JsonCache()
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.fetches = 0
+
+    def can_fetch(self, url: str) -> bool:
+        """
+        Check whether robots.txt allows fetching a URL.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            True if allowed (or no usable robots.txt)
+        """
+        parser = self._get_parser(url)
+        if parser is None:
+            return True
+        return parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        """
+        Get the Crawl-delay declared for the host of a URL.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Delay in seconds, None if not declared
+        """
+        parser = self._get_parser(url)
+        if parser is None:
+            return None
+
+        delay = parser.crawl_delay(self.user_agent)
+        if delay is None:
+            # Crawl-delay: 0.5 is common but not parsed by robotparser
+            delay = self._fractional_crawl_delay(parser)
+        return float(delay) if delay is not None else None
+
+    def save(self) -> bool:
+        """Persist cached robots.txt bodies."""
+        return self.cache.save()
+
+    def _get_parser(self, url: str) -> Optional[RobotFileParser]:
+        """Return the parsed robots.txt of the URL's host."""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return None
+
+        if not parts.hostname:
+            return None
+
+        scheme = parts.scheme or 'https'
+        origin = f"{scheme}://{parts.netloc.lower()}"
+
+        with self._lock:
+            parser = self._parsers.get(origin)
+            if self._fresh(parser):
+                return parser
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+
+        # One fetch per host even with concurrent scrapes of that host
+        with host_lock:
+            with self._lock:
+                parser = self._parsers.get(origin)
+                if self._fresh(parser):
+                    return parser
+
+            key = f"robots:{origin}"
+            # Read before get(), which drops the entry once expired
+            expires_at = self.cache.expires_at(key)
+            entry = self.cache.get(key)
+            if entry is None:
+                entry = self._fetch(origin)
+                expires_at = self.cache.expires_at(key)
+
+            parser = RobotFileParser()
+            if entry['status'] == 'denied':
+                parser.disallow_all = True
+            elif entry['status'] == 'ok':
+                parser.parse(entry['body'].splitlines())
+            else:
+                parser.allow_all = True
+            parser.raw_body = entry.get('body', '')
+            # Reused until the cache entry expires, then read or fetched again
+            parser.expires_at = expires_at
+
+            with self._lock:
+                self._parsers[origin] = parser
+            return parser
+
+    @staticmethod
+    def _fresh(parser: Optional[RobotFileParser]) -> bool:
+        """Whether parsed rules are still within their cache TTL."""
+        if parser is None:
+            return False
+        return parser.expires_at is None or time.time() < parser.expires_at
+
+    def _fetch(self, origin: str) -> Dict:
+        """Download robots.txt for an origin and store it in the cache."""
+        self.fetches += 1
+        try:
+            response = requests.get(
+                f"{origin}/robots.txt",
+                headers={'User-Agent': self.user_agent},
+                timeout=self.timeout,
+                allow_redirects=True
+            )
+
+            # Same conventions as urllib.robotparser
+            if response.status_code in (401, 403):
+                entry = {'status': 'denied', 'body': ''}
+                ttl = self.ttl
+            elif 400 <= response.status_code < 500:
+                entry = {'status': 'missing', 'body': ''}
+                ttl = self.ttl
+            elif response.status_code >= 500:
+                entry = {'status': 'error', 'body': ''}
+                ttl = self.error_ttl
+            else:
+                entry = {'status': 'ok', 'body': response.text[:500_000]}
+                ttl = self.ttl
+
+        except requests.RequestException:
+            entry = {'status': 'error', 'body': ''}
+            ttl = self.error_ttl
+
+        self.cache.set(f"robots:{origin}", entry, ttl)
+        return entry
+
+    def _fractional_crawl_delay(self, parser: RobotFileParser) -> Optional[float]:
+        """Read a non-integer Crawl-delay for '*' from the raw robots.txt."""
+        applies = False
+        for line in getattr(parser, 'raw_body', '').splitlines():
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = (part.strip() for part in line.split(':', 1))
+            field = field.lower()
+            if field == 'user-agent':
+                applies = value == '*'
+            elif field == 'crawl-delay' and applies:
+                try:
+                    return float(value)
+                except ValueError:
+                    return None
+        return None
+
+
+if __name__ == "__main__":
+    robots = RobotsCache(user_agent="Mozilla/5.0")
+    test_url = "https://www.python.org/about/"
+    print(f"Allowed: {robots.can_fetch(test_url)}")
+    print(f"Crawl-delay: {robots.crawl_delay(test_url)}")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Scrape worker for producer/worker mode.
+
+Leases website tasks from a shared work queue (see work_queue.py), scrapes
+them politely and writes the results back for the producer to merge.
+Start as many workers as needed, on any machine that sees the queue file.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+from contact_scraper import ContactScraper
+from phone_extractor import PHONE_FORMATS
+from dns_cache import DnsCache
+from cache_store import JsonCache, DEFAULT_CACHE_DIR
+from robots_cache import RobotsCache
+from adaptive_timeouts import AdaptiveTimeouts
+from negative_cache import NegativeCache
+from egress_pool import EgressPool
+from page_archive import PageArchive
+from host_scheduler import HostScheduler, MAX_RETRIES, RETRY_BUDGET
+from url_utils import request_host, url_host
+from work_queue import Task, WorkQueue
+
+
+def keep_leases(queue: WorkQueue, worker_id: str, tasks: List[Task], done: set, stop: threading.Event):
+    """Renew the leases of a batch until it is finished."""
+    interval = max(1.0, queue.visibility_timeout / 3)
+    while not stop.wait(interval):
+        for task in tasks:
+            if task.id not in done:
+                queue.extend(task.id, worker_id)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Scrape worker leasing websites from a shared work queue"
+    )
+    parser.add_argument("--queue", required=True, help="Work queue file (SQLite, on shared storage)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Number of websites scraped concurrently (default: 8)")
+    parser.add_argument("--batch", type=int, default=32, help="Tasks leased at once (default: 32)")
+    parser.add_argument("--visibility-timeout", type=float, default=300,
+                        help="Seconds before a task leased by a dead worker is retried (default: 300)")
+    parser.add_argument("--site-deadline", type=float, default=20.0,
+                        help="Maximum seconds spent scraping one website, retries included (default: 20)")
+    parser.add_argument("--retry-budget", type=int, default=RETRY_BUDGET,
+                        help="Transient failures retried later, per leased batch "
+                             f"(default: {RETRY_BUDGET})")
+    parser.add_argument("--country", type=str.upper, choices=list(PHONE_FORMATS), default="FR",
+                        help="Country of the producer's city, for phone number formats (default: FR)")
+    parser.add_argument("--egress", action="append", metavar="SPEC",
+                        help="Proxy URL or local source address to scrape through, repeatable (default: direct)")
+    parser.add_argument("--archive",
+                        help="Append every page downloaded to this archive, for reextract.py (default: none)")
+    parser.add_argument("--idle-exit", type=float,
+                        help="Exit after this many seconds without tasks (default: run forever)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Folder for caches shared across runs (default: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    if args.workers <= 0 or args.batch <= 0:
+        print("ERROR: --workers and --batch must be > 0")
+        sys.exit(1)
+    if args.retry_budget < 0:
+        print("ERROR: --retry-budget must be >= 0")
+        sys.exit(1)
+
+    try:
+        egress_pool = EgressPool.from_specs(args.egress) if args.egress else None
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    if egress_pool:
+        health = egress_pool.check_health()
+        down = [name for name, healthy in health.items() if not healthy]
+        if down:
+            print(f"WARNING: Egresses down: {', '.join(down)}")
+
+    queue = WorkQueue(args.queue, visibility_timeout=args.visibility_timeout)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    dns_cache = DnsCache()
+    dns_cache.install()
+    timeouts = AdaptiveTimeouts(JsonCache(f"{args.cache_dir}/latency.json"))
+    negative_cache = NegativeCache(JsonCache(f"{args.cache_dir}/unscrapable.json"))
+    archive = PageArchive(args.archive) if args.archive else None
+    scraper = ContactScraper(dns_cache=dns_cache, verbose=False, timeouts=timeouts,
+                             site_deadline=args.site_deadline, countries=[args.country],
+                             negative_cache=negative_cache, egress_pool=egress_pool, archive=archive)
+    robots_cache = RobotsCache(
+        JsonCache(f"{args.cache_dir}/robots.json"),
+        user_agent=scraper.headers['User-Agent']
+    )
+    scheduler = HostScheduler(robots_cache, max_workers=args.workers, max_retries=MAX_RETRIES,
+                              retry_budget=args.retry_budget)
+
+    print(f"Worker {worker_id} waiting for tasks from {args.queue}")
+    idle_since = time.monotonic()
+    scraped = 0
+
+    try:
+        while True:
+            tasks = queue.lease(worker_id, limit=args.batch)
+            if not tasks:
+                if args.idle_exit is not None and time.monotonic() - idle_since > args.idle_exit:
+                    break
+                time.sleep(1.0)
+                continue
+
+            dns_cache.prefetch([request_host(task.url) for task in tasks])
+
+            done = set()
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=keep_leases, args=(queue, worker_id, tasks, done, stop), daemon=True
+            )
+            heartbeat.start()
+
+            try:
+                task_urls = {task.id: task.url for task in tasks}
+                attempts = {task.id: task.attempts for task in tasks}
+                for task_id, result in scheduler.run(task_urls.items(), scraper.scrape_contact_info):
+                    done.add(task_id)
+                    if not queue.complete(task_id, worker_id, result):
+                        print(f"  WARNING: Lease lost for task {task_id}, result dropped")
+                        continue
+                    scraped += 1
+                    # Leased before by a worker that died or hung on it
+                    retry = f" (attempt {attempts[task_id]}/{queue.max_attempts})" if attempts[task_id] > 1 else ""
+                    print(f"  {scraped} - {url_host(task_urls[task_id])}... {result.get('status')}{retry}")
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            robots_cache.save()
+            timeouts.save()
+            negative_cache.save()
+            idle_since = time.monotonic()
+
+    except KeyboardInterrupt:
+        print("\nStopping worker (leased tasks will be retried by other workers)")
+    finally:
+        robots_cache.save()
+        timeouts.save()
+        negative_cache.save()
+        dns_cache.close()
+        if egress_pool:
+            egress_pool.close()
+        if archive:
+            archive.close()
+
+    retried = f", {scheduler.retries} transient failures retried later" if scheduler.retries else ""
+    print(f"Worker {worker_id} done: {scraped} sites scraped{retried}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Long-running prospector service with a local HTTP/JSON API.
+
+Keeps the Google client session, the scraper connections, the DNS and
+robots.txt caches and the rate limiters warm across jobs, and runs several
+city jobs concurrently under the same shared limits. Each job is a
+pipeline.prospect() run on these shared resources, with its own budgets
+and statistics. Finished jobs are forgotten after a retention period, or
+once too many have piled up.
+
+Endpoints:
+    POST /jobs                 Submit a job: {"city": "Lyon", "type": "hotel", "limit": 20,
+                               "no_scrape": false, "expand": false, "country": "FR",
+                               "max_api_cost": 1.0, "max_api_calls": null, "time_budget": null,
+                               "dedup": true, "site_deadline": 20, "retry_budget": 100}
+    GET  /jobs                 List jobs
+    GET  /jobs/<id>            Job status and progress messages
+    GET  /jobs/<id>/results    Records as NDJSON, streamed until the job ends
+                               (add ?follow=0 to get only the records ready so far)
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from google_places import GooglePlacesClient
+from api_budget import ApiUsage, BudgetExceeded
+from phone_extractor import PHONE_FORMATS
+from cache_store import DEFAULT_CACHE_DIR
+from host_scheduler import RETRY_BUDGET
+from pipeline import ESTABLISHMENT_TYPES, ProgressEvent, SharedResources, prospect
+
+
+class Job:
+    """A prospecting job: parameters, progress messages and records."""
+
+    def __init__(self, job_id: str, params: Dict[str, Any]):
+        self.id = job_id
+        self.params = params
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[str] = []
+        self.records: List[Dict] = []
+        self.usage: Optional[ApiUsage] = None
+        self.stats: Dict[str, int] = {}      # Scraping statistics of this job
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def log(self, message: str):
+        """Record a progress message."""
+        with self._changed:
+            self.events.append(message)
+
+    def add_record(self, record: Dict):
+        """Publish a final record to result readers."""
+        with self._changed:
+            self.records.append(record)
+            self._changed.notify_all()
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """Mark the job as ended and wake result readers."""
+        with self._changed:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def iter_records(self, follow: bool = True) -> Iterator[Dict]:
+        """
+        Yield records as they are published.
+
+        Args:
+            follow: Wait for new records until the job ends
+
+        Yields:
+            Records in publication order
+        """
+        index = 0
+        while True:
+            with self._changed:
+                while follow and index >= len(self.records) and not self.finished:
+                    self._changed.wait(timeout=1.0)
+                batch = self.records[index:]
+                index += len(batch)
+                done = not follow or (self.finished and index >= len(self.records))
+            yield from batch
+            if done:
+                return
+
+    def to_dict(self, with_events: bool = False) -> Dict[str, Any]:
+        """JSON-serializable summary of the job."""
+        summary = {
+            'id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'records': len(self.records),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.error:
+            summary['error'] = self.error
+        if self.usage is not None:
+            summary['api_calls'] = self.usage.total_calls
+            summary['api_cost'] = round(self.usage.total_cost, 4)
+        if self.stats:
+            summary['stats'] = dict(self.stats)
+        if with_events:
+            summary['events'] = list(self.events)
+        return summary
+
+
+class ProspectorService:
+    """Runs prospecting jobs concurrently on warm, shared resources."""
+
+    def __init__(self, max_jobs: int = 2, workers: int = 8, cache_dir: str = DEFAULT_CACHE_DIR,
+                 egresses: Optional[List[str]] = None, archive: Optional[str] = None,
+                 job_retention: float = 3600, max_finished_jobs: int = 100):
+        """
+        Args:
+            max_jobs: Maximum number of jobs running at the same time
+            workers: Maximum number of websites scraped at once, all jobs together
+            cache_dir: Folder for caches shared across runs
+            egresses: Proxy URLs or local source addresses to scrape through (default: direct)
+            archive: Archive file the pages downloaded by every job are appended to (optional)
+            job_retention: Seconds a finished job and its records are kept
+            max_finished_jobs: Finished jobs kept at most, the oldest forgotten first
+        """
+        self.workers = max(1, workers)
+        self.job_retention = job_retention
+        self.max_finished_jobs = max(0, max_finished_jobs)
+
+        GooglePlacesClient()  # Fail fast without API key
+        self.shared = SharedResources(self.workers, cache_dir, egresses, archive)
+
+        self.jobs: Dict[str, Job] = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="job")
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        """
+        Validate job parameters and queue the job.
+
+        Args:
+            params: Job parameters (city, type, limit, no_scrape, expand, country,
+                max_api_cost, max_api_calls, time_budget, dedup, site_deadline, retry_budget)
+
+        Returns:
+            The queued job
+
+        Raises:
+            ValueError: If parameters are invalid
+        """
+        params = self._validate(params)
+        with self._lock:
+            self._evict_finished()
+            job = Job(str(next(self._job_ids)), params)
+            self.jobs[job.id] = job
+        self._executor.submit(self._run_job, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, None if unknown or forgotten."""
+        with self._lock:
+            self._evict_finished()
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        """Return all jobs, oldest first."""
+        with self._lock:
+            self._evict_finished()
+            return list(self.jobs.values())
+
+    def close(self):
+        """Stop accepting jobs, wait for running ones and persist caches."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.shared.close()
+
+    def _evict_finished(self):
+        """Forget finished jobs past their retention, then the oldest beyond the maximum (lock held)."""
+        now = time.time()
+        finished = [job for job in self.jobs.values() if job.finished]
+        kept = [job for job in finished if now - job.finished_at <= self.job_retention]
+        evicted = [job for job in finished if job not in kept]
+        evicted += kept[:max(0, len(kept) - self.max_finished_jobs)]
+        for job in evicted:
+            del self.jobs[job.id]
+
+    def _validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Check job parameters and fill in defaults."""
+        if not isinstance(params, dict):
+            raise ValueError("Job must be a JSON object")
+
+        city = params.get('city')
+        if not isinstance(city, str) or not city.strip():
+            raise ValueError("'city' is required")
+
+        establishment_type = params.get('type', 'all')
+        if establishment_type not in ESTABLISHMENT_TYPES:
+            raise ValueError(f"'type' must be one of {', '.join(ESTABLISHMENT_TYPES)}")
+
+        limit = params.get('limit', 20)
+        if not isinstance(limit, int) or isinstance(limit, bool) or limit <= 0:
+            raise ValueError("'limit' must be a positive integer")
+
+        country = params.get('country', 'FR')
+        if not isinstance(country, str) or country.upper() not in PHONE_FORMATS:
+            raise ValueError(f"'country' must be one of {', '.join(PHONE_FORMATS)}")
+
+        max_api_cost = params.get('max_api_cost')
+        if max_api_cost is not None and (not isinstance(max_api_cost, (int, float)) or max_api_cost < 0):
+            raise ValueError("'max_api_cost' must be a positive number")
+
+        max_api_calls = params.get('max_api_calls')
+        if max_api_calls is not None and (not isinstance(max_api_calls, int) or max_api_calls < 0):
+            raise ValueError("'max_api_calls' must be a positive integer")
+
+        time_budget = params.get('time_budget')
+        if time_budget is not None and (not _is_number(time_budget) or time_budget <= 0):
+            raise ValueError("'time_budget' must be a positive number of seconds")
+
+        site_deadline = params.get('site_deadline', 20.0)
+        if not _is_number(site_deadline) or site_deadline <= 0:
+            raise ValueError("'site_deadline' must be a positive number of seconds")
+
+        retry_budget = params.get('retry_budget', RETRY_BUDGET)
+        if not isinstance(retry_budget, int) or isinstance(retry_budget, bool) or retry_budget < 0:
+            raise ValueError("'retry_budget' must be a non-negative integer")
+
+        return {
+            'city': city.strip(),
+            'type': establishment_type,
+            'limit': limit,
+            'no_scrape': bool(params.get('no_scrape', False)),
+            'expand': bool(params.get('expand', False)),
+            'country': country.upper(),
+            'max_api_cost': max_api_cost,
+            'max_api_calls': max_api_calls,
+            'time_budget': time_budget,
+            'dedup': bool(params.get('dedup', True)),
+            'site_deadline': site_deadline,
+            'retry_budget': retry_budget,
+        }
+
+    def _run_job(self, job: Job):
+        """Run one job through the pipeline, on the shared resources."""
+        job.status = 'running'
+        params = job.params
+
+        def log_event(event: ProgressEvent):
+            if event.stage != 'done':
+                job.log(event.message.strip('\n'))
+
+        try:
+            run = prospect(
+                params['city'], params['type'], params['limit'],
+                scrape=not params['no_scrape'],
+                expand=params['expand'],
+                workers=self.workers,
+                max_api_cost=params['max_api_cost'],
+                max_api_calls=params['max_api_calls'],
+                site_deadline=params['site_deadline'],
+                country=params['country'],
+                time_budget=params['time_budget'],
+                dedup=params['dedup'],
+                retry_budget=params['retry_budget'],
+                shared=self.shared,
+                on_event=log_event
+            )
+            job.usage = run.usage
+            with run:
+                for record in run:
+                    job.add_record(record)
+            job.stats = run.stats
+
+            if not run.place_ids:
+                job.finish('failed', f"No establishments found for {params['city']}")
+            else:
+                job.finish('done')
+
+        except BudgetExceeded as e:
+            job.finish('failed', str(e))
+        except Exception as e:
+            job.log(f"ERROR: {e}")
+            job.finish('failed', str(e))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON front end of a ProspectorService."""
+
+    server_version = "Prospector/1.0"
+
+    @property
+    def service(self) -> ProspectorService:
+        return self.server.service
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            params = json.loads(self.rfile.read(length) or b'{}')
+            job = self.service.submit(params)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except RuntimeError:
+            self._send_json(503, {'error': 'Service is shutting down'})
+            return
+
+        self._send_json(201, job.to_dict())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['jobs']:
+            self._send_json(200, {'jobs': [job.to_dict() for job in self.service.list_jobs()]})
+            return
+
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                self._send_json(404, {'error': f"Unknown job {parts[1]}"})
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict(with_events=True))
+            elif parts[2] == 'results':
+                follow = parse_qs(url.query).get('follow', ['1'])[0] not in ('0', 'false')
+                self._stream_records(job, follow)
+            else:
+                self._send_json(404, {'error': 'Not found'})
+            return
+
+        self._send_json(404, {'error': 'Not found'})
+
+    def log_message(self, format, *args):
+        """Keep the console for job-level messages."""
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_records(self, job: Job, follow: bool):
+        """Send records as NDJSON, one line per record, until the job ends."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.end_headers()  # HTTP/1.0: the end of the stream closes the connection
+
+        try:
+            for record in job.iter_records(follow):
+                self.wfile.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Prospecting service with a local HTTP/JSON API"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--max-jobs", type=int, default=2, help="Jobs running at the same time (default: 2)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Websites scraped at once, all jobs together (default: 8)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Folder for caches shared across runs (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--egress", action="append", metavar="SPEC",
+                        help="Proxy URL or local source address to scrape through, repeatable (default: direct)")
+    parser.add_argument("--archive",
+                        help="Append every page downloaded by any job to this archive, for reextract.py (default: none)")
+    parser.add_argument("--job-retention", type=float, default=3600,
+                        help="Seconds finished jobs and their records are kept (default: 3600)")
+    parser.add_argument("--max-finished-jobs", type=int, default=100,
+                        help="Finished jobs kept at most, the oldest forgotten first (default: 100)")
+    args = parser.parse_args()
+
+    try:
+        service = ProspectorService(max_jobs=args.max_jobs, workers=args.workers, cache_dir=args.cache_dir,
+                                    egresses=args.egress, archive=args.archive, job_retention=args.job_retention,
+                                    max_finished_jobs=args.max_finished_jobs)
+    except ValueError as e:
+        print(f"ERROR: Configuration error: {e}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"ERROR: Cannot open archive {args.archive}: {e}")
+        sys.exit(1)
+
+    server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+
+    print(f"Prospector service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping service...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
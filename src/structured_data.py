@@ -0,0 +1,202 @@
+"""
+schema.org structured-data contact extraction.
+
+Many restaurant and hotel sites describe themselves with JSON-LD blocks
+(<script type="application/ld+json">) or microdata (itemprop attributes)
+holding their telephone and email. Reading these is cheaper than the
+heuristic scan and gives the contacts the site itself declares.
+"""
+
+import json
+import re
+from collections import deque
+from html import unescape
+from typing import Any, Iterator, NamedTuple, Optional
+try:
+    from .html_scanner import ATTR_REGEX
+except ImportError:
+    from html_scanner import ATTR_REGEX
+
+
+# schema.org types describing the establishment itself
+BUSINESS_TYPES = frozenset({
+    'localbusiness', 'organization', 'restaurant', 'foodestablishment', 'cafeorcoffeeshop',
+    'barorpub', 'bakery', 'brewery', 'winery', 'fastfoodrestaurant', 'icecreamshop',
+    'hotel', 'lodgingbusiness', 'bedandbreakfast', 'hostel', 'motel', 'resort', 'campground',
+    'vacationrental', 'touristattraction',
+})
+
+_JSON_LD_REGEX = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+
+_MICRODATA_REGEX = re.compile(
+    r'<[A-Za-z][^>]*\bitemprop\s*=\s*["\']?(telephone|email)\b[^>]*>([^<]*)',
+    re.IGNORECASE
+)
+
+
+class StructuredContacts(NamedTuple):
+    """Contacts declared by a page's structured data."""
+    telephone: Optional[str]
+    email: Optional[str]
+    source: str  # 'json-ld' or 'microdata'
+
+
+def extract_structured_contacts(html_text: str) -> Optional[StructuredContacts]:
+    """
+    Read telephone and email from JSON-LD, then microdata.
+
+    Args:
+        html_text: Raw HTML of the page
+
+    Returns:
+        StructuredContacts, None if the page declares no contact
+    """
+    if not html_text:
+        return None
+
+    # Substring checks are much cheaper than the regexes on pages without markers
+    contacts = None
+    if 'ld+json' in html_text or 'LD+JSON' in html_text:
+        contacts = _from_json_ld(html_text)
+    if contacts is None and 'itemprop' in html_text:
+        contacts = _from_microdata(html_text)
+    return contacts
+
+
+def _from_json_ld(html_text: str) -> Optional[StructuredContacts]:
+    """Contacts of the first business object of the JSON-LD blocks."""
+    telephone = email = None
+
+    for block in _JSON_LD_REGEX.finditer(html_text):
+        data = _parse_json(block.group(1))
+        if data is None:
+            continue
+
+        for item in _iter_objects(data):
+            if not _is_business(item):
+                continue
+            telephone = telephone or _reservation_phone(item) or _first_text(item.get('telephone'))
+            email = email or _first_text(item.get('email'))
+            if telephone and email:
+                break
+
+        if telephone and email:
+            break
+
+    if not telephone and not email:
+        return None
+    return StructuredContacts(telephone, _strip_mailto(email), 'json-ld')
+
+
+def _from_microdata(html_text: str) -> Optional[StructuredContacts]:
+    """Contacts of the first itemprop="telephone" / itemprop="email" elements."""
+    telephone = email = None
+
+    for match in _MICRODATA_REGEX.finditer(html_text):
+        prop = match.group(1).lower()
+        if (prop == 'telephone' and telephone) or (prop == 'email' and email):
+            continue
+
+        tag = match.group(0)[:len(match.group(0)) - len(match.group(2)) - 1]
+        attrs = {}
+        for attr in ATTR_REGEX.finditer(tag, 1):
+            attrs[attr.group(1).lower()] = unescape(attr.group(2) or attr.group(3) or attr.group(4) or '')
+
+        # <meta content>, <a href="tel:...">, or the element text
+        value = attrs.get('content') or ''
+        if not value and attrs.get('href', '').startswith(('tel:', 'mailto:')):
+            value = attrs['href'].split(':', 1)[1]
+        if not value:
+            value = unescape(match.group(2))
+        value = value.strip()
+
+        if prop == 'telephone':
+            telephone = value or None
+        else:
+            email = value or None
+
+        if telephone and email:
+            break
+
+    if not telephone and not email:
+        return None
+    return StructuredContacts(telephone, _strip_mailto(email), 'microdata')
+
+
+def _parse_json(raw: str) -> Optional[Any]:
+    """Parse a JSON-LD block, tolerating the usual wrappers."""
+    raw = raw.strip()
+    # Some CMS wrap the block in <!-- --> or CDATA markers
+    for prefix, suffix in (('<!--', '-->'), ('/*<![CDATA[*/', '/*]]>*/'), ('<![CDATA[', ']]>')):
+        if raw.startswith(prefix) and raw.endswith(suffix):
+            raw = raw[len(prefix):-len(suffix)].strip()
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _iter_objects(data: Any) -> Iterator[dict]:
+    """Walk every JSON object of a document (lists, @graph, nested values)."""
+    pending = deque([data])
+    while pending:
+        node = pending.popleft()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict):
+            yield node
+            pending.extend(value for value in node.values() if isinstance(value, (list, dict)))
+
+
+def _is_business(item: dict) -> bool:
+    types = item.get('@type')
+    if isinstance(types, str):
+        types = [types]
+    if not isinstance(types, list):
+        return False
+    return any(isinstance(t, str) and t.rsplit('/', 1)[-1].lower() in BUSINESS_TYPES for t in types)
+
+
+def _reservation_phone(item: dict) -> Optional[str]:
+    """Telephone of a contactPoint dedicated to reservations."""
+    points = item.get('contactPoint')
+    if isinstance(points, dict):
+        points = [points]
+    if not isinstance(points, list):
+        return None
+
+    for point in points:
+        if isinstance(point, dict) and 'reserv' in str(point.get('contactType', '')).lower():
+            phone = _first_text(point.get('telephone'))
+            if phone:
+                return phone
+    return None
+
+
+def _first_text(value: Any) -> Optional[str]:
+    """First non-empty string of a value that may be a string or a list."""
+    if isinstance(value, list):
+        value = next((v for v in value if isinstance(v, str) and v.strip()), None)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _strip_mailto(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    if email.lower().startswith('mailto:'):
+        email = email[len('mailto:'):]
+    return email.split('?')[0].strip() or None
+
+
+if __name__ == "__main__":
+    sample = (
+        '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Restaurant",'
+        ' "name": "Le Bistro", "telephone": "+33 1 42 33 44 55", "email": "mailto:contact@bistro.fr"}</script>'
+    )
+    print(extract_structured_contacts(sample))
+    print(extract_structured_contacts('<span itemprop="telephone">01 23 45 67 89</span>'))
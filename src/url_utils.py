@@ -0,0 +1,148 @@
+"""
+URL normalization helpers.
+
+Used to recognize websites shared by several places (hotel groups,
+restaurant chains) so that each distinct site is scraped once.
+"""
+
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+
+# Query parameters that only track the visit and never change the page
+TRACKING_PARAM_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_')
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'msclkid',
+    'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref'
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_host(host: Optional[str]) -> str:
+    """
+    Normalize a host name: lowercase, no trailing dot, no 'www.' prefix.
+
+    Args:
+        host: Host name (may be None)
+
+    Returns:
+        Normalized host name, empty string if none
+    """
+    if not host:
+        return ""
+
+    host = host.strip().lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+
+    return host
+
+
+def url_host(url: str) -> str:
+    """
+    Extract the normalized host of a URL.
+
+    Args:
+        url: URL, with or without scheme
+
+    Returns:
+        Normalized host name, empty string if the URL has none
+    """
+    if not url or not url.strip():
+        return ""
+
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        return normalize_host(urlsplit(url).hostname)
+    except ValueError:
+        return ""
+
+
+def request_host(url: str) -> str:
+    """
+    Extract the host a request to a URL connects to, 'www.' included.
+
+    Unlike url_host, this is the name the scraper resolves, so DNS
+    prefetches must use it.
+
+    Args:
+        url: URL, with or without scheme
+
+    Returns:
+        Lowercase host name, empty string if the URL has none
+    """
+    if not url or not url.strip():
+        return ""
+
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a website URL so that equivalent URLs compare equal.
+
+    Ignores the scheme (http/https), the 'www.' prefix, default ports,
+    trailing slashes, fragments and tracking query parameters. Remaining
+    query parameters are sorted.
+
+    Args:
+        url: Website URL
+
+    Returns:
+        Normalized key such as 'example.com/menu?lang=fr',
+        empty string if the URL is empty or invalid
+    """
+    if not url or not url.strip():
+        return ""
+
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        parts = urlsplit(url)
+        host = normalize_host(parts.hostname)
+        port = parts.port
+    except ValueError:
+        return ""
+
+    if not host:
+        return ""
+
+    if port and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip('/')
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+if __name__ == "__main__":
+    test_urls = [
+        "https://www.hotel-group.fr/",
+        "http://hotel-group.fr",
+        "hotel-group.fr/?utm_source=google&utm_medium=maps",
+        "https://WWW.Hotel-Group.fr:443/paris/?gclid=abc&lang=fr#rooms",
+        "https://hotel-group.fr/paris?lang=fr",
+    ]
+
+    for test_url in test_urls:
+        print(f"{test_url} -> {normalize_url(test_url)}")
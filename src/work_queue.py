@@ -0,0 +1,326 @@
+"""
+Shared scrape work queue for producer/worker mode.
+
+The producer (prospector.py --queue) publishes one task per website to a
+SQLite file on shared storage. Any number of workers (scrape_worker.py),
+on this machine or others mounting the same file, lease tasks, scrape them
+and write the results back. A lease not completed within its visibility
+timeout (crashed or stuck worker) makes the task available again.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    finished_seq INTEGER,
+    updated_at REAL NOT NULL,
+    UNIQUE (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id, status);
+"""
+
+# Added after the first version of the schema, with the index that needs it
+FINISHED_SEQ_SCHEMA = """
+CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (run_id, finished_seq);
+"""
+
+# Completion order within a run, given in the write transaction finishing the task
+_NEXT_FINISHED_SEQ = ("(SELECT COALESCE(MAX(finished.finished_seq), 0) + 1 FROM tasks AS finished "
+                      "WHERE finished.run_id = tasks.run_id)")
+
+
+class Task(NamedTuple):
+    """A leased scrape task."""
+    id: int
+    run_id: str
+    key: str
+    url: str
+    attempts: int   # Leases of the task so far, this one included
+
+
+class WorkQueue:
+    """SQLite-backed task queue with leases and visibility timeouts."""
+
+    def __init__(self, path: str, visibility_timeout: float = 300, max_attempts: int = 3):
+        """
+        Args:
+            path: SQLite file, on storage shared by producer and workers
+            visibility_timeout: How long a leased task stays hidden from other workers (seconds)
+            max_attempts: Leases of a task before it is given up as failed
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        with self._transaction() as db:
+            db.executescript(SCHEMA)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(tasks)")]
+            if 'finished_seq' not in columns:
+                db.execute("ALTER TABLE tasks ADD COLUMN finished_seq INTEGER")
+            db.executescript(FINISHED_SEQ_SCHEMA)
+
+    def publish(self, run_id: str, items: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add scrape tasks for a run.
+
+        Args:
+            run_id: Producer run the tasks belong to
+            items: (key, url) pairs, keys unique within the run
+
+        Returns:
+            Number of tasks added (already published keys are ignored)
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.executemany(
+                "INSERT OR IGNORE INTO tasks (run_id, key, url, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_id, key, url, now) for key, url in items]
+            )
+            return cursor.rowcount
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[Task]:
+        """
+        Lease available tasks: pending ones, or leased ones whose lease expired.
+
+        Tasks leased max_attempts times without completing are marked failed.
+
+        Args:
+            worker_id: Identifier of the leasing worker
+            limit: Maximum number of tasks to lease
+
+        Returns:
+            Leased tasks (empty if none available)
+        """
+        now = time.time()
+        with self._transaction() as db:
+            # Give up on tasks that keep timing out (e.g. crash the worker)
+            given_up = db.execute(
+                "SELECT id FROM tasks WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                (now, self.max_attempts)
+            ).fetchall()
+            failure = json.dumps({'reservation_phone': None, 'email': None,
+                                  'status': 'ERROR: Lease timed out', 'failed': True})
+            # One at a time: each gets its own place in the completion order
+            for (task_id,) in given_up:
+                db.execute(
+                    "UPDATE tasks SET status = 'failed', lease_owner = NULL, result = ?, updated_at = ?, "
+                    f"finished_seq = {_NEXT_FINISHED_SEQ} WHERE id = ?",
+                    (failure, now, task_id)
+                )
+
+            rows = db.execute(
+                "SELECT id, run_id, key, url, attempts FROM tasks "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires <= ?) "
+                "ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+            db.executemany(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                [(worker_id, now + self.visibility_timeout, now, row[0]) for row in rows]
+            )
+
+        return [Task(row[0], row[1], row[2], row[3], row[4] + 1) for row in rows]
+
+    def extend(self, task_id: int, worker_id: str) -> bool:
+        """
+        Renew a lease for another visibility timeout.
+
+        Returns:
+            False if the lease was lost (expired and taken by another worker)
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.visibility_timeout, now, task_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Store the result of a leased task.
+
+        Args:
+            task_id: Leased task
+            worker_id: Worker holding the lease
+            result: Scrape result (JSON-serializable)
+
+        Returns:
+            False if the lease was lost, the result is then dropped
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_owner = NULL, updated_at = ?, "
+                f"finished_seq = {_NEXT_FINISHED_SEQ} "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), task_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def results(self, run_id: str, after: int = 0) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Get tasks of a run finished (done or failed) after a point of its completion order.
+
+        Args:
+            run_id: Producer run
+            after: Completion sequence number of the last task already read (0: all)
+
+        Returns:
+            (completion sequence number, key, result) tuples, in completion order
+        """
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT finished_seq, key, result FROM tasks WHERE run_id = ? AND finished_seq > ? "
+                "ORDER BY finished_seq",
+                (run_id, after)
+            ).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """Number of tasks of a run per status."""
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def purge(self, run_id: str):
+        """Delete every task of a run."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+
+    def _transaction(self) -> sqlite3.Connection:
+        """Per-thread connection; used as a context manager it wraps one transaction."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # IMMEDIATE: take the write lock up front so two workers cannot lease the same rows
+            db = sqlite3.connect(self.path, timeout=30, isolation_level='IMMEDIATE')
+            self._local.db = db
+        return db
+
+
+class QueueScheduler:
+    """
+    Drop-in replacement for HostScheduler that delegates scraping to workers.
+
+    run() publishes the URLs to the work queue and yields results as workers
+    write them back, so prospector.scrape_places works unchanged.
+    """
+
+    def __init__(self, queue: WorkQueue, poll_interval: float = 1.0,
+                 timeout: Optional[float] = None, log: Callable[[str], None] = print):
+        """
+        Args:
+            queue: Shared work queue
+            poll_interval: Delay between two polls for results (seconds)
+            timeout: Give up waiting after this long without any new result (None: wait forever)
+            log: Function receiving progress lines
+        """
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.log = log
+        self.run_id = uuid.uuid4().hex
+        self.disallowed = 0
+        self.retries = 0               # Deferred retries happen in the workers
+
+    def run(self, items: Iterable[Tuple[Hashable, str]],
+            fetch: Optional[Callable[[str], Dict[str, Any]]] = None) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """
+        Publish URLs to the queue as they come and yield results in completion order.
+
+        Items are read and published in a thread of their own, so workers
+        start on the first sites while an earlier stage is still producing
+        the next ones; results are polled meanwhile, only those finished
+        since the last poll being read.
+
+        Args:
+            items: (key, url) pairs, keys being strings
+            fetch: Ignored, workers do the fetching
+
+        Yields:
+            (key, result) pairs
+        """
+        progress = {'published': 0}
+        failure: Dict[str, BaseException] = {}
+        exhausted = threading.Event()
+        closing = threading.Event()
+
+        def publish_items():
+            try:
+                for key, url in items:
+                    self.queue.publish(self.run_id, [(key, url)])
+                    progress['published'] += 1
+                    if closing.is_set():
+                        return
+            except BaseException as e:
+                failure['error'] = e
+            finally:
+                exhausted.set()
+
+        publisher = threading.Thread(target=publish_items, name="queue-publish", daemon=True)
+        publisher.start()
+
+        received = 0
+        last_seq = 0
+        last_published = 0
+        announced = False
+        last_progress = time.monotonic()
+        try:
+            while True:
+                done_publishing = exhausted.is_set()
+                published = progress['published']
+                if done_publishing and not announced:
+                    announced = True
+                    self.log(f"  {published} sites published to the work queue (run {self.run_id[:8]})")
+                if done_publishing and received >= published:
+                    break
+
+                batch = self.queue.results(self.run_id, last_seq)
+                for seq, key, result in batch:
+                    last_seq = seq
+                    received += 1
+                    if result.get('status') == 'Disallowed by robots.txt':
+                        self.disallowed += 1
+                    yield key, result
+
+                if batch or published != last_published:
+                    last_published = published
+                    last_progress = time.monotonic()
+                elif received < published:
+                    if self.timeout is not None and time.monotonic() - last_progress > self.timeout:
+                        self.log(f"WARNING: No result from workers for {self.timeout:.0f}s, "
+                                 f"{published - received} sites not scraped")
+                        return
+                    exhausted.wait(self.poll_interval)
+                else:
+                    # Everything published is back: wait for the next item
+                    exhausted.wait(self.poll_interval)
+
+            if 'error' in failure:
+                raise failure['error']
+        finally:
+            # No read in progress once run() is over: the caller may read on
+            closing.set()
+            publisher.join()
+            self.queue.purge(self.run_id)
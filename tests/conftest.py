@@ -0,0 +1,9 @@
+"""
+Shared test setup: the modules under test live in src/, imported by name
+as the entry scripts do.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
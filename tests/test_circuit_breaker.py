@@ -0,0 +1,142 @@
+"""
+CircuitBreakers: host and provider breakers opening, probing and
+closing again, on an injected clock.
+"""
+
+import pytest
+
+from circuit_breaker import CircuitBreakers, CircuitOpen, provider_key
+
+
+class Clock:
+    """Monotonic time moved by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(breakers, host, provider=None, times=1):
+    for _ in range(times):
+        breakers.acquire(host, provider)
+        breakers.release(host, provider, healthy=False)
+
+
+def test_host_breaker_opens_after_the_failure_threshold():
+    breakers = CircuitBreakers(host_threshold=2, clock=Clock())
+
+    fail(breakers, 'a.test')
+    assert not breakers.is_open('a.test')
+    fail(breakers, 'a.test')
+    assert breakers.is_open('a.test')
+    assert breakers.opened == 1
+
+    with pytest.raises(CircuitOpen) as refused:
+        breakers.acquire('a.test')
+    assert (refused.value.scope, refused.value.key) == ('host', 'a.test')
+    assert breakers.rejected == 1
+    # Other hosts are not affected
+    breakers.acquire('b.test')
+
+
+def test_success_resets_the_failure_count():
+    breakers = CircuitBreakers(host_threshold=2, clock=Clock())
+
+    fail(breakers, 'a.test')
+    breakers.acquire('a.test')
+    breakers.release('a.test', None, healthy=True)
+    fail(breakers, 'a.test')
+
+    assert not breakers.is_open('a.test')
+
+
+def test_cooldown_leads_to_a_single_half_open_probe():
+    clock = Clock()
+    breakers = CircuitBreakers(host_threshold=1, cooldown=60, clock=clock)
+    fail(breakers, 'a.test')
+
+    clock.now += 59.9
+    with pytest.raises(CircuitOpen):
+        breakers.acquire('a.test')
+
+    clock.now += 0.1
+    assert not breakers.is_open('a.test')
+    breakers.acquire('a.test')              # The probe
+    # Exactly one probe slot: other requests wait for its outcome
+    assert breakers.is_open('a.test')
+    with pytest.raises(CircuitOpen):
+        breakers.acquire('a.test')
+
+    breakers.release('a.test', None, healthy=True)
+    assert not breakers.is_open('a.test')
+    breakers.acquire('a.test')
+
+
+def test_failed_probe_doubles_the_cooldown_up_to_the_maximum():
+    clock = Clock()
+    breakers = CircuitBreakers(host_threshold=1, cooldown=60, max_cooldown=200, clock=clock)
+    fail(breakers, 'a.test')
+
+    for cooldown in (120, 200, 200):
+        clock.now += 1000
+        fail(breakers, 'a.test')            # Failed probe
+        clock.now += cooldown - 0.1
+        assert breakers.is_open('a.test')
+        clock.now += 0.1
+        assert not breakers.is_open('a.test')
+
+    # Reopening after a probe is not a new opening
+    assert breakers.opened == 1
+
+
+def test_provider_breaker_needs_failures_from_several_hosts():
+    breakers = CircuitBreakers(host_threshold=10, provider_threshold=3, provider_min_hosts=2, clock=Clock())
+    provider = '192.0.2.0/24'
+
+    # One failing site does not open its provider
+    fail(breakers, 'a.test', provider, times=5)
+    assert not breakers.is_open('b.test', provider)
+
+    fail(breakers, 'b.test', provider)
+    assert breakers.is_open('c.test', provider)
+    with pytest.raises(CircuitOpen) as refused:
+        breakers.acquire('c.test', provider)
+    assert (refused.value.scope, refused.value.key) == ('provider', provider)
+    # Hosts of other providers are not affected
+    breakers.acquire('d.test', '198.51.100.0/24')
+
+
+def test_probe_slot_is_taken_only_when_both_breakers_allow_the_request():
+    clock = Clock()
+    breakers = CircuitBreakers(host_threshold=1, provider_threshold=2, provider_min_hosts=2,
+                               cooldown=60, clock=clock)
+    provider = '192.0.2.0/24'
+    fail(breakers, 'a.test', provider)
+    clock.now += 30
+    fail(breakers, 'b.test', provider)      # Opens the provider, 30s after a.test
+
+    # a.test is due for a probe, its provider is not
+    clock.now += 30
+    with pytest.raises(CircuitOpen) as refused:
+        breakers.acquire('a.test', provider)
+    assert refused.value.scope == 'provider'
+
+    # The refused request did not keep a.test's probe slot
+    clock.now += 30
+    breakers.acquire('a.test', provider)
+
+
+@pytest.mark.parametrize("address, key", [
+    ("192.0.2.17", "192.0.2.0/24"),
+    ("192.0.2.250", "192.0.2.0/24"),
+    ("198.51.100.1", "198.51.100.0/24"),
+    ("2001:db8:1234:5678::1", "2001:db8:1234::/48"),
+    ("2001:db8:1234:ffff::2", "2001:db8:1234::/48"),
+    ("not an address", None),
+    ("", None),
+    (None, None),
+])
+def test_provider_key_groups_addresses_by_network(address, key):
+    assert provider_key(address) == key
@@ -0,0 +1,107 @@
+"""
+Exporter.export_delta: change sets between runs of the same search.
+"""
+
+import csv
+import json
+
+import pytest
+
+from exporter import Exporter
+
+
+def record(place_id, **fields):
+    base = {
+        'place_id': place_id, 'name': f"Place {place_id}", 'address': f"{place_id} Rue Oberkampf, 75011 Paris",
+        'google_phone': '+33 1 42 72 28 41', 'website': f"https://{place_id}.fr", 'reservation_phone': '',
+        'email': f"contact@{place_id}.fr", 'rating': 4.5, 'reviews': 120, 'type': 'restaurant',
+        'details_fetched': True, 'scrape_status': 'OK',
+    }
+    base.update(fields)
+    return base
+
+
+@pytest.fixture
+def export(tmp_path):
+    exporter = Exporter()
+    state = tmp_path / "out.delta-state.json"
+
+    def run(data, delta_format="csv", **kwargs):
+        filename = tmp_path / f"out.delta.{delta_format}"
+        counts = exporter.export_delta(data, str(filename), str(state), delta_format, **kwargs)
+        if delta_format == "csv":
+            with open(filename, newline='', encoding='utf-8') as delta:
+                changes = list(csv.DictReader(delta))
+        else:
+            with open(filename, encoding='utf-8') as delta:
+                changes = [json.loads(line) for line in delta]
+        return counts, {change['place_id']: change['operation'] for change in changes}
+
+    return run
+
+
+def test_first_export_adds_then_changes_and_removals(export):
+    _, changes = export([record('a'), record('b'), record('c')], query="paris|restaurant", limit=3)
+    assert changes == {'a': 'add', 'b': 'add', 'c': 'add'}
+
+    counts, changes = export([record('a'), record('b', email='resa@b.fr'), record('d')],
+                             query="paris|restaurant", limit=3)
+    assert changes == {'b': 'change', 'c': 'remove', 'd': 'add'}
+    assert counts == {'add': 1, 'change': 1, 'remove': 1, 'unchanged': 1}
+
+    counts, changes = export([record('a'), record('b', email='resa@b.fr'), record('d')],
+                             query="paris|restaurant", limit=3)
+    assert changes == {} and counts['unchanged'] == 3
+
+
+def test_ndjson_change_set(export):
+    export([record('a')], query="q")
+    _, changes = export([record('a', rating=4.0)], delta_format="ndjson", query="q")
+    assert changes == {'a': 'change'}
+
+
+def test_each_query_has_its_own_state(export):
+    export([record('a'), record('b')], query="paris|restaurant", limit=2)
+    _, changes = export([record('h')], query="lyon|hotel", limit=2)
+    assert changes == {'h': 'add'}
+
+    # Lyon did not remove the Paris records
+    _, changes = export([record('a'), record('b')], query="paris|restaurant", limit=2)
+    assert changes == {}
+
+
+def test_incomplete_or_narrower_runs_remove_nothing(export):
+    export([record(place_id) for place_id in 'abcd'], query="q", limit=4)
+
+    counts, changes = export([record('a')], query="q", limit=4, complete=False)
+    assert changes == {} and counts['remove'] == 0
+
+    counts, changes = export([record('a'), record('b')], query="q", limit=2)
+    assert changes == {} and counts['remove'] == 0
+
+    # The records kept in the state are still removed by a full run
+    _, changes = export([record('a'), record('b')], query="q", limit=4)
+    assert changes == {'c': 'remove', 'd': 'remove'}
+
+
+def test_fields_a_run_did_not_learn_are_not_changes(export):
+    export([record('a'), record('b'), record('c')], query="q")
+
+    counts, changes = export([
+        # Scraping disabled: contacts blank but unknown
+        record('a', reservation_phone='', email='', scrape_status=''),
+        # Details not fetched: Google fields blank too
+        record('b', google_phone='', website='', email='', details_fetched=False, scrape_status=''),
+        # Site scraped to the end without contacts: a real change
+        record('c', email='', scrape_status='No contact found'),
+    ], query="q")
+    assert changes == {'c': 'change'} and counts['unchanged'] == 2
+
+    # The known values stay in the state for the next run
+    _, changes = export([record('a'), record('b'), record('c', email='')], query="q")
+    assert changes == {}
+
+
+def test_unknown_format_fails(tmp_path):
+    assert Exporter().export_delta([record('a')], str(tmp_path / "out.delta.xml"),
+                                   str(tmp_path / "state.json"), "xml") is None
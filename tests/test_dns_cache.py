@@ -0,0 +1,68 @@
+"""
+DnsCache hook: caches of concurrent runs share socket.getaddrinfo safely.
+"""
+
+import socket
+
+import pytest
+
+import dns_cache
+from dns_cache import DnsCache, DnsEntry
+
+
+def cache_with(host, ip):
+    cache = DnsCache(max_workers=1)
+    cache._entries[host] = DnsEntry([(socket.AF_INET, ip)], ttl=300)
+    return cache
+
+
+def addresses(host):
+    return {info[4][0] for info in socket.getaddrinfo(host, 80, socket.AF_INET, socket.SOCK_STREAM)}
+
+
+@pytest.mark.parametrize("close_order", [(0, 1), (1, 0)])
+def test_two_caches_closed_in_any_order_restore_the_resolver(close_order):
+    original = socket.getaddrinfo
+    caches = [cache_with("first.test", "127.0.0.2"), cache_with("second.test", "127.0.0.3")]
+    for cache in caches:
+        cache.install()
+    caches[0].install()     # Installing twice is a no-op
+
+    # One hook serves both caches
+    assert addresses("first.test") == {"127.0.0.2"}
+    assert addresses("second.test") == {"127.0.0.3"}
+
+    caches[close_order[0]].close()
+    assert socket.getaddrinfo is not original
+    assert addresses("localhost")
+
+    caches[close_order[1]].close()
+    assert socket.getaddrinfo is original
+    assert addresses("localhost")
+
+
+def test_uninstall_leaves_a_later_replacement_alone():
+    original = socket.getaddrinfo
+    cache = cache_with("first.test", "127.0.0.2")
+    cache.install()
+
+    def replacement(*args, **kwargs):
+        return original(*args, **kwargs)
+
+    socket.getaddrinfo = replacement
+    try:
+        cache.close()
+        assert socket.getaddrinfo is replacement
+    finally:
+        socket.getaddrinfo = original
+
+
+def test_lookups_bypass_the_hook():
+    cache = cache_with("first.test", "127.0.0.2")
+    cache.install()
+    try:
+        # The cache's own resolutions go to the system resolver, never to a hook
+        assert dns_cache._SYSTEM_GETADDRINFO is not socket.getaddrinfo
+        assert cache.resolve("localhost")
+    finally:
+        cache.close()
@@ -0,0 +1,138 @@
+"""
+EgressPool against two local stand-in proxies.
+
+Each stand-in answers proxied requests itself instead of forwarding them,
+and can be told to answer 429 for some hosts, so the tests see exactly
+which egress every request left through.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from contact_scraper import ContactScraper
+from egress_pool import Egress, EgressPool
+
+
+class StandInProxy:
+    """HTTP proxy answering every request itself, recording the hosts asked for."""
+
+    def __init__(self):
+        self.hosts = []
+        self.rate_limited_hosts = set()
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = urlsplit(self.path).hostname
+                proxy.hosts.append(host)
+                if host in proxy.rate_limited_hosts:
+                    body = b"Too Many Requests"
+                    self.send_response(429)
+                else:
+                    body = b"<html><body><p>contact@example.org</p></body></html>"
+                    self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def proxies():
+    first, second = StandInProxy(), StandInProxy()
+    yield first, second
+    for proxy in (first, second):
+        proxy.stop()
+
+
+def fetch(pool, url):
+    """Send one request through the pool, as the scraper does, and return the egress used."""
+    host = urlsplit(url).hostname
+    egress = pool.acquire(host)
+    outcome = 'failed'
+    try:
+        response = egress.session.get(url, timeout=5)
+        outcome = 'rate_limited' if response.status_code == 429 else 'ok'
+    except requests.exceptions.ProxyError:
+        outcome = 'proxy_failed'
+    finally:
+        pool.release(egress, host, outcome)
+    return egress
+
+
+def test_least_loaded_egress_is_chosen(proxies):
+    first, second = proxies
+    pool = EgressPool([Egress(proxy=first.url), Egress(proxy=second.url)])
+
+    # Requests to one host alternate: the other egress has fewer in the window
+    used = [fetch(pool, "http://bistro.test/").name for _ in range(4)]
+    assert used == [first.url, second.url, first.url, second.url]
+    assert first.hosts == second.hosts == ['bistro.test', 'bistro.test']
+
+    # Requests in flight weigh first
+    busy = pool.acquire("hotel.test")
+    assert pool.acquire("hotel.test") is not busy
+    pool.close()
+
+
+def test_rate_limit_backs_off_one_egress_for_one_host(proxies):
+    first, second = proxies
+    first.rate_limited_hosts.add("busy.test")
+    pool = EgressPool([Egress(proxy=first.url), Egress(proxy=second.url)], rate_limit_backoff=0.3)
+    scraper = ContactScraper(verbose=False, egress_pool=pool)
+
+    # The 429 through the first proxy is retried at once through the second
+    result = scraper.scrape_contact_info("http://busy.test/")
+    assert result['email'] == 'contact@example.org'
+    assert first.hosts[0] == second.hosts[0] == 'busy.test'
+    assert [entry['rate_limited'] for entry in pool.stats()] == [1, 0]
+
+    # The host now goes through the second proxy even when it is the more loaded one...
+    for _ in range(3):
+        assert fetch(pool, "http://busy.test/").name == second.url
+    # ...while other hosts still use the first, which stays healthy
+    assert fetch(pool, "http://other.test/").name == first.url
+    assert all(entry['healthy'] for entry in pool.stats())
+
+    # Once the backoff is over the first proxy is back in use for the host
+    time.sleep(0.35)
+    assert fetch(pool, "http://busy.test/").name == first.url
+    pool.close()
+
+
+def test_failing_proxy_cools_down_for_every_host(proxies):
+    first, second = proxies
+    pool = EgressPool([Egress(proxy=first.url), Egress(proxy=second.url)], cooldown=0.3)
+    first.stop()
+
+    # The dead proxy fails once, then every host goes through the other one
+    assert fetch(pool, "http://bistro.test/").name == first.url
+    assert [entry['healthy'] for entry in pool.stats()] == [False, True]
+    for host in ("bistro.test", "hotel.test", "cafe.test"):
+        assert fetch(pool, f"http://{host}/").name == second.url
+    assert second.hosts == ['bistro.test', 'hotel.test', 'cafe.test']
+
+    # The health check keeps it out while it is down
+    assert pool.check_health(timeout=1) == {first.url: False, second.url: True}
+
+    # After the cooldown it is tried again
+    time.sleep(0.35)
+    assert fetch(pool, "http://bistro.test/").name == first.url
+    pool.close()
@@ -0,0 +1,123 @@
+"""
+HostScheduler: one request at a time per host, spaced by its delay,
+while other hosts go on; deferred retries wait without holding a worker.
+"""
+
+import threading
+import time
+
+from host_scheduler import HostScheduler
+
+
+class FakeRobots:
+    """robots.txt answers per host, without any download."""
+
+    def __init__(self, crawl_delays=None, disallowed=()):
+        self.crawl_delays = crawl_delays or {}
+        self.disallowed = set(disallowed)
+
+    def crawl_delay(self, url):
+        return self.crawl_delays.get(url.split('/')[2])
+
+    def can_fetch(self, url):
+        return url.split('/')[2] not in self.disallowed
+
+
+class Recorder:
+    """Fetch function logging when each URL starts and ends."""
+
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.calls = []
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def __call__(self, url, **kwargs):
+        started = time.monotonic() - self._start
+        time.sleep(self.duration)
+        with self._lock:
+            self.calls.append((url, started, time.monotonic() - self._start, kwargs))
+        return {'status': 'OK', 'url': url}
+
+    def starts(self, host):
+        return sorted(started for url, started, _, _ in self.calls if f"//{host}/" in url)
+
+
+def test_each_host_is_fetched_in_order_one_request_at_a_time():
+    fetch = Recorder()
+    scheduler = HostScheduler(max_workers=4, default_delay=0.1)
+    items = [(f"{host}{i}", f"https://{host}/page{i}") for i in range(3) for host in ('a.test', 'b.test')]
+
+    results = list(scheduler.run(items, fetch))
+
+    assert sorted(key for key, _ in results) == sorted(key for key, _ in items)
+    for host in ('a.test', 'b.test'):
+        calls = sorted((started, ended, url) for url, started, ended, _ in fetch.calls if f"//{host}/" in url)
+        # Queued order kept per host, and the delay counts from the end of the previous fetch
+        assert [url for _, _, url in calls] == [f"https://{host}/page{i}" for i in range(3)]
+        for (_, previous_end, _), (started, _, _) in zip(calls, calls[1:]):
+            assert started >= previous_end + 0.09
+    # Hosts do not wait for each other
+    assert abs(fetch.starts('a.test')[0] - fetch.starts('b.test')[0]) < 0.05
+
+
+def test_crawl_delay_and_robots_rules_apply_per_host():
+    fetch = Recorder(duration=0.01)
+    robots = FakeRobots(crawl_delays={'slow.test': 0.3, 'huge.test': 3600}, disallowed={'private.test'})
+    scheduler = HostScheduler(robots, max_workers=4, default_delay=0.0, max_delay=0.5)
+    items = [('s1', 'https://slow.test/1'), ('s2', 'https://slow.test/2'),
+             ('h1', 'https://huge.test/1'), ('h2', 'https://huge.test/2'),
+             ('p1', 'https://private.test/')]
+
+    results = dict(scheduler.run(items, fetch))
+
+    assert results['p1'] == {'reservation_phone': None, 'email': None, 'status': 'Disallowed by robots.txt'}
+    assert scheduler.disallowed == 1
+    first, second = fetch.starts('slow.test')
+    assert second - first >= 0.3
+    # Crawl-delay values are capped by max_delay
+    first, second = fetch.starts('huge.test')
+    assert 0.5 <= second - first < 1
+
+
+def test_retries_wait_in_the_retry_queue_without_holding_a_worker():
+    calls = []
+    lock = threading.Lock()
+
+    def fetch(url, retries_left):
+        with lock:
+            calls.append((url, retries_left, time.monotonic()))
+            attempts = sum(1 for called, _, _ in calls if called == url)
+        if url == 'https://flaky.test/' and attempts == 1:
+            return {'status': 'Service unavailable', 'retry_after': 0.3}
+        return {'status': 'OK'}
+
+    # A single worker: the other hosts are fetched while the retry waits
+    scheduler = HostScheduler(max_workers=1, default_delay=0.0, max_retries=2, retry_budget=5)
+    items = [('flaky', 'https://flaky.test/')] + [(f"site{i}", f"https://site{i}.test/") for i in range(3)]
+    results = list(scheduler.run(items, fetch))
+
+    assert [key for key, _ in results] == ['site0', 'site1', 'site2', 'flaky']
+    assert all(result == {'status': 'OK'} for _, result in results)
+    assert scheduler.retries == 1
+    flaky = [(retries_left, at) for url, retries_left, at in calls if url == 'https://flaky.test/']
+    assert [retries_left for retries_left, _ in flaky] == [2, 1]
+    assert flaky[1][1] - flaky[0][1] >= 0.3
+
+
+def test_spent_retry_budget_leaves_no_retries():
+    seen = []
+
+    def fetch(url, retries_left):
+        seen.append(retries_left)
+        if retries_left:
+            return {'status': 'Timeout', 'retry_after': 0.0}
+        return {'status': 'ERROR: Timeout', 'failed': True}
+
+    scheduler = HostScheduler(max_workers=1, default_delay=0.0, max_retries=2, retry_budget=1)
+    results = dict(scheduler.run([('a', 'https://a.test/'), ('b', 'https://b.test/')], fetch))
+
+    assert results == {'a': {'status': 'ERROR: Timeout', 'failed': True},
+                       'b': {'status': 'ERROR: Timeout', 'failed': True}}
+    assert scheduler.retries == 1
+    assert seen.count(0) == 2
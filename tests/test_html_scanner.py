@@ -0,0 +1,65 @@
+"""
+HtmlScanner: one pass over raw HTML finds what separate regex scans would.
+"""
+
+import re
+
+import pytest
+
+from html_scanner import EMAIL_PATTERN, HtmlScanner
+from phone_extractor import PhoneExtractor
+
+
+PAGE = (
+    '<html><head><!-- old number 01 11 11 11 11 -->'
+    '<script>var tel = "04 22 33 44 55";</script>'
+    '<style>.c0 { color: #000; }</style></head><body>'
+    '<a class="btn" href="tel:+33 1 23 45 67 89">Call</a>'
+    "<a href='mailto:contact@bistro.fr?subject=Table'>Mail us</a>"
+    '<A HREF="tel:0600000000" href="tel:06 12 34 56 78">Mobile</A>'
+    '<p>Reservations: 01 23 45 67 89, or booking@bistro.fr</p>'
+    '<p data-phone="+33 4 78 00 00 00">Lyon</p>'
+    '<p>Fax 0612345678@sms.bistro.fr</p>'
+    '</body></html>'
+)
+
+
+@pytest.fixture(scope="module")
+def scanner():
+    return HtmlScanner()
+
+
+def test_links_use_the_last_href_and_drop_mailto_parameters(scanner):
+    scan = scanner.scan(PAGE)
+    assert [link.value for link in scan.tel_links] == ['+33 1 23 45 67 89', '06 12 34 56 78']
+    assert [link.value for link in scan.mailto_links] == ['contact@bistro.fr']
+
+
+def test_candidates_match_separate_scans_in_document_order(scanner):
+    scan = scanner.scan(PAGE)
+    assert [phone.value for phone in scan.phones] == scanner.phone_regex.findall(PAGE)
+    assert [email.value for email in scan.emails] == re.findall(EMAIL_PATTERN, PAGE)
+    for candidate in scan.phones + scan.emails:
+        assert PAGE[candidate.start:candidate.end] == candidate.value
+
+
+def test_phones_in_window_match_a_scan_of_the_window(scanner):
+    scan = scanner.scan(PAGE)
+    for start in range(0, len(PAGE), 7):
+        for end in (start + 10, start + 40, start + 200):
+            assert scan.phones_in_window(start, end) == scanner.phone_regex.findall(PAGE, start, end)
+
+
+def test_other_countries_numbers_are_found(scanner):
+    extractor = PhoneExtractor(['ES', 'BE'])
+    spanish = HtmlScanner(extractor.phone_pattern, extractor.first_chars)
+    page = '<p>Reservas: 912 345 678</p><p>Bruxelles: 02 123 45 67</p>'
+    scan = spanish.scan(page)
+    assert [phone.value for phone in scan.phones] == extractor.phone_regex.findall(page)
+    assert scan.phones
+
+
+def test_empty_page(scanner):
+    scan = scanner.scan(None)
+    assert not (scan.tel_links or scan.mailto_links or scan.phones or scan.emails)
+    assert scan.phones_in_window(0, 10) == []
@@ -0,0 +1,81 @@
+"""
+PageArchive: records read back by offset, index rebuilt, crashes tolerated.
+"""
+
+import gzip
+import os
+
+from page_archive import PageArchive, parse_response, read_record
+
+
+BODY = '<a href="tel:+33142722841">Réserver</a>'.encode('utf-8')
+
+
+def write_sample(path):
+    with PageArchive(path) as archive:
+        archive.append_response('https://bistro.example/', 200,
+                                {'Content-Type': 'text/html; charset=utf-8', 'Content-Encoding': 'gzip',
+                                 'Content-Length': '999'},
+                                BODY, final_url='https://www.bistro.example/')
+        archive.link_places('https://bistro.example/', ['place-1', 'place-2'])
+        archive.link_places('https://bistro.example/', [None, ''])
+        assert archive.records == 2
+
+
+def read_all(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [(entry, *read_record(data, entry.offset, entry.length))
+            for entry in PageArchive(path, writable=False).entries()]
+
+
+def test_records_read_back_by_offset(tmp_path):
+    path = str(tmp_path / "pages.warc.gz")
+    write_sample(path)
+
+    (response, warc_headers, block), (metadata, _, _) = read_all(path)
+    assert response.record_type == 'response' and response.url == 'https://bistro.example/'
+    page = parse_response(warc_headers, block)
+    assert page.body == BODY
+    assert page.status == 200
+    assert page.final_url == 'https://www.bistro.example/'
+    # Transfer headers describe the download, not the archived body
+    assert page.headers == {'content-type': 'text/html; charset=utf-8'}
+    assert metadata.record_type == 'metadata' and metadata.place_ids == ('place-1', 'place-2')
+
+    # Each record is a gzip member of its own: the file is one valid gzip stream
+    with gzip.open(path) as archive:
+        assert archive.read().startswith(b'WARC/1.1\r\n')
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / "pages.warc.gz")
+    write_sample(path)
+    expected = [entry for entry, _, _ in read_all(path)]
+
+    os.remove(f"{path}.idx")
+    assert [entry for entry, _, _ in read_all(path)] == expected
+
+
+def test_truncated_record_and_index_line_are_ignored(tmp_path):
+    path = str(tmp_path / "pages.warc.gz")
+    write_sample(path)
+    with open(path, 'ab') as archive:
+        archive.write(gzip.compress(b'WARC/1.1\r\nWARC-Type: response\r\n\r\n')[:10])
+    with open(f"{path}.idx", 'a', encoding='utf-8') as index:
+        index.write("1234\t10\tresp")
+
+    assert len(read_all(path)) == 2
+    os.remove(f"{path}.idx")
+    assert PageArchive(path, writable=False).rebuild_index() == 2
+
+
+def test_appending_after_a_lost_index_keeps_every_record(tmp_path):
+    path = str(tmp_path / "nested" / "pages.warc.gz")
+    write_sample(path)
+    os.remove(f"{path}.idx")
+
+    with PageArchive(path) as archive:
+        archive.append_response('https://cafe.example/', 404, {}, b'Not found')
+    entries = [entry for entry, _, _ in read_all(path)]
+    assert [entry.url for entry in entries] == ['https://bistro.example/'] * 2 + ['https://cafe.example/']
@@ -0,0 +1,56 @@
+"""
+decode_body: declared charsets first, then UTF-8, then cp1252.
+"""
+
+import codecs
+
+import pytest
+
+from page_decoder import decode_body, sniff_encoding
+
+
+TEXT = "Réservation au 01 42 72 28 41 – crème brûlée"
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (TEXT.encode('utf-8'), 'text/html; charset=UTF-8'),
+    (TEXT.encode('cp1252'), 'text/html; charset="windows-1252"'),
+    # ISO-8859-1 labels are decoded as windows-1252, as browsers do (the dash is 0x96)
+    (TEXT.encode('cp1252'), "text/html; charset='iso-8859-1'"),
+    (f'<html><head><meta charset="windows-1252"></head>{TEXT}'.encode('cp1252'), ''),
+    (f'<meta http-equiv="Content-Type" content="text/html; CHARSET=windows-1252">{TEXT}'.encode('cp1252'),
+     'text/html'),
+    (codecs.BOM_UTF8 + TEXT.encode('utf-8'), 'text/html; charset=iso-8859-1'),
+    (codecs.BOM_UTF16_LE + TEXT.encode('utf-16-le'), ''),
+])
+def test_declared_charset_is_used(body, content_type):
+    assert decode_body(body, content_type).endswith(TEXT)
+
+
+def test_header_charset_wins_over_meta():
+    body = f'<meta charset="utf-8">{TEXT}'.encode('cp1252')
+    assert sniff_encoding(body, 'text/html; charset=windows-1252') == 'cp1252'
+    assert decode_body(body, 'text/html; charset=windows-1252').endswith(TEXT)
+
+
+def test_undeclared_utf8_and_legacy_bytes():
+    assert decode_body(TEXT.encode('utf-8'), 'text/html') == TEXT
+    # Not valid UTF-8: cp1252, the usual legacy encoding of these sites
+    assert decode_body(TEXT.encode('cp1252'), 'text/html') == TEXT
+    assert sniff_encoding(TEXT.encode('utf-8'), 'text/html') is None
+
+
+def test_unusable_declarations_are_ignored():
+    # Unknown label: fall back to the content
+    assert decode_body(TEXT.encode('utf-8'), 'text/html; charset=x-unknown') == TEXT
+    # UTF-16 declared in ASCII bytes cannot be right
+    assert sniff_encoding(b'<meta charset="utf-16"><p>ok</p>') == 'utf-8'
+
+
+def test_meta_beyond_the_sniffed_head_is_not_read():
+    body = b' ' * 5000 + b'<meta charset="windows-1252">'
+    assert sniff_encoding(body) is None
+
+
+def test_empty_body():
+    assert decode_body(b'', 'text/html; charset=utf-8') == ''
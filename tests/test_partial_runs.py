@@ -0,0 +1,120 @@
+"""
+Runs that left places out (failed search, API budget, details stopped)
+are incomplete: the delta export keeps the places they did not see.
+"""
+
+import threading
+
+from api_budget import BudgetExceeded, FetchStrategy
+from exporter import Exporter
+from google_places import GooglePlacesClient
+from pipeline import enrich_places, prospect, search_establishments, search_expanded
+
+
+def place(place_id, place_type):
+    return {'place_id': place_id, 'name': f"{place_type.title()} {place_id}",
+            'formatted_address': f"{place_id} Rue Oberkampf, 75011 Paris", 'rating': 4.5,
+            'user_ratings_total': 10}
+
+
+class FakeClient:
+    """Search results per type; a type mapped to an exception raises it."""
+
+    def __init__(self, results, details_error=None):
+        self.results = results
+        self.details_error = details_error
+
+    def search_places(self, city, place_type="restaurant", limit=20):
+        result = self.results[place_type]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def search_text(self, text_query, page_size=20, page_token=None):
+        raise BudgetExceeded("API call limit reached")
+
+    def get_place_details(self, place_id):
+        raise self.details_error
+
+
+def test_failed_search_of_one_type_makes_the_run_partial():
+    client = FakeClient({'restaurant': [place('r1', 'restaurant')], 'hotel': RuntimeError("HTTP 500")})
+    partial = threading.Event()
+
+    places = search_establishments(client, "Paris", "all", 10, log=lambda message: None, partial=partial)
+
+    assert [p['place_id'] for p in places] == ['r1']
+    assert partial.is_set()
+
+
+def test_complete_search_leaves_the_run_complete():
+    client = FakeClient({'restaurant': [place('r1', 'restaurant')], 'hotel': [place('h1', 'hotel')]})
+    partial = threading.Event()
+
+    search_establishments(client, "Paris", "all", 10, log=lambda message: None, partial=partial)
+
+    assert not partial.is_set()
+
+
+def test_expanded_search_cut_by_the_budget_makes_the_run_partial():
+    partial = threading.Event()
+
+    search_expanded(FakeClient({}), "Paris", "hotel", 10, log=lambda message: None, partial=partial)
+
+    assert partial.is_set()
+
+
+def test_details_stopped_by_failures_make_the_run_partial():
+    client = FakeClient({}, details_error=RuntimeError("HTTP 500"))
+    strategy = FetchStrategy("full", "places.id", "id,name", None)
+    records = []
+    partial = threading.Event()
+
+    enrich_places(client, [place(f"r{i}", 'restaurant') for i in range(4)], strategy,
+                  log=lambda message: None, on_record=records.append, partial=partial)
+
+    # Stopped after 3 failures out of 4: the last place got no record
+    assert len(records) == 3
+    assert partial.is_set()
+
+
+def test_partial_run_emits_no_removals(tmp_path, monkeypatch):
+    monkeypatch.setenv('GOOGLE_MAPS_API_KEY', 'fake')
+    results = {'restaurant': [place('r1', 'restaurant')], 'hotel': [place('h1', 'hotel')]}
+
+    def search_places(self, city, place_type="restaurant", limit=20):
+        if isinstance(results[place_type], Exception):
+            raise results[place_type]
+        return results[place_type]
+
+    monkeypatch.setattr(GooglePlacesClient, 'search_places', search_places)
+    monkeypatch.setattr(GooglePlacesClient, 'get_place_details', lambda self, place_id: None)
+
+    exporter = Exporter()
+    state = str(tmp_path / "out.delta-state.json")
+
+    def export(run):
+        # Read to the end, as prospector.py does: closing the run would stop it
+        data = list(run)
+        return exporter.export_delta(data, str(tmp_path / "out.delta.csv"), state, "csv",
+                                     query="paris|all", limit=10, complete=run.complete)
+
+    def run():
+        return prospect("Paris", "all", limit=10, scrape=False, cache_dir=str(tmp_path))
+
+    first = run()
+    assert export(first)['add'] == 2
+    assert first.complete
+
+    # The hotel search fails: the hotel is not known gone
+    results['hotel'] = RuntimeError("HTTP 500")
+    second = run()
+    counts = export(second)
+    assert not second.complete
+    assert counts['remove'] == 0
+
+    # A complete run without the hotel removes it
+    results['hotel'] = []
+    third = run()
+    assert third.complete
+    assert export(third)['remove'] == 1
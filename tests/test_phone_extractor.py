@@ -0,0 +1,86 @@
+"""
+PhoneExtractor.to_e164 and the E.164 columns of the exports.
+"""
+
+import csv
+import json
+
+import pytest
+
+from exporter import Exporter
+from phone_extractor import PHONE_FORMATS, PhoneExtractor
+
+
+@pytest.mark.parametrize("raw, e164, grouped", [
+    ("01 23 45 67 89", "+33123456789", "+33 1 23 45 67 89"),
+    ("01.23.45.67.89", "+33123456789", "+33 1 23 45 67 89"),
+    ("+33 (0)1 23 45 67 89", "+33123456789", "+33 1 23 45 67 89"),
+    ("0033 6 12 34 56 78", "+33612345678", "+33 6 12 34 56 78"),
+    ("+32 2 123 45 67", "+3221234567", "+32 2 123 45 67"),
+    ("+32 (0)2 123 45 67", "+3221234567", "+32 2 123 45 67"),
+    ("02 123 45 67", "+3221234567", "+32 2 123 45 67"),
+    ("+41 44 123 45 67", "+41441234567", "+41 44 123 45 67"),
+    ("933 456 789", "+34933456789", "+34 933 456 789"),
+    ("123", "", ""),
+    ("", "", ""),
+])
+def test_to_e164_and_clean_phone(raw, e164, grouped):
+    extractor = PhoneExtractor(['FR', 'BE', 'CH', 'ES'])
+    assert extractor.to_e164(raw) == e164
+    assert extractor.clean_phone(raw) == grouped
+    # The grouped form is international: it gives the same E.164 number
+    assert extractor.to_e164(grouped) == e164
+
+
+def test_national_numbers_read_as_the_first_country():
+    # Valid in France and in Switzerland, or in Belgium
+    assert PhoneExtractor(['FR', 'CH']).to_e164("04 12 34 56 78") == "+33412345678"
+    assert PhoneExtractor(['CH', 'FR']).to_e164("041 234 56 78") == "+41412345678"
+    assert PhoneExtractor(['FR', 'BE']).to_e164("0470 12 34 56") == "+33470123456"
+    assert PhoneExtractor(['BE', 'FR']).to_e164("0470 12 34 56") == "+32470123456"
+    # International numbers do not depend on the order
+    assert PhoneExtractor(PHONE_FORMATS).to_e164("+41 41 234 56 78") == "+41412345678"
+
+
+RECORD = {
+    'place_id': 'a', 'name': 'Le Petit Zinc', 'google_phone': '+33 1 42 72 28 41',
+    'reservation_phone': '+32 2 123 45 67', 'email': 'contact@petitzinc.fr', 'rating': 4.5,
+}
+
+
+def test_csv_and_json_exports_carry_e164_columns(tmp_path):
+    exporter = Exporter()
+    no_phone = {'place_id': 'b', 'name': 'Café', 'google_phone': '+1 212-555-0100'}
+    assert exporter.export_csv([RECORD, no_phone], str(tmp_path / "out.csv"))
+    assert exporter.export_json([RECORD], str(tmp_path / "out.json"))
+
+    with open(tmp_path / "out.csv", newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    # Appended: the existing columns keep their position
+    assert list(rows[0])[:9] == ['name', 'address', 'google_phone', 'reservation_phone', 'email',
+                                 'website', 'rating', 'reviews', 'type']
+    assert rows[0]['google_phone_e164'] == '+33142722841'
+    assert rows[0]['reservation_phone_e164'] == '+3221234567'
+    # Numbers of unsupported countries have no E.164 form
+    assert rows[1]['google_phone_e164'] == rows[1]['reservation_phone_e164'] == ''
+
+    with open(tmp_path / "out.json", encoding='utf-8') as f:
+        establishment = json.load(f)['establishments'][0]
+    assert establishment['google_phone'] == '+33 1 42 72 28 41'
+    assert establishment['google_phone_e164'] == '+33142722841'
+
+
+def test_e164_columns_follow_kept_phones_in_delta_exports(tmp_path):
+    exporter = Exporter()
+    state = str(tmp_path / "state.json")
+    delta = str(tmp_path / "out.delta.ndjson")
+    exporter.export_delta([RECORD], delta, state, "ndjson")
+
+    # Scraping off: the reservation phone is unknown, its previous value stands
+    counts = exporter.export_delta([{**RECORD, 'reservation_phone': '', 'scrape_status': '',
+                                     'website': 'https://petitzinc.fr'}], delta, state, "ndjson")
+    assert counts['change'] == 1      # The website is new
+    with open(delta, encoding='utf-8') as f:
+        change = json.loads(f.readline())
+    assert change['reservation_phone'] == '+32 2 123 45 67'
+    assert change['reservation_phone_e164'] == '+3221234567'
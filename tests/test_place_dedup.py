@@ -0,0 +1,75 @@
+"""
+PlaceDeduplicator: duplicate listings are merged, distinct places are not.
+"""
+
+from place_dedup import PlaceDeduplicator, dedupe_places
+
+
+def place(place_id, name, address, **fields):
+    return {'place_id': place_id, 'name': name, 'formatted_address': address, **fields}
+
+
+def test_variant_name_and_address_are_merged():
+    places = [
+        place('a', 'Le Petit Zinc', '12 Rue de la Roquette, 75011 Paris, France'),
+        place('b', 'Petit Zinc (Le)', '12 r. de la Roquette, 75011 Paris', website='https://petitzinc.fr'),
+    ]
+    kept, merged = dedupe_places(places)
+    assert [p['place_id'] for p in kept] == ['a']
+    assert merged == {'b': 'a'}
+    # The kept place takes the website it lacked
+    assert kept[0]['website'] == 'https://petitzinc.fr'
+
+
+def test_same_name_at_another_number_is_kept():
+    places = [
+        place('a', 'Le Petit Zinc', '12 Rue de la Roquette, 75011 Paris, France'),
+        place('c', 'Le Petit Zinc', '40 Rue de la Roquette, 75011 Paris, France'),
+    ]
+    kept, merged = dedupe_places(places)
+    assert len(kept) == 2 and not merged
+
+
+def test_hotel_and_its_restaurant_are_two_prospects():
+    places = [
+        place('d', 'Hôtel Lutetia', '45 Bd Raspail, 75006 Paris, France'),
+        place('e', 'Brasserie Lutetia', '45 Boulevard Raspail, 75006 Paris'),
+    ]
+    kept, merged = dedupe_places(places)
+    assert len(kept) == 2 and not merged
+
+
+def test_same_phone_with_similar_name_is_merged_without_postcode():
+    places = [
+        place('f', 'Chez Janou', '2 Rue Roger Verlomme, 75003 Paris', international_phone_number='01 42 72 28 41'),
+        place('g', 'Janou Restaurant', 'Rue Roger Verlomme, Paris', international_phone_number='+33 1 42 72 28 41'),
+    ]
+    kept, merged = dedupe_places(places)
+    assert merged == {'g': 'f'}
+
+
+def test_priority_chooses_the_place_kept_and_order_is_preserved():
+    places = [
+        place('x', 'Café Charbon', '109 Rue Oberkampf, 75011 Paris'),
+        place('a', 'Le Petit Zinc', '12 Rue de la Roquette, 75011 Paris', user_ratings_total=3),
+        place('y', 'Bouillon Chartier', '7 Rue du Faubourg Montmartre, 75009 Paris'),
+        place('b', 'Petit Zinc (Le)', '12 r. de la Roquette, 75011 Paris', user_ratings_total=900),
+    ]
+    kept, merged = dedupe_places(places, priority=lambda p: p.get('user_ratings_total', 0))
+    assert [p['place_id'] for p in kept] == ['x', 'y', 'b']
+    assert merged == {'a': 'b'}
+
+
+def test_only_places_sharing_a_block_are_compared():
+    places = [place(f'p{i}', f'Restaurant {word}', f'{i} Rue Oberkampf, 750{i % 20 + 1:02d} Paris')
+              for i, word in enumerate(['Zinc', 'Comptoir', 'Canard', 'Olivier', 'Cigale', 'Moulin'] * 5)]
+    deduplicator = PlaceDeduplicator()
+    assert deduplicator.find_duplicates(places) == []
+    assert deduplicator.comparisons < len(places) * (len(places) - 1) // 2
+
+
+def test_oversized_blocks_are_skipped():
+    places = [place(f'p{i}', 'Bistrot', f'{i} Rue Oberkampf, 75011 Paris') for i in range(5)]
+    deduplicator = PlaceDeduplicator(max_block_size=4)
+    assert deduplicator.find_duplicates(places) == []
+    assert deduplicator.skipped_blocks == 1 and deduplicator.comparisons == 0
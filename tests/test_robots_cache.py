@@ -0,0 +1,78 @@
+"""
+RobotsCache: parsed rules are reused until their cache entry expires,
+then read from the cache or fetched again.
+"""
+
+import time
+
+import pytest
+
+import robots_cache
+from cache_store import JsonCache
+from robots_cache import RobotsCache
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() moved by hand, for the cache entries and the parsed rules."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def robots_txt(monkeypatch):
+    """robots.txt served to requests.get, changed by the tests."""
+    served = {'text': "User-agent: *\nDisallow: /private/\n", 'status_code': 200}
+    monkeypatch.setattr(robots_cache.requests, 'get',
+                        lambda url, **kwargs: FakeResponse(served['text'], served['status_code']))
+    return served
+
+
+def test_rules_are_refetched_once_the_ttl_has_passed(clock, robots_txt):
+    robots = RobotsCache(ttl=3600)
+    assert not robots.can_fetch("https://site.test/private/page")
+
+    robots_txt['text'] = "User-agent: *\nDisallow: /\n"
+    clock[0] += 3599
+    assert robots.can_fetch("https://site.test/public")
+    assert robots.fetches == 1
+
+    clock[0] += 1
+    assert not robots.can_fetch("https://site.test/public")
+    assert robots.fetches == 2
+
+
+def test_failed_fetches_are_retried_after_the_error_ttl(clock, robots_txt):
+    robots_txt['status_code'] = 503
+    robots = RobotsCache(ttl=3600, error_ttl=60)
+    assert robots.can_fetch("https://site.test/private/page")
+
+    robots_txt['status_code'] = 200
+    clock[0] += 60
+    assert not robots.can_fetch("https://site.test/private/page")
+    assert robots.fetches == 2
+
+
+def test_rules_read_from_the_cache_expire_with_their_entry(tmp_path, clock, robots_txt):
+    filename = str(tmp_path / "robots.json")
+    first = RobotsCache(JsonCache(filename), ttl=3600)
+    first.can_fetch("https://site.test/")
+    first.save()
+
+    # A later process reuses the stored body for what is left of its TTL
+    clock[0] += 3000
+    later = RobotsCache(JsonCache(filename), ttl=3600)
+    assert not later.can_fetch("https://site.test/private/page")
+    assert later.fetches == 0
+
+    robots_txt['text'] = "User-agent: *\nAllow: /\n"
+    clock[0] += 600
+    assert later.can_fetch("https://site.test/private/page")
+    assert later.fetches == 1
@@ -0,0 +1,115 @@
+"""
+WorkQueue leases on a SQLite file, and QueueScheduler fed by a worker thread.
+"""
+
+import threading
+import time
+
+from work_queue import QueueScheduler, WorkQueue
+
+
+def test_lease_extend_and_complete(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    assert queue.publish('run', [('a', 'https://a.test/'), ('b', 'https://b.test/')]) == 2
+    # Keys already published are ignored
+    assert queue.publish('run', [('a', 'https://a.test/')]) == 0
+
+    first, = queue.lease('w1')
+    second, = queue.lease('w2', limit=5)
+    assert (first.key, first.url, first.attempts) == ('a', 'https://a.test/', 1)
+    assert second.key == 'b'
+    assert queue.lease('w3') == []
+
+    assert queue.extend(first.id, 'w1')
+    # Only the lease holder extends or completes
+    assert not queue.extend(first.id, 'w2')
+    assert not queue.complete(first.id, 'w2', {'status': 'OK'})
+    assert queue.complete(first.id, 'w1', {'status': 'OK', 'email': 'contact@a.test'})
+    assert queue.counts('run') == {'done': 1, 'leased': 1}
+    assert queue.results('run') == [(1, 'a', {'status': 'OK', 'email': 'contact@a.test'})]
+
+
+def test_expired_lease_is_leased_again_and_lost_by_its_first_worker(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), visibility_timeout=0.1)
+    queue.publish('run', [('a', 'https://a.test/')])
+    first, = queue.lease('w1')
+
+    time.sleep(0.15)
+    again, = queue.lease('w2')
+    assert (again.id, again.attempts) == (first.id, 2)
+
+    # The first worker has lost the task: its result is dropped
+    assert not queue.extend(first.id, 'w1')
+    assert not queue.complete(first.id, 'w1', {'status': 'OK', 'email': 'stale@a.test'})
+    assert queue.complete(again.id, 'w2', {'status': 'OK', 'email': 'contact@a.test'})
+    assert queue.results('run') == [(1, 'a', {'status': 'OK', 'email': 'contact@a.test'})]
+
+
+def test_task_fails_after_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), visibility_timeout=0.05, max_attempts=2)
+    queue.publish('run', [('a', 'https://a.test/')])
+
+    assert [task.attempts for task in queue.lease('w1')] == [1]
+    time.sleep(0.1)
+    assert [task.attempts for task in queue.lease('w2')] == [2]
+    time.sleep(0.1)
+    assert queue.lease('w3') == []
+
+    assert queue.counts('run') == {'failed': 1}
+    (seq, key, result), = queue.results('run')
+    assert (seq, key) == (1, 'a')
+    assert result['failed'] and result['status'] == 'ERROR: Lease timed out'
+
+
+def test_results_after_a_point_of_the_completion_order(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.publish('run', [(key, f"https://{key}.test/") for key in 'abc'])
+    queue.publish('other', [('x', 'https://x.test/')])
+    tasks = {task.key: task for task in queue.lease('w1', limit=10)}
+
+    for key in ('c', 'x', 'a'):
+        queue.complete(tasks[key].id, 'w1', {'status': key})
+    # Completion order, numbered per run
+    assert [(seq, key) for seq, key, _ in queue.results('run')] == [(1, 'c'), (2, 'a')]
+    assert [(seq, key) for seq, key, _ in queue.results('other')] == [(1, 'x')]
+
+    queue.complete(tasks['b'].id, 'w1', {'status': 'b'})
+    assert queue.results('run', after=2) == [(3, 'b', {'status': 'b'})]
+    assert queue.results('run', after=3) == []
+
+
+def test_queue_scheduler_yields_results_written_by_workers(tmp_path):
+    filename = str(tmp_path / "queue.db")
+    stop = threading.Event()
+
+    def worker():
+        queue = WorkQueue(filename)
+        while not stop.is_set():
+            for task in queue.lease('worker'):
+                queue.complete(task.id, 'worker', {'status': 'OK', 'url': task.url})
+            stop.wait(0.01)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        queue = WorkQueue(filename)
+        scheduler = QueueScheduler(queue, poll_interval=0.01, timeout=5, log=lambda message: None)
+        items = [(f"site{i}", f"https://site{i}.test/") for i in range(5)]
+
+        results = dict(scheduler.run(iter(items)))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert results == {key: {'status': 'OK', 'url': url} for key, url in items}
+    # The run's tasks are purged once read
+    assert queue.counts(scheduler.run_id) == {}
+
+
+def test_queue_scheduler_gives_up_without_workers(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    lines = []
+    scheduler = QueueScheduler(queue, poll_interval=0.01, timeout=0.1, log=lines.append)
+
+    assert list(scheduler.run([('a', 'https://a.test/')])) == []
+    assert "1 sites not scraped" in lines[-1]